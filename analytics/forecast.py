@@ -0,0 +1,139 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+HOURS_PER_WEEK = 168
+
+
+def hour_of_week(dt):
+    """0 = Monday 00:00-01:00 ... 167 = Sunday 23:00-24:00."""
+    return dt.weekday() * 24 + dt.hour
+
+
+def bin_occurrences(start, end):
+    """How many times each hour-of-week bin occurred in [start, end), as a float array of 168."""
+    n_hours = max(0, int((end - start).total_seconds() // 3600))
+    occurrences = np.full(HOURS_PER_WEEK, n_hours // HOURS_PER_WEEK, dtype=np.float64)
+    remainder = n_hours % HOURS_PER_WEEK
+    if remainder:
+        occurrences[(hour_of_week(start) + np.arange(remainder)) % HOURS_PER_WEEK] += 1
+    return occurrences
+
+
+class OccupancyForecaster:
+    """Hour-of-week arrival/departure profiles per vehicle type, built from parking records.
+
+    Counting is done server-side ($group by weekday/hour/type, at most 168 rows per type), and updates
+    are incremental: each update only aggregates records entered/exited since the previous watermark."""
+    def __init__(self, history_days=365):
+        self.history_days = history_days
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.property_id = None
+            self.arrivals = {}       # vehicle type -> np.array(168) of entry counts
+            self.departures = {}     # vehicle type -> np.array(168) of exit counts
+            self.first_seen = None   # Earliest record counted (start of the observation window)
+            self.watermark = None    # Records up to this time are already counted
+            self.last_update_s = 0.0
+
+    # --- Building ---
+    def _grouped_counts(self, parking_col, property_id, field, since, until):
+        """{type: np.array(168)} of records whose `field` falls in (since, until], plus the earliest such time."""
+        pipeline = [
+            {"$match": {"property_id": property_id, field: {"$gt": since, "$lte": until}}},
+            {"$group": {
+                "_id": {"dow": {"$dayOfWeek": f"${field}"}, "hour": {"$hour": f"${field}"},
+                        "type": {"$toLower": {"$ifNull": ["$vehicle_type", "unknown"]}}},
+                "count": {"$sum": 1},
+                "first": {"$min": f"${field}"},
+            }},
+        ]
+        counts, first = {}, None
+        for row in parking_col.aggregate(pipeline, allowDiskUse=True):
+            key = row['_id']
+            # $dayOfWeek is 1 (Sunday) .. 7 (Saturday); shift so Monday is bin 0 like datetime.weekday()
+            how = ((key['dow'] + 5) % 7) * 24 + key['hour']
+            counts.setdefault(key['type'], np.zeros(HOURS_PER_WEEK))[how] += row['count']
+            if first is None or row['first'] < first:
+                first = row['first']
+        return counts, first
+
+    def update(self, parking_col, property_id, now=None):
+        """Adds records since the last update (or builds from history_days back). Returns seconds taken."""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        with self._lock:
+            if property_id != self.property_id:
+                self.property_id, self.arrivals, self.departures = property_id, {}, {}
+                self.first_seen = self.watermark = None
+            since = self.watermark or (now - timedelta(days=self.history_days))
+
+        arrivals, first_arrival = self._grouped_counts(parking_col, property_id, "entry_time", since, now)
+        departures, _ = self._grouped_counts(parking_col, property_id, "exit_time", since, now)
+
+        with self._lock:
+            for target, new in ((self.arrivals, arrivals), (self.departures, departures)):
+                for v_type, counts in new.items():
+                    if v_type in target:
+                        target[v_type] += counts
+                    else:
+                        target[v_type] = counts
+            if self.first_seen is None and first_arrival is not None:
+                # Observation starts at the top of the hour of the first entry
+                self.first_seen = first_arrival.replace(minute=0, second=0, microsecond=0)
+            self.watermark = now
+            self.last_update_s = time.perf_counter() - started
+        return self.last_update_s
+
+    # --- Querying ---
+    def weeks_observed(self, now=None):
+        """Per-bin count of how many times each hour-of-week has been observed."""
+        if self.first_seen is None:
+            return np.zeros(HOURS_PER_WEEK)
+        return bin_occurrences(self.first_seen, now or self.watermark or datetime.now())
+
+    def rates(self, vehicle_type, now=None):
+        """(arrivals per hour, departures per hour) for each hour-of-week bin."""
+        with self._lock:
+            arrivals = self.arrivals.get(vehicle_type.lower(), np.zeros(HOURS_PER_WEEK)).copy()
+            departures = self.departures.get(vehicle_type.lower(), np.zeros(HOURS_PER_WEEK)).copy()
+            observed = np.maximum(self.weeks_observed(now), 1.0)
+        return arrivals / observed, departures / observed
+
+    def forecast(self, vehicle_type, current, capacity, hours=6, now=None):
+        """Projects occupancy for the next `hours` hours.
+
+        Returns a dict with 'times' (start of each hour), 'occupancy' (expected vehicles at the end of
+        each hour, clipped to [0, capacity]) and 'time_to_full' (hours until full, or None)."""
+        now = now or datetime.now()
+        arrival_rate, departure_rate = self.rates(vehicle_type, now)
+        bins = (hour_of_week(now) + np.arange(hours)) % HOURS_PER_WEEK
+        net = arrival_rate[bins] - departure_rate[bins]
+        # The current hour is partly over: only the remaining fraction of it counts
+        remaining = 1.0 - (now.minute * 60 + now.second) / 3600.0
+        step = net * np.concatenate(([remaining], np.ones(hours - 1)))
+        projected = current + np.cumsum(step)
+
+        time_to_full = None
+        if capacity > 0:
+            if current >= capacity:
+                time_to_full = 0.0
+            else:
+                full = np.nonzero(projected >= capacity)[0]
+                if full.size:
+                    i = int(full[0])
+                    before = current if i == 0 else projected[i - 1]
+                    elapsed = 0.0 if i == 0 else remaining + (i - 1)
+                    span = remaining if i == 0 else 1.0
+                    time_to_full = elapsed + span * (capacity - before) / max(projected[i] - before, 1e-9)
+
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        return {
+            'times': [hour_start + timedelta(hours=int(i)) for i in range(hours)],
+            'occupancy': np.clip(projected, 0, capacity if capacity > 0 else None),
+            'time_to_full': time_to_full,
+        }
@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime, time
+
+VEHICLE_TYPES = ("car", "bike")
+
+
+def hour_of_day(dt):
+    return dt.hour + dt.minute / 60 + dt.second / 3600
+
+
+class IntradayOccupancy:
+    """Today's occupancy per vehicle type as a step series (x = hour of day, y = vehicles parked).
+
+    seed() reads today's records once; after that every entry/exit is applied as a +1/-1 step, so the
+    dashboard line follows the gates without re-querying history. Thread-safe; at midnight the series
+    restarts from the last known counts."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._series = {v: ([], []) for v in VEHICLE_TYPES}
+
+    def _start_day_locked(self, day, counts):
+        self._day = day
+        self._series = {v: ([0.0], [counts.get(v, 0)]) for v in VEHICLE_TYPES}
+
+    def seed(self, parking_col, property_id, now=None):
+        """Rebuilds today's series from records open at any time since midnight. Returns the number of records read."""
+        now = now or datetime.now()
+        midnight = datetime.combine(now.date(), time.min)
+        query = {"property_id": property_id, "entry_time": {"$lte": now},
+                 "$or": [{"exit_time": None}, {"exit_time": {"$gte": midnight}}]}
+        records = list(parking_col.find(query, {"entry_time": 1, "exit_time": 1, "vehicle_type": 1, "_id": 0}))
+
+        at_midnight = {v: 0 for v in VEHICLE_TYPES}
+        steps = []
+        for r in records:
+            v_type = (r.get('vehicle_type') or '').lower()
+            if v_type not in at_midnight or not isinstance(r.get('entry_time'), datetime):
+                continue
+            if r['entry_time'] < midnight:
+                at_midnight[v_type] += 1
+            else:
+                steps.append((r['entry_time'], v_type, 1))
+            exit_time = r.get('exit_time')
+            if isinstance(exit_time, datetime) and exit_time <= now:
+                steps.append((exit_time, v_type, -1))
+        steps.sort(key=lambda s: s[0])
+
+        with self._lock:
+            self._start_day_locked(now.date(), at_midnight)
+            for when, v_type, delta in steps:
+                self._step_locked(v_type, delta, when)
+        return len(records)
+
+    def _step_locked(self, v_type, delta, when):
+        times, counts = self._series[v_type]
+        times.append(hour_of_day(when))
+        counts.append(max(0, counts[-1] + delta))
+
+    def record(self, vehicle_type, delta, when=None):
+        """Applies one entry (+1) or exit (-1)."""
+        v_type = (vehicle_type or '').lower()
+        if v_type not in VEHICLE_TYPES:
+            return
+        when = when or datetime.now()
+        with self._lock:
+            if self._day is None:
+                return # Not seeded yet; seed() will include this event
+            if when.date() != self._day:
+                if when.date() < self._day:
+                    return
+                self._start_day_locked(when.date(), {v: self._series[v][1][-1] for v in VEHICLE_TYPES})
+            self._step_locked(v_type, delta, when)
+
+    def series(self, vehicle_type, now=None):
+        """(hours, counts) for vehicle_type, extended to now so the last step is visible."""
+        now = now or datetime.now()
+        with self._lock:
+            times, counts = self._series[vehicle_type]
+            if not times:
+                return [], []
+            times, counts = list(times), list(counts)
+        if self._day == now.date():
+            times.append(hour_of_day(now))
+            counts.append(counts[-1])
+        return times, counts
@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pymongo
+
+SETTLE_SECONDS = 5 # Exit fees are written just after exit_time; stay this far behind "now" so they are included
+
+
+class PortfolioMetrics:
+    """Today's entries/exits/revenue and current occupancy for every property a manager covers.
+
+    All properties are served by one grouped pipeline, so the cost does not grow with the number of lots,
+    and each refresh only aggregates records entered/exited since the previous one (the totals for the
+    day are kept and reset at midnight)."""
+    def __init__(self, property_ids):
+        self.property_ids = list(dict.fromkeys(property_ids)) # property_id strings ("p2"), order preserved
+        self._lock = threading.Lock()
+        self._day = None
+        self._watermark = None
+        self._totals = {}        # property _id -> {'entries', 'exits', 'revenue'}
+        self._properties = []    # Latest property documents
+        self._indexes_checked = False
+        self.last_refresh_s = 0.0
+
+    @staticmethod
+    def ensure_indexes(parking_col):
+        """Indexes the grouped pipeline's two $or branches use."""
+        parking_col.create_index([("property_id", pymongo.ASCENDING), ("entry_time", pymongo.ASCENDING)])
+        parking_col.create_index([("property_id", pymongo.ASCENDING), ("exit_time", pymongo.ASCENDING)])
+
+    def refresh(self, property_col, parking_col, now=None):
+        """Re-reads the property documents and folds in records since the last refresh. Returns seconds taken."""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        if not self._indexes_checked:
+            try:
+                self.ensure_indexes(parking_col)
+            except pymongo.errors.PyMongoError as e:
+                print(f"[WARN] Could not create portfolio indexes: {e}")
+            self._indexes_checked = True
+
+        properties = list(property_col.find({"property_id": {"$in": self.property_ids}}))
+        oids = [p['_id'] for p in properties]
+
+        with self._lock:
+            if self._day != now.date():
+                self._day = now.date()
+                self._watermark = datetime.combine(now.date(), datetime.min.time()) - timedelta(microseconds=1)
+                self._totals = {}
+            since = self._watermark
+        until = max(since, now - timedelta(seconds=SETTLE_SECONDS))
+
+        in_range = lambda field: {"$and": [{"$gt": [f"${field}", since]}, {"$lte": [f"${field}", until]}]}
+        pipeline = [
+            {"$match": {"property_id": {"$in": oids},
+                        "$or": [{"entry_time": {"$gt": since, "$lte": until}}, {"exit_time": {"$gt": since, "$lte": until}}]}},
+            {"$group": {
+                "_id": "$property_id",
+                "entries": {"$sum": {"$cond": [in_range("entry_time"), 1, 0]}},
+                "exits": {"$sum": {"$cond": [in_range("exit_time"), 1, 0]}},
+                "revenue": {"$sum": {"$cond": [in_range("exit_time"), {"$ifNull": ["$fee", 0]}, 0]}},
+            }},
+        ]
+        rows = list(parking_col.aggregate(pipeline)) if oids else []
+
+        with self._lock:
+            for row in rows:
+                totals = self._totals.setdefault(row['_id'], {'entries': 0, 'exits': 0, 'revenue': 0.0})
+                totals['entries'] += row['entries']
+                totals['exits'] += row['exits']
+                totals['revenue'] += row['revenue']
+            self._watermark = until
+            self._properties = properties
+            self.last_refresh_s = time.perf_counter() - started
+        return self.last_refresh_s
+
+    def rows(self):
+        """One dict per property (in property_ids order) for display."""
+        with self._lock:
+            by_id = {p.get('property_id'): p for p in self._properties}
+            result = []
+            for p_id in self.property_ids:
+                prop = by_id.get(p_id)
+                if prop is None:
+                    continue
+                totals = self._totals.get(prop['_id'], {'entries': 0, 'exits': 0, 'revenue': 0.0})
+                row = {'property_id': p_id, 'name': prop.get('name', p_id), **totals}
+                for v_type in ("car", "bike"):
+                    total = prop.get(f"parking_spaces_{v_type}", 0)
+                    row[f"{v_type}_total"] = total
+                    row[f"{v_type}_occupied"] = total - prop.get(f"available_parking_spaces_{v_type}", 0)
+                result.append(row)
+            return result
@@ -0,0 +1,108 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from bson import json_util
+
+# Fernet (AES-128-CBC + HMAC) from the cryptography package; without it the cache is disabled
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+KEY_ENV_VAR = "BMS_CREDENTIAL_CACHE_KEY" # Optional: supply the key from the environment instead of a key file
+
+
+class CredentialCache:
+    """Encrypted on-disk cache of successful logins: the user's bcrypt hash, role, property assignment
+    and property document, so returning users can still sign in while the database is unreachable.
+
+    The plaintext password is never stored; cached entries are verified with bcrypt like the database
+    hash. The key lives in KEY_ENV_VAR or a separate key file created with owner-only permissions."""
+    def __init__(self, path, key_path=None, offline_max_age_hours=72.0):
+        self.path = path
+        self.key_path = key_path or (os.path.splitext(path)[0] + ".key")
+        self.offline_max_age = timedelta(hours=offline_max_age_hours) # Oldest entry accepted when the database is unreachable
+        self._lock = threading.Lock()
+        self._fernet = None
+        if Fernet is None:
+            print("[WARN] cryptography not installed; credential cache disabled (pip install cryptography).")
+            return
+        try:
+            self._fernet = Fernet(self._load_key())
+        except Exception as e:
+            print(f"[ERROR] Credential cache disabled, cannot load key: {e}")
+
+    @property
+    def enabled(self):
+        return self._fernet is not None
+
+    def exists(self):
+        return self.enabled and os.path.exists(self.path)
+
+    def _load_key(self):
+        key = os.environ.get(KEY_ENV_VAR)
+        if key:
+            return key.encode('ascii')
+        if os.path.exists(self.key_path):
+            with open(self.key_path, 'rb') as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        os.makedirs(os.path.dirname(os.path.abspath(self.key_path)), exist_ok=True)
+        fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'rb') as f:
+                return json_util.loads(self._fernet.decrypt(f.read()).decode('utf-8'))
+        except (InvalidToken, ValueError) as e:
+            print(f"[WARN] Credential cache unreadable (wrong key or corrupted), ignoring it: {e}")
+            return {}
+
+    def _write_all(self, entries):
+        data = self._fernet.encrypt(json_util.dumps(entries).encode('utf-8'))
+        tmp_path = self.path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def get(self, username, max_age=None):
+        """Returns the cached entry for username if younger than max_age (default: offline_max_age), else None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._read_all().get(username)
+        if not entry:
+            return None
+        age = datetime.now() - entry.get('cached_at', datetime.min)
+        return entry if age <= (max_age or self.offline_max_age) else None
+
+    def store(self, username, password_hash, role, p_id, property_doc, p_ids=None):
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                entries = self._read_all()
+                entries[username] = {'password_hash': password_hash, 'role': role, 'p_id': p_id, 'p_ids': p_ids,
+                                     'property': property_doc, 'cached_at': datetime.now()}
+                self._write_all(entries)
+        except Exception as e:
+            print(f"[ERROR] Could not update credential cache: {e}")
+
+    def forget(self, username):
+        """Drops a user (e.g. after the database rejected them)."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                entries = self._read_all()
+                if entries.pop(username, None) is not None:
+                    self._write_all(entries)
+        except Exception as e:
+            print(f"[ERROR] Could not update credential cache: {e}")
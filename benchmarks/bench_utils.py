@@ -0,0 +1,8 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile (0-100) of an already sorted list; 0.0 for an empty one."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))]
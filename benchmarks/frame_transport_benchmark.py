@@ -0,0 +1,104 @@
+"""Compares handing frames to worker processes by pickling them with handing over SharedFramePool slots.
+
+Usage: python benchmarks/frame_transport_benchmark.py [--frames 300] [--workers 2] [--resolution 1920x1080]
+                                                      [--slots 8] [--work mean|preprocess]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+import numpy as np
+from camera.shared_frames import SharedFramePool
+
+_pool = None          # Worker side: the attached SharedFramePool
+_preprocessor = None
+
+
+def _work(frame, kind):
+    if kind == "preprocess":
+        h, w = frame.shape[:2]
+        return float(_preprocessor.process(frame[h // 2:h // 2 + 110, w // 3:w // 3 + 420]).mean())
+    return float(frame[::4, ::4].mean()) # Touches the frame without real work: measures the transport
+
+
+def _init_worker(spec, kind):
+    global _pool, _preprocessor
+    if spec is not None:
+        _pool = SharedFramePool.attach(spec)
+    if kind == "preprocess":
+        from ocr_services.preprocess import PlatePreprocessor
+        _preprocessor = PlatePreprocessor(profile="day")
+
+
+def _pickled_task(args):
+    frame, kind = args
+    return _work(frame, kind)
+
+
+def _shared_task(args):
+    ref, kind = args
+    try:
+        return _work(_pool.view(ref), kind)
+    finally:
+        _pool.release(ref)
+
+
+def run_pickled(frames, count, workers, kind):
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(None, kind)) as pool:
+        started = time.perf_counter()
+        tasks = ((frames[i % len(frames)], kind) for i in range(count))
+        for _ in pool.imap_unordered(_pickled_task, tasks, chunksize=1):
+            pass
+        return time.perf_counter() - started
+
+
+def run_shared(frames, count, workers, kind, slots):
+    frame_pool = SharedFramePool(slots=slots, slot_bytes=frames[0].nbytes)
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(frame_pool.spec(), kind)) as pool:
+            started = time.perf_counter()
+            # put() blocks while every slot is in use, so the producer never runs ahead of the workers
+            tasks = ((frame_pool.put(frames[i % len(frames)]), kind) for i in range(count))
+            for _ in pool.imap_unordered(_shared_task, tasks, chunksize=1):
+                pass
+            elapsed = time.perf_counter() - started
+        leaked = frame_pool.in_use()
+    finally:
+        frame_pool.close()
+    if leaked:
+        print(f"  [WARN] {leaked} slot(s) still referenced after the run")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--work", choices=("mean", "preprocess"), default="mean")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+    mb = frames[0].nbytes / (1024 * 1024)
+    print(f"{args.frames} frames of {width}x{height} ({mb:.1f} MB), {args.workers} worker process(es), work '{args.work}'\n")
+
+    results = {}
+    for label, run in (("pickled", lambda: run_pickled(frames, args.frames, args.workers, args.work)),
+                       (f"shared memory ({args.slots} slots)", lambda: run_shared(frames, args.frames, args.workers, args.work, args.slots))):
+        elapsed = run()
+        results[label] = elapsed
+        print(f"{label:<28} {elapsed:>7.2f} s  {args.frames / elapsed:>8.1f} frames/s  {args.frames * mb / elapsed:>8.0f} MB/s  "
+              f"{elapsed / args.frames * 1000:>6.2f} ms/frame")
+    pickled, shared = results.values()
+    print(f"\nShared memory: {pickled / shared:.1f}x the pickled throughput")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Reads a network camera (or a video file played back in real time) and reports fps, lag, jitter and stale frames.
+
+Usage: python benchmarks/network_camera_probe.py <rtsp-url|http-url|video-file> [--seconds 20] [--consumer-ms 40]
+
+A loopback RTSP stream for testing (with an RTSP server such as mediamtx on port 8554):
+    ffmpeg -re -stream_loop -1 -i lane.mp4 -c copy -f rtsp rtsp://127.0.0.1:8554/lane
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+from camera.network_source import NetworkCameraStream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--consumer-ms", type=float, default=40.0, help="How often the simulated preview takes a frame")
+    parser.add_argument("--transport", default="tcp", choices=("tcp", "udp"))
+    args = parser.parse_args()
+
+    stream = NetworkCameraStream(args.source, name="probe", transport=args.transport)
+    stream.start()
+    started = time.monotonic()
+    last_report = started
+    last_seq = 0
+    taken = 0
+    ages = []
+    try:
+        while time.monotonic() - started < args.seconds:
+            time.sleep(args.consumer_ms / 1000.0)
+            seq, frame, frame_time = stream.latest()
+            if frame is not None and seq != last_seq:
+                taken += 1
+                ages.append((time.monotonic() - frame_time) * 1000.0) # How old the frame was when the preview got it
+                last_seq = seq
+            if time.monotonic() - last_report >= 1.0:
+                h = stream.health()
+                print(f"{h['state']:<12} fps {h['fps']:>5.1f}  lag {h['lag_ms']:>7.1f} ms  jitter {h['jitter_ms']:>6.1f} ms  "
+                      f"stale dropped {h['dropped']:>5}  reconnects {h['reconnects']}")
+                last_report = time.monotonic()
+    finally:
+        stream.stop()
+
+    if ages:
+        ages.sort()
+        print(f"\n{taken} frames taken by the consumer; frame age avg {sum(ages) / len(ages):.1f} ms, "
+              f"p95 {ages[min(len(ages) - 1, int(len(ages) * 0.95))]:.1f} ms")
+    else:
+        print(f"\nNo frames received ({stream.last_error or 'no error reported'}).")
+
+
+if __name__ == "__main__":
+    main()
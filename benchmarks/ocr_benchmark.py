@@ -0,0 +1,200 @@
+"""Replays a labelled plate corpus through an OCR provider and reports accuracy and throughput.
+
+Corpus layout: a directory of captures (e.g. the app's ASSETS_DIR) plus a labels.csv with
+'filename,plate' rows. For the offline Vision stub, an optional '<image>.vision.json' sidecar
+holds recorded text annotations (a JSON list of strings, full text first). Images without one get
+annotations synthesised from the label: they count for latency/throughput only, never for accuracy.
+
+Usage: python benchmarks/ocr_benchmark.py <corpus_dir> --provider tesseract --concurrency 4
+       python benchmarks/ocr_benchmark.py <corpus_dir> --provider vision_stub --stub-latency-ms 250
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+from benchmarks.bench_utils import percentile
+from ocr_services.plate_format import compact_plate
+from ocr_services.registry import available_providers, create_provider
+
+
+def load_corpus(corpus_dir, labels_file=None):
+    """Returns a list of (image_path, ground_truth_plate)."""
+    labels_path = labels_file or os.path.join(corpus_dir, "labels.csv")
+    items = []
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].strip().lower() == 'filename':
+                continue # Skip header / malformed rows
+            path = os.path.join(corpus_dir, row[0].strip())
+            if os.path.exists(path):
+                items.append((path, row[1].strip().upper()))
+            else:
+                print(f"[WARN] Labelled image missing, skipped: {path}")
+    return items
+
+
+def levenshtein(a, b):
+    """Plain edit distance."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+# --- Offline stand-in for the Vision API ---
+class StubVisionClient:
+    """Answers text_detection from recorded/synthesised annotations, with simulated network latency."""
+    def __init__(self, corpus, latency_ms=0.0):
+        self.latency_s = latency_ms / 1000.0
+        self._annotations = {}
+        self.recorded = set() # Paths with a recorded sidecar; only these say anything about accuracy
+        for path, plate in corpus:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            sidecar = path + ".vision.json"
+            if os.path.exists(sidecar):
+                with open(sidecar, encoding='utf-8') as f:
+                    texts = json.load(f)
+                self.recorded.add(path)
+            else:
+                texts = [f"IND\n{plate}", plate] # Full text block, then the plate block
+            self._annotations[digest] = texts
+
+    def text_detection(self, image=None, image_context=None):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        texts = self._annotations.get(hashlib.sha1(image.content).hexdigest(), [])
+        return SimpleNamespace(
+            text_annotations=[SimpleNamespace(description=t) for t in texts],
+            error=SimpleNamespace(message=""),
+        )
+
+
+def build_service(provider, corpus, stub_latency_ms):
+    """Returns (service, scored): scored is the set of image paths whose accuracy means something (None: all)."""
+    if provider == 'vision_stub':
+        from ocr_services.google_vision import GoogleVisionOcr
+        from ocr_services.registry import MeteredOcr
+        client = StubVisionClient(corpus, stub_latency_ms)
+        return MeteredOcr('vision_stub', GoogleVisionOcr(client=client)), client.recorded
+    return create_provider(provider), None
+
+
+def run_benchmark(service, corpus, concurrency=1, scored=None):
+    """Runs every corpus image through service.detect_text. Returns a result dict;
+    accuracy only covers the paths in scored (all if None)."""
+    latencies, rows = [], []
+    lock = threading.Lock()
+
+    def one(item):
+        path, truth = item
+        started = time.perf_counter()
+        predicted = service.detect_text(path)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            rows.append((path, truth, predicted))
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for item in corpus: one(item)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, corpus))
+    wall = time.perf_counter() - started
+
+    exact, char_errors, char_total, failures = 0, 0, 0, 0
+    mistakes = []
+    for path, truth, predicted in rows:
+        failed = not predicted or predicted.startswith("OCR Failed")
+        failures += failed
+        if scored is not None and path not in scored:
+            continue
+        if failed:
+            predicted = ""
+        p, t = compact_plate(predicted), compact_plate(truth)
+        if p == t:
+            exact += 1
+        else:
+            mistakes.append((os.path.basename(path), truth, predicted))
+        char_errors += levenshtein(p, t)
+        char_total += max(len(t), 1)
+
+    lat = sorted(latencies)
+    n = len(rows)
+    n_scored = n if scored is None else sum(1 for path, _, _ in rows if path in scored)
+    return {
+        'images': n,
+        'scored': n_scored,
+        'exact_match': exact / n_scored if n_scored else None,
+        'cer': char_errors / char_total if char_total else None,
+        'failures': failures,
+        'p50_ms': percentile(lat, 50) * 1000, 'p90_ms': percentile(lat, 90) * 1000, 'p99_ms': percentile(lat, 99) * 1000,
+        'throughput': n / wall if wall > 0 else 0.0,
+        'concurrency': concurrency,
+        'mistakes': mistakes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--labels", help="Labels CSV (default: <corpus_dir>/labels.csv)")
+    parser.add_argument("--provider", default="tesseract", help=f"One of: {', '.join(available_providers() + ['vision_stub'])}")
+    parser.add_argument("--concurrency", type=int, nargs='+', default=[1], help="One or more concurrency levels to sweep")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated API latency for vision_stub")
+    parser.add_argument("--show-mistakes", type=int, default=10)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_dir, args.labels)
+    if not corpus:
+        print("No labelled images found."); return 1
+    service, scored = build_service(args.provider, corpus, args.stub_latency_ms)
+
+    results = []
+    print(f"Provider: {args.provider}   Images: {len(corpus)}")
+    if scored is not None:
+        if scored:
+            print(f"Accuracy over the {len(scored)} image(s) with a recorded .vision.json; "
+                  f"the other {len(corpus) - len(scored)} only count for latency.")
+        else:
+            print("No .vision.json sidecars: annotations are synthesised from the labels, so this run is LATENCY-ONLY.")
+    print(f"{'conc':>5} {'exact':>7} {'CER':>7} {'fail':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'img/s':>8}")
+    for concurrency in args.concurrency:
+        r = run_benchmark(service, corpus, concurrency, scored)
+        if scored is not None and r['scored'] != len(scored):
+            raise RuntimeError(f"Scored {r['scored']} image(s) but {len(scored)} have recorded annotations")
+        results.append(r)
+        exact = f"{r['exact_match']:>7.1%}" if r['exact_match'] is not None else f"{'n/a':>7}"
+        cer = f"{r['cer']:>7.3f}" if r['cer'] is not None else f"{'n/a':>7}"
+        print(f"{concurrency:>5} {exact} {cer} {r['failures']:>5} "
+              f"{r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['throughput']:>8.1f}")
+
+    if results and results[-1]['mistakes'] and args.show_mistakes:
+        print("\nSample mistakes (file, truth, predicted):")
+        for mistake in results[-1]['mistakes'][:args.show_mistakes]:
+            print("  " + ", ".join(mistake))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'provider': args.provider, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
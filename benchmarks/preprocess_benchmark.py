@@ -0,0 +1,87 @@
+"""Measures the per-image cost of PlatePreprocessor for every profile.
+
+Usage: python benchmarks/preprocess_benchmark.py [image_dir] [--repeat 50] [--target-height 96] [--save out_dir]
+
+Without image_dir it renders synthetic plates (tilted, dim and glaring variants). --save writes the
+processed images so the result can be checked by eye.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+import cv2
+import numpy as np
+from ocr_services.preprocess import PlatePreprocessor, PROFILES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def synthetic_plates():
+    """A few plate crops covering the cases the profiles are for: [(label, BGR image)]."""
+    plates = []
+    for label, background, ink, gain, angle in (("day", 235, 20, 1.0, 0), ("tilted", 235, 20, 1.0, 7),
+                                                ("night", 235, 20, 0.25, -3), ("ir_glare", 200, 40, 1.0, 2)):
+        img = np.full((110, 420, 3), background, np.uint8)
+        cv2.putText(img, "KL07AB1234", (12, 75), cv2.FONT_HERSHEY_SIMPLEX, 1.8, (ink, ink, ink), 5)
+        img = cv2.warpAffine(img, cv2.getRotationMatrix2D((210, 55), angle, 1.0), (420, 110), borderValue=(background,) * 3)
+        if label == "ir_glare":
+            # Monochrome sensor (identical channels) with a headlight hot spot
+            yy, xx = np.mgrid[0:110, 0:420]
+            spot = 120 * np.exp(-((xx - 300) ** 2 + (yy - 40) ** 2) / (2 * 45.0 ** 2))
+            gray = np.clip(img[:, :, 0] + spot + np.random.normal(0, 6, spot.shape), 0, 255).astype(np.uint8)
+            img = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        else:
+            img = np.clip(img.astype(np.float32) * gain + np.random.normal(0, 6, img.shape), 0, 255).astype(np.uint8)
+        plates.append((label, img))
+    return plates
+
+
+def load_images(image_dir):
+    images = []
+    for name in sorted(os.listdir(image_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(os.path.join(image_dir, name))
+            if img is not None:
+                images.append((name, img))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image_dir", nargs="?")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--target-height", type=int, default=96)
+    parser.add_argument("--save", help="Directory for the processed images")
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir) if args.image_dir else synthetic_plates()
+    if not images:
+        print(f"No images found in {args.image_dir}")
+        return
+    cv2.setNumThreads(1) # Per-frame cost on one core, as on a busy gate PC
+    sizes = sorted({f"{img.shape[1]}x{img.shape[0]}" for _, img in images})
+    print(f"{len(images)} image(s) ({', '.join(sizes[:4])}{'...' if len(sizes) > 4 else ''}), {args.repeat} repeats\n")
+    print(f"{'profile':<8} {'avg ms':>8} {'p95 ms':>8} {'max ms':>8}  chosen (auto)")
+
+    for profile in PROFILES:
+        pre = PlatePreprocessor(profile=profile, target_height=args.target_height)
+        timings, chosen = [], {}
+        for _ in range(args.repeat):
+            for label, img in images:
+                started = time.perf_counter()
+                out = pre.process(img)
+                timings.append((time.perf_counter() - started) * 1000)
+                chosen[label] = pre.last_profile
+                if args.save and _ == 0:
+                    os.makedirs(args.save, exist_ok=True)
+                    cv2.imwrite(os.path.join(args.save, f"{os.path.splitext(label)[0]}.{profile}.png"), out)
+        timings.sort()
+        picks = ", ".join(f"{k}->{v}" for k, v in chosen.items()) if profile == "auto" else ""
+        print(f"{profile:<8} {sum(timings) / len(timings):>8.2f} {timings[int(len(timings) * 0.95)]:>8.2f} {timings[-1]:>8.2f}  {picks}")
+
+
+if __name__ == "__main__":
+    main()
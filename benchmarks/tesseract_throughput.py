@@ -0,0 +1,66 @@
+"""Compares plates/second of TesseractOcr (subprocess per image) and PooledTesseractOcr (warm engines).
+
+Usage: python benchmarks/tesseract_throughput.py <image_dir> [--repeat 3] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+import cv2
+from ocr_services.tesseract import TesseractOcr
+from ocr_services.tesseract_pool import PooledTesseractOcr
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def list_images(image_dir):
+    return sorted(os.path.join(image_dir, f) for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def run(label, func, items, concurrency):
+    """Calls func on every item with the given concurrency; returns plates/second."""
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for item in items: func(item)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(func, items))
+    elapsed = time.perf_counter() - started
+    rate = len(items) / elapsed if elapsed > 0 else 0.0
+    print(f"{label:<44} {len(items):>6} plates  {elapsed:>8.2f} s  {rate:>8.1f} plates/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image_dir")
+    parser.add_argument("--repeat", type=int, default=3, help="Replay the image set this many times")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    paths = list_images(args.image_dir) * args.repeat
+    if not paths:
+        print(f"No images found in {args.image_dir}"); return 1
+    frames = [cv2.imread(p) for p in paths]
+
+    baseline = TesseractOcr()
+    pooled = PooledTesseractOcr(workers=args.workers)
+    pooled.detect_text_from_frame(frames[0]) # Warm one engine so start-up isn't billed to the first batch
+
+    base_rate = run("TesseractOcr.detect_text (serial)", baseline.detect_text, paths, 1)
+    run(f"TesseractOcr.detect_text ({args.workers} threads)", baseline.detect_text, paths, args.workers)
+    run("PooledTesseractOcr.detect_text (serial)", pooled.detect_text, paths, 1)
+    pool_rate = run(f"PooledTesseractOcr.detect_text_from_frame ({args.workers} thr)", pooled.detect_text_from_frame, frames, args.workers)
+    pooled.close()
+
+    if base_rate > 0:
+        print(f"Speed-up (pooled in-memory vs serial baseline): {pool_rate / base_rate:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Drives synthetic entry/exit traffic through the app's save path and reports how much one property can take.
+
+Vehicles arrive as a Poisson process (optionally following a daily profile), stay for a log-normal
+time and leave. Each simulated gate is a thread that, like a gate PC, saves the event (parking_ops),
+then re-reads the property and reloads the day's log. Events are stamped with simulated time, so the
+run itself goes as fast as the database allows.
+
+Usage: python benchmarks/traffic_simulator.py --vehicles 2000 --gates 4
+       python benchmarks/traffic_simulator.py --backend local --gates 1
+       python benchmarks/traffic_simulator.py --backend mongo --mongo-uri mongodb://localhost:27017 --gates 2
+"""
+import argparse
+import math
+import os
+import random
+import string
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Run from anywhere
+
+from benchmarks.bench_utils import percentile
+import parking_ops
+from storage.repository import BACKENDS, open_repository
+from storage.reconcile import SlotReconciler
+
+# Relative arrival rate per hour of day (busy mornings and evenings, quiet nights)
+DAILY_PROFILE = [0.1, 0.05, 0.05, 0.05, 0.1, 0.3, 0.8, 1.6, 2.2, 1.8, 1.2, 1.0,
+                 1.1, 1.0, 0.9, 1.0, 1.3, 1.9, 2.0, 1.5, 1.0, 0.6, 0.3, 0.2]
+STATES = ["MH", "KA", "KL", "TN", "DL", "GJ", "RJ", "UP", "WB", "AP"]
+
+
+class CountingCollection:
+    """Wraps a collection and counts calls per method (every call is one database round trip)."""
+    def __init__(self, collection, counter, lock):
+        self._collection = collection
+        self._counter = counter
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+        def counted(*args, **kwargs):
+            with self._lock:
+                self._counter[f"{self._collection.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+def random_plate(rng):
+    return f"{rng.choice(STATES)}-{rng.randint(1, 99):02d}-{''.join(rng.choices(string.ascii_uppercase, k=2))}-{rng.randint(0, 9999):04d}"
+
+
+def generate_events(rng, vehicles, per_hour, mean_stay_min, car_ratio, start, profile=True):
+    """Returns a time-ordered list of (sim_time, kind, vehicle) with kind 'entry' or 'exit'."""
+    events = []
+    t = start
+    peak = max(DAILY_PROFILE)
+    plates = set()
+    sigma = 0.8 # Spread of the log-normal stay
+    mu = math.log(mean_stay_min) - sigma ** 2 / 2
+    while len(plates) < vehicles:
+        t += timedelta(hours=rng.expovariate(per_hour * (peak if profile else 1.0)))
+        # Thinning: keep the arrival with probability profile(hour)/peak for a time-varying rate
+        if profile and rng.random() > DAILY_PROFILE[t.hour] / peak:
+            continue
+        plate = random_plate(rng)
+        if plate in plates:
+            continue
+        plates.add(plate)
+        vehicle = {'plate': plate, 'type': "Car" if rng.random() < car_ratio else "Bike",
+                   'entered': threading.Event(), 'admitted': False}
+        events.append((t, 'entry', vehicle))
+        events.append((t + timedelta(minutes=rng.lognormvariate(mu, sigma)), 'exit', vehicle))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def run_gate(events, parking_col, property_col, prop, results, lock, read_after_save):
+    for sim_time, kind, vehicle in events:
+        if kind == 'exit':
+            # Exits wait for their entry (possibly on another gate) so they are never out of order
+            vehicle['entered'].wait(30)
+            if not vehicle['admitted']:
+                continue # Turned away at entry (full / duplicate): nothing to exit
+        started = time.perf_counter()
+        if kind == 'entry':
+            result = parking_ops.record_entry(parking_col, property_col, prop, vehicle['plate'], vehicle['type'], sim_time)
+            vehicle['admitted'] = result.status in (parking_ops.ENTRY_SAVED, parking_ops.ENTRY_SAVED_NO_SLOT)
+            vehicle['entered'].set()
+        else:
+            result = parking_ops.record_exit(parking_col, property_col, prop, vehicle['plate'], sim_time)
+        if read_after_save:
+            # What the gate UI does after every save: refresh the property and the day's log
+            property_col.find_one({"_id": prop["_id"]})
+            parking_ops.load_log_records(parking_col, prop["_id"], kind == 'entry', sim_time.date())
+        elapsed = time.perf_counter() - started
+        with lock:
+            results['latency'][kind].append(elapsed)
+            results['status'][result.status] += 1
+
+
+def check_slots(parking_col, property_col, prop_id, capacity):
+    """Compares each stored available_parking_spaces_* with capacity minus the open records."""
+    prop = property_col.find_one({"_id": prop_id})
+    report = {}
+    for v_type, total in capacity.items():
+        key = v_type.lower()
+        open_count = parking_col.count_documents({"property_id": prop_id, "vehicle_type": v_type, "exit_time": None})
+        stored = prop.get(f"available_parking_spaces_{key}")
+        report[key] = {'capacity': total, 'open': open_count, 'available': stored, 'expected': total - open_count,
+                       'ok': stored == total - open_count and 0 <= stored <= total}
+    return report
+
+
+def connect(args):
+    repo = open_repository(args.backend, uri=args.mongo_uri, database=args.database, path=args.local_path)
+    if args.backend == 'mongo':
+        repo.ping()
+        repo.parking.create_index([("property_id", 1), ("vehicle_no", 1), ("exit_time", 1)])
+    return repo.parking, repo.properties, repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=BACKENDS, default="memory")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017", help="Use a local/test server, never production")
+    parser.add_argument("--database", default="bms_loadtest")
+    parser.add_argument("--local-path", default="bms_loadtest.db", help="SQLite file for --backend local")
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--gates", type=int, default=2, help="Concurrent simulated gates sharing one property")
+    parser.add_argument("--arrivals-per-hour", type=float, default=120.0, help="Mean arrival rate (before the daily profile)")
+    parser.add_argument("--flat", action="store_true", help="Constant arrival rate instead of the daily profile")
+    parser.add_argument("--mean-stay-min", type=float, default=90.0)
+    parser.add_argument("--car-ratio", type=float, default=0.6)
+    parser.add_argument("--car-slots", type=int, default=200)
+    parser.add_argument("--bike-slots", type=int, default=300)
+    parser.add_argument("--no-reads", action="store_true", help="Only the save itself, without the UI's refresh reads")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raw_parking, raw_property, repo = connect(args)
+    op_counts, op_lock = Counter(), threading.Lock()
+    parking_col = CountingCollection(raw_parking, op_counts, op_lock)
+    property_col = CountingCollection(raw_property, op_counts, op_lock)
+
+    capacity = {"Car": args.car_slots, "Bike": args.bike_slots}
+    prop = {"property_id": f"sim-{uuid.uuid4().hex[:8]}", "name": "Load Test Lot",
+            "parking_spaces_car": args.car_slots, "available_parking_spaces_car": args.car_slots,
+            "parking_spaces_bike": args.bike_slots, "available_parking_spaces_bike": args.bike_slots,
+            "fee_per_hour_car": 20.0, "fee_per_hour_bike": 10.0}
+    prop_id = raw_property.insert_one(prop).inserted_id
+
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    events = generate_events(rng, args.vehicles, args.arrivals_per_hour, args.mean_stay_min, args.car_ratio, start, not args.flat)
+    # Every event goes to a random gate, so a vehicle usually enters and leaves through different gates
+    per_gate = defaultdict(list)
+    for event in events:
+        per_gate[rng.randrange(args.gates)].append(event)
+
+    results = {'latency': {'entry': [], 'exit': []}, 'status': Counter()}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_gate, args=(per_gate[g], parking_col, property_col, prop, results, lock, not args.no_reads),
+                                name=f"gate-{g}") for g in range(args.gates)]
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - started
+
+    total_events = sum(len(v) for v in results['latency'].values())
+    sim_span_h = (events[-1][0] - events[0][0]).total_seconds() / 3600 if events else 0.0
+    print(f"Backend: {args.backend}   Gates: {args.gates}   Vehicles: {args.vehicles}   Simulated span: {sim_span_h:.1f} h")
+    print(f"Events processed: {total_events} in {wall:.2f}s -> {total_events / wall:.1f} events/s ({total_events / wall * 60:.0f}/min)")
+    print(f"{'kind':>6} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, values in results['latency'].items():
+        lat = sorted(values)
+        if lat:
+            print(f"{kind:>6} {len(lat):>7} {percentile(lat, 50) * 1000:>8.2f} {percentile(lat, 90) * 1000:>8.2f} "
+                  f"{percentile(lat, 99) * 1000:>8.2f} {lat[-1] * 1000:>8.2f}")
+    print("Outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(results['status'].items())))
+
+    with op_lock:
+        ops = dict(op_counts)
+    print(f"DB operations: {sum(ops.values())} ({sum(ops.values()) / max(total_events, 1):.2f} per event)")
+    for name, count in sorted(ops.items()):
+        print(f"  {name:<34} {count:>8} ({count / max(total_events, 1):.2f}/event)")
+
+    print("Slot counts:")
+    all_ok = True
+    for v_type, r in check_slots(raw_parking, raw_property, prop_id, capacity).items():
+        all_ok = all_ok and r['ok']
+        print(f"  {v_type:<5} capacity={r['capacity']} open={r['open']} available={r['available']} "
+              f"expected={r['expected']} {'OK' if r['ok'] else 'MISMATCH'}")
+    if not all_ok:
+        # What the app's scheduled reconciliation would do with this drift
+        result = SlotReconciler(raw_parking, raw_property).reconcile(prop_id, settle=False)
+        fixed = all(r['ok'] for r in check_slots(raw_parking, raw_property, prop_id, capacity).values())
+        print(f"Reconciliation: {result['seconds'] * 1000:.1f} ms, corrected {result['corrected'] or 'nothing'}, "
+              f"{'counts now OK' if fixed else 'STILL MISMATCHED'}")
+
+    if args.backend != 'memory':
+        raw_parking.delete_many({"property_id": prop_id})
+        raw_property.delete_many({"_id": prop_id})
+    repo.close()
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """The last `seconds` of one camera as JPEG frames, bounded by time and by max_mb.
+
+    push() is called from the camera's reader thread; frames are thinned to `fps`, downscaled to
+    max_width and compressed there, so the Tk thread never pays for it and memory stays bounded."""
+    def __init__(self, seconds=20.0, fps=10.0, max_width=960, quality=70, max_mb=32):
+        self.seconds = seconds
+        self.fps = fps
+        self.max_width = max_width
+        self.quality = quality
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._frames = deque() # (monotonic time, jpeg bytes)
+        self._bytes = 0
+        self._next_due = 0.0
+        self.encode_ms = 0.0   # Last encode time, for diagnostics
+
+    def push(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        if now < self._next_due:
+            return False
+        self._next_due = now + 1.0 / self.fps
+        started = time.perf_counter()
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return False
+        data = buf.tobytes()
+        with self._lock:
+            self._frames.append((now, data))
+            self._bytes += len(data)
+            while self._frames and (self._frames[0][0] < now - self.seconds or self._bytes > self.max_bytes):
+                self._bytes -= len(self._frames.popleft()[1])
+        self.encode_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    def frames_between(self, start, end):
+        """[(monotonic time, jpeg bytes)] with start <= time <= end, oldest first."""
+        with self._lock:
+            return [(t, data) for t, data in self._frames if start <= t <= end]
+
+    def stats(self):
+        with self._lock:
+            span = (self._frames[-1][0] - self._frames[0][0]) if len(self._frames) > 1 else 0.0
+            return {'frames': len(self._frames), 'mb': self._bytes / (1024 * 1024), 'seconds': span, 'encode_ms': self.encode_ms}
+
+
+class ClipWriter:
+    """Background encoder: turns the frames around a saved entry/exit into a short video under
+    <root>/YYYY/MM/DD/<parking_id>-<action>.mp4 and reports it through on_written(record)."""
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, root_dir, pre_seconds=8.0, post_seconds=4.0, fourcc="mp4v", extension="mp4",
+                 max_age_days=30, queue_size=16, on_written=None):
+        self.root_dir = root_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fourcc = fourcc
+        self.extension = extension.lstrip('.')
+        self.max_age_days = max_age_days
+        self.on_written = on_written # Called on the writer thread with the index record
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {'written': 0, 'dropped': 0, 'failed': 0, 'empty': 0, 'busy_s': 0.0}
+
+    # --- Lifecycle ---
+    def start(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="clip-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Writes queued clips without waiting for their post-event frames, then stops."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, ring, parking_id, plate, action, event_time=None):
+        """Queues a clip around event_time (time.monotonic(); default now). Never blocks; False if the queue is full."""
+        item = {'ring': ring, 'parking_id': parking_id, 'plate': plate, 'action': action,
+                'event_time': time.monotonic() if event_time is None else event_time, 'saved_at': datetime.now()}
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['dropped'] += 1
+            print(f"[WARN] Clip writer queue full, no clip for {plate} ({parking_id}).")
+            return False
+
+    def stats(self):
+        with self._stats_lock:
+            s = dict(self._stats)
+        s['queue_depth'] = self._queue.qsize()
+        return s
+
+    # --- Writer thread ---
+    def _run(self):
+        self._sweep()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            # Let the post-event frames arrive (skipped when stopping)
+            self._stop_event.wait(max(0.0, item['event_time'] + self.post_seconds - time.monotonic()))
+            started = time.perf_counter()
+            try:
+                self._write(item)
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats['failed'] += 1
+                print(f"[ERROR] Writing clip for {item.get('parking_id')}: {e}")
+            finally:
+                with self._stats_lock:
+                    self._stats['busy_s'] += time.perf_counter() - started
+
+    def _write(self, item):
+        ring = item['ring']
+        frames = ring.frames_between(item['event_time'] - self.pre_seconds, item['event_time'] + self.post_seconds)
+        if not frames:
+            with self._stats_lock:
+                self._stats['empty'] += 1
+            print(f"[WARN] No buffered frames for clip of {item['plate']} ({item['parking_id']}).")
+            return
+
+        day = item['saved_at']
+        rel_path = os.path.join(f"{day:%Y}", f"{day:%m}", f"{day:%d}", f"{item['parking_id']}-{item['action']}.{self.extension}")
+        abs_path = os.path.join(self.root_dir, rel_path)
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        tmp_path = f"{abs_path}.tmp.{self.extension}" # VideoWriter picks the container from the extension
+
+        writer = None
+        size = None
+        try:
+            for _, data in frames:
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    continue
+                if writer is None:
+                    size = (image.shape[1], image.shape[0])
+                    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*self.fourcc), ring.fps, size)
+                    if not writer.isOpened():
+                        raise IOError(f"Cannot open video writer for {tmp_path} (codec {self.fourcc})")
+                elif (image.shape[1], image.shape[0]) != size: # Camera resolution changed mid-clip
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                writer.write(image)
+        finally:
+            if writer is not None:
+                writer.release()
+        os.replace(tmp_path, abs_path)
+
+        record = {
+            'parking_id': item['parking_id'], 'plate': item['plate'], 'action': item['action'],
+            'path': rel_path.replace(os.sep, '/'), 'frames': len(frames), 'bytes': os.path.getsize(abs_path),
+            'seconds': round(frames[-1][0] - frames[0][0], 2), 'offset_s': round(frames[0][0] - item['event_time'], 2),
+            'saved_at': day.isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(self.root_dir, self.INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+        with self._stats_lock:
+            self._stats['written'] += 1
+
+        if callable(self.on_written):
+            try:
+                self.on_written(record)
+            except Exception as e:
+                print(f"[WARN] Clip written but not linked to {item['parking_id']}: {e}")
+
+    def _sweep(self):
+        """Deletes day folders older than max_age_days (0 keeps everything)."""
+        if not self.max_age_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).strftime("%Y/%m/%d")
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(self.root_dir, topdown=False):
+            rel = os.path.relpath(dirpath, self.root_dir).replace(os.sep, '/')
+            if rel.count('/') != 2 or rel >= cutoff:
+                continue
+            for name in filenames:
+                try:
+                    os.remove(os.path.join(dirpath, name))
+                    removed += 1
+                except OSError:
+                    pass
+            try: os.rmdir(dirpath)
+            except OSError: pass
+        if removed:
+            print(f"[INFO] Clip retention: deleted {removed} clip(s) older than {self.max_age_days} days.")
@@ -0,0 +1,248 @@
+import sys
+import threading
+import time
+import cv2
+
+
+class CameraStream:
+    """Keeps one capture device open and reading on a background thread, reconnecting with backoff."""
+    OPENING, STREAMING, RECONNECTING, STOPPED = "opening", "streaming", "reconnecting", "stopped"
+
+    def __init__(self, source, name=None, stale_after_s=2.0, max_read_failures=10,
+                 reconnect_delay_s=0.5, max_reconnect_delay_s=10.0, profile=None):
+        self.source = source                        # Device index (later: stream URL)
+        self.name = name or f"Camera {source}"
+        self.profile = profile                      # CameraProfile (camera/profiles.py); None keeps driver defaults
+        self.stale_after_s = stale_after_s          # A frame older than this means the stream is not live
+        self.max_read_failures = max_read_failures  # Consecutive failed reads before reopening the device
+        self.reconnect_delay_s = reconnect_delay_s
+        self.max_reconnect_delay_s = max_reconnect_delay_s
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_seq = 0     # Increments on every new frame so consumers can skip repeats
+        self._frame_time = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.refs = 0           # Managed by CameraManager
+        self.clip_ring = None   # Optional FrameRing (camera/clip_buffer.py), fed from this thread
+        # Full-resolution stills are taken by the reader thread between preview frames (see grab_still)
+        self._still_lock = threading.Lock()
+        self._still_request = threading.Event()
+        self._still_ready = threading.Event()
+        self._still = None
+        self.mode = None        # Negotiated preview mode {'fourcc', 'width', 'height', 'fps'}
+
+        self.state = self.STOPPED
+        self.last_error = None
+        self.reconnects = 0
+        self.fps = 0.0
+        self._fps_count = 0
+        self._fps_window_start = 0.0
+
+    # --- Lifecycle ---
+    def start(self):
+        """Starts the reader thread (returns immediately; opening happens in the background)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.state = self.OPENING
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stops the reader thread and releases the device."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self.state = self.STOPPED
+        with self._lock:
+            self._frame = None
+
+    def _open_capture(self):
+        """Opens the underlying cv2.VideoCapture. Subclasses override for other source types."""
+        cap_api = cv2.CAP_DSHOW if sys.platform == 'win32' else cv2.CAP_ANY
+        cap = cv2.VideoCapture(self.source, cap_api)
+        if self.profile is not None and cap.isOpened():
+            self.mode = self.profile.apply(cap)
+            print(f"[INFO] Camera {self.name}: preview {self.mode['width']}x{self.mode['height']} "
+                  f"{self.mode['fourcc']} @ {self.mode['fps']} fps")
+        return cap
+
+    def _read(self, cap):
+        """Reads one frame from an open capture. Returns (ok, frame)."""
+        return cap.read()
+
+    def _run(self):
+        delay = self.reconnect_delay_s
+        while not self._stop_event.is_set():
+            cap = None
+            try:
+                cap = self._open_capture()
+                if cap is None or not cap.isOpened():
+                    raise IOError(f"Cannot open {self.name}")
+
+                failures = 0
+                while not self._stop_event.is_set():
+                    if self._still_request.is_set():
+                        self._take_still(cap)
+                    ok, frm = self._read(cap)
+                    if not ok or frm is None:
+                        failures += 1
+                        if failures >= self.max_read_failures:
+                            raise IOError(f"{failures} consecutive read failures")
+                        time.sleep(0.02)
+                        continue
+                    failures = 0
+                    delay = self.reconnect_delay_s # Healthy again, reset the backoff
+                    self._publish(frm)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[WARN] Camera {self.name}: {e}")
+            finally:
+                if cap is not None:
+                    try: cap.release()
+                    except Exception: pass
+
+            if self._stop_event.is_set():
+                break
+            # Reconnect with exponential backoff, without blocking anyone
+            self.state = self.RECONNECTING
+            self.reconnects += 1
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay_s)
+            if not self._stop_event.is_set():
+                self.state = self.OPENING
+
+    def _publish(self, frm):
+        now = time.monotonic()
+        with self._lock:
+            self._frame = frm
+            self._frame_seq += 1
+            self._frame_time = now
+        self.state = self.STREAMING
+        if self.clip_ring is not None:
+            try:
+                self.clip_ring.push(frm, now)
+            except Exception as e:
+                print(f"[WARN] Camera {self.name}: clip buffer: {e}")
+                self.clip_ring = None
+        # FPS over roughly one-second windows
+        if self._fps_window_start == 0.0:
+            self._fps_window_start = now
+        self._fps_count += 1
+        if now - self._fps_window_start >= 1.0:
+            self.fps = self._fps_count / (now - self._fps_window_start)
+            self._fps_count = 0
+            self._fps_window_start = now
+
+    def _take_still(self, cap):
+        """Reader thread: switches to the still size, keeps the first settled frame, switches back."""
+        still = None
+        try:
+            self.profile.apply_still(cap)
+            for _ in range(self.profile.still_warmup_frames + 1):
+                ok, frm = self._read(cap)
+                if ok and frm is not None:
+                    still = frm
+        except Exception as e:
+            print(f"[WARN] Camera {self.name}: still capture failed: {e}")
+        finally:
+            try:
+                # The whole profile, not just the size: some drivers drop back to YUYV when the size changes
+                previous = self.mode
+                self.mode = self.profile.apply(cap)
+                if previous and self.mode != previous:
+                    print(f"[WARN] Camera {self.name}: preview mode after still is {self.mode['width']}x{self.mode['height']} "
+                          f"{self.mode['fourcc']} @ {self.mode['fps']} fps (was {previous['fourcc']})")
+            except Exception as e:
+                print(f"[WARN] Camera {self.name}: could not restore preview mode: {e}")
+            self._still = still
+            self._still_request.clear()
+            self._still_ready.set()
+
+    # --- Consumer API ---
+    def grab_still(self, timeout=None):
+        """Full-resolution frame for OCR/evidence, or None if the profile has no still mode, the stream is
+        not live or the switch took longer than timeout (callers then use the newest preview frame)."""
+        if self.profile is None or self.profile.still_size is None or not self.is_streaming():
+            return None
+        timeout = self.profile.still_timeout_s if timeout is None else timeout
+        with self._still_lock:
+            self._still = None
+            self._still_ready.clear()
+            self._still_request.set()
+            if not self._still_ready.wait(timeout):
+                self._still_request.clear()
+                return None
+            return self._still
+
+    def latest(self):
+        """Returns (seq, frame, monotonic_timestamp) of the newest frame; frame is None until one arrives."""
+        with self._lock:
+            return self._frame_seq, self._frame, self._frame_time
+
+    def is_streaming(self):
+        """True if the device is open and delivered a frame recently."""
+        with self._lock:
+            fresh = self._frame is not None and (time.monotonic() - self._frame_time) < self.stale_after_s
+        return self.state == self.STREAMING and fresh
+
+    def health(self):
+        """Snapshot for status displays."""
+        with self._lock:
+            age = (time.monotonic() - self._frame_time) if self._frame is not None else None
+        return {
+            'name': self.name, 'source': self.source, 'state': self.state, 'live': self.is_streaming(),
+            'fps': round(self.fps, 1), 'frame_age_s': round(age, 2) if age is not None else None,
+            'reconnects': self.reconnects, 'last_error': self.last_error, 'mode': self.mode,
+            'clip_buffer': self.clip_ring.stats() if self.clip_ring is not None else None,
+        }
+
+
+class CameraManager:
+    """Shares one CameraStream per source between tabs and keeps them running until released."""
+    def __init__(self, stream_factory=CameraStream, ring_factory=None, profile_for=None):
+        self._stream_factory = stream_factory
+        self._profile_for = profile_for   # source -> CameraProfile, or None for driver defaults
+        self._ring_factory = ring_factory # Gives each new stream a clip FrameRing if set
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, source, name=None):
+        """Returns a started stream for source, opening it on first use."""
+        with self._lock:
+            stream = self._streams.get(source)
+            if stream is None:
+                profile = self._profile_for(source) if self._profile_for is not None else None
+                stream = self._stream_factory(source, name=name, profile=profile)
+                if self._ring_factory is not None:
+                    stream.clip_ring = self._ring_factory()
+                self._streams[source] = stream
+            stream.refs += 1
+        stream.start()
+        return stream
+
+    def release(self, stream):
+        """Drops one reference; the device is closed when nobody uses it any more."""
+        if stream is None:
+            return
+        with self._lock:
+            stream.refs -= 1
+            if stream.refs > 0:
+                return
+            self._streams.pop(stream.source, None)
+        stream.stop()
+
+    def health(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        return [s.health() for s in streams]
+
+    def close_all(self):
+        with self._lock:
+            streams = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.stop()
@@ -0,0 +1,112 @@
+import time
+import cv2
+import numpy as np
+
+
+def parse_roi(roi_str):
+    """Parses 'x1,y1,x2,y2' (fractions of the frame, 0-1) into a tuple. Falls back to the full frame."""
+    try:
+        x1, y1, x2, y2 = [float(v) for v in roi_str.split(',')]
+        if not (0.0 <= x1 < x2 <= 1.0 and 0.0 <= y1 < y2 <= 1.0):
+            raise ValueError("ROI values must satisfy 0 <= x1 < x2 <= 1 and 0 <= y1 < y2 <= 1")
+        return (x1, y1, x2, y2)
+    except Exception as e:
+        print(f"[WARN] Invalid auto-trigger ROI '{roi_str}' ({e}). Using full frame.")
+        return (0.0, 0.0, 1.0, 1.0)
+
+
+class MotionTrigger:
+    """Detects a vehicle arriving and stopping inside a region of interest using cheap frame differencing."""
+    ## State machine: EMPTY -> ARRIVING (presence, still moving) -> PARKED (fired once) -> EMPTY (lane cleared)
+    EMPTY, ARRIVING, PARKED = "empty", "arriving", "parked"
+
+    def __init__(self, roi=(0.0, 0.0, 1.0, 1.0), process_width=160, sample_every=3,
+                 presence_threshold=0.08, motion_threshold=0.01, still_frames=5,
+                 clear_frames=10, cooldown_s=3.0, background_rate=0.05):
+        self.roi = roi
+        self.process_width = process_width          # Frames are downscaled to this width before any work
+        self.sample_every = max(1, sample_every)    # Only every Nth preview frame is analysed
+        self.presence_threshold = presence_threshold  # Fraction of ROI pixels differing from the empty background
+        self.motion_threshold = motion_threshold    # Fraction of ROI pixels changing between samples
+        self.still_frames = still_frames            # Consecutive still samples before firing
+        self.clear_frames = clear_frames            # Consecutive empty samples before re-arming
+        self.cooldown_s = cooldown_s                # Minimum time between two triggers
+        self.background_rate = background_rate      # Learning rate for the empty-lane background model
+        self.reset()
+
+    def reset(self):
+        """Forgets the background model and re-arms the trigger."""
+        self.state = self.EMPTY
+        self._background = None
+        self._previous = None
+        self._frame_counter = 0
+        self._still_count = 0
+        self._clear_count = 0
+        self._last_fire = 0.0
+
+    def _prepare(self, frame):
+        """Downscales, crops to the ROI and blurs a BGR frame. Returns a small float32 grayscale image."""
+        h, w = frame.shape[:2]
+        scale = self.process_width / float(w) if w > self.process_width else 1.0
+        small = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        sh, sw = small.shape[:2]
+        x1, y1, x2, y2 = self.roi
+        crop = small[int(y1 * sh):max(int(y2 * sh), int(y1 * sh) + 1), int(x1 * sw):max(int(x2 * sw), int(x1 * sw) + 1)]
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        return gray.astype(np.float32)
+
+    @staticmethod
+    def _changed_fraction(a, b, pixel_delta=25.0):
+        """Fraction of pixels whose absolute difference exceeds pixel_delta."""
+        return float(np.count_nonzero(cv2.absdiff(a, b) > pixel_delta)) / a.size
+
+    def update(self, frame):
+        """Feeds one preview frame. Returns True exactly once per stopped vehicle."""
+        self._frame_counter += 1
+        if frame is None or self._frame_counter % self.sample_every != 0:
+            return False
+
+        current = self._prepare(frame)
+        if self._background is None or self._background.shape != current.shape:
+            # First sample (or ROI/resolution change): assume the lane is empty
+            self._background = current.copy()
+            self._previous = current
+            return False
+
+        presence = self._changed_fraction(current, self._background)
+        motion = self._changed_fraction(current, self._previous)
+        self._previous = current
+        fired = False
+
+        if self.state == self.EMPTY:
+            if presence >= self.presence_threshold:
+                self.state = self.ARRIVING
+                self._still_count = 0
+            elif motion < self.motion_threshold:
+                # Slowly adapt the background to lighting changes while the lane is empty and still
+                cv2.accumulateWeighted(current, self._background, self.background_rate)
+
+        elif self.state == self.ARRIVING:
+            if presence < self.presence_threshold:
+                self.state = self.EMPTY  # Vehicle drove through without stopping
+            elif motion < self.motion_threshold:
+                self._still_count += 1
+                if self._still_count >= self.still_frames and (time.monotonic() - self._last_fire) >= self.cooldown_s:
+                    self.state = self.PARKED
+                    self._clear_count = 0
+                    self._last_fire = time.monotonic()
+                    fired = True
+            else:
+                self._still_count = 0
+
+        elif self.state == self.PARKED:
+            # Stay quiet until the lane has been empty for a while, so one vehicle gives one capture
+            if presence < self.presence_threshold:
+                self._clear_count += 1
+                if self._clear_count >= self.clear_frames:
+                    self.state = self.EMPTY
+            else:
+                self._clear_count = 0
+
+        return fired
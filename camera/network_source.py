@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+import cv2
+from camera.manager import CameraStream
+
+
+def is_network_source(source):
+    """True for stream URLs and video files (anything that is not a local device index)."""
+    return isinstance(source, str) and not source.isdigit()
+
+
+class NetworkCameraStream(CameraStream):
+    """RTSP/HTTP (or video file) camera that always hands out the newest frame.
+
+    FFmpeg keeps decoding into its own buffer while a reader is busy, so a naive read() loop falls
+    seconds behind. Here the reader grab()s without decoding until a grab has to wait for the network
+    (the buffer is empty) and only then decodes, so stale frames are dropped instead of displayed.
+    Video files are played back at their own frame rate and looped, standing in for a live camera in tests."""
+    def __init__(self, source, name=None, transport="tcp", open_timeout_s=5.0, read_timeout_s=5.0,
+                 max_drain=30, loop_file=True, **kwargs):
+        kwargs.pop('profile', None) # Resolution/FOURCC can't be negotiated over RTSP; the camera's own settings apply
+        kwargs.setdefault('max_read_failures', 2) # A failed grab already waited read_timeout_s; reconnect soon after
+        super().__init__(source, name=name, **kwargs)
+        self.transport = transport
+        self.open_timeout_s = open_timeout_s
+        self.read_timeout_s = read_timeout_s
+        self.max_drain = max_drain            # Most buffered frames skipped before decoding one anyway
+        self.is_file = os.path.isfile(source)
+        self.loop_file = loop_file
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        with self._metrics_lock:
+            self.dropped = 0           # Frames grabbed but never decoded (stale)
+            self.jitter_ms = 0.0       # RFC 3550-style smoothed inter-arrival jitter
+            self.lag_ms = 0.0          # How far behind the stream clock this reader is, above the best seen since connect
+            self._last_arrival = None
+            self._last_interval = None
+            self._min_offset = None
+            self._file_due = None
+
+    # --- Capture ---
+    def _open_capture(self):
+        if not self.is_file and self.source.lower().startswith("rtsp") and "OPENCV_FFMPEG_CAPTURE_OPTIONS" not in os.environ:
+            # Process-wide FFmpeg options, read when a capture opens: no input buffering, prefer TCP (no smeared frames)
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = f"rtsp_transport;{self.transport}|fflags;nobuffer|flags;low_delay"
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.open_timeout_s * 1000),
+                  cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.read_timeout_s * 1000)]
+        cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG, params)
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._reset_metrics()
+        return cap
+
+    def _read(self, cap):
+        if self.is_file:
+            return self._read_file(cap)
+        # Skip whatever is already buffered: a grab that returns this fast did not wait for the camera
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        waited_for = 0.5 / fps if 0 < fps < 240 else 0.02
+        skipped = 0
+        while True:
+            started = time.perf_counter()
+            if not cap.grab():
+                return False, None
+            if time.perf_counter() - started >= waited_for or skipped >= self.max_drain:
+                break
+            skipped += 1
+        ok, frm = cap.retrieve()
+        if ok:
+            self._record_arrival(cap, skipped)
+        return ok, frm
+
+    def _read_file(self, cap):
+        """Plays a file in real time: frames whose time has passed are skipped like stale network frames."""
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        now = time.perf_counter()
+        if self._file_due is None:
+            self._file_due = now
+        if self._file_due > now:
+            time.sleep(self._file_due - now)
+        skipped = 0
+        while True:
+            if not cap.grab():
+                if not self.loop_file:
+                    return False, None
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                if not cap.grab():
+                    return False, None
+            self._file_due += 1.0 / fps
+            if self._file_due >= time.perf_counter() or skipped >= self.max_drain:
+                break
+            skipped += 1
+        ok, frm = cap.retrieve()
+        if ok:
+            self._record_arrival(cap, skipped)
+        return ok, frm
+
+    def _record_arrival(self, cap, skipped):
+        now = time.perf_counter()
+        position_s = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 # Presentation time of the decoded frame
+        with self._metrics_lock:
+            self.dropped += skipped
+            if self._last_arrival is not None:
+                interval = now - self._last_arrival
+                if self._last_interval is not None:
+                    self.jitter_ms += (abs(interval - self._last_interval) * 1000.0 - self.jitter_ms) / 16.0
+                self._last_interval = interval
+            self._last_arrival = now
+            if position_s > 0 and not self.is_file:
+                offset = now - position_s # Grows when frames arrive later than the stream clock says they should
+                if self._min_offset is None or offset < self._min_offset:
+                    self._min_offset = offset
+                self.lag_ms = (offset - self._min_offset) * 1000.0
+
+    # --- Consumer API ---
+    def health(self):
+        info = super().health()
+        with self._metrics_lock:
+            info.update({'dropped': self.dropped, 'jitter_ms': round(self.jitter_ms, 1), 'lag_ms': round(self.lag_ms, 1)})
+        return info
+
+
+def camera_stream_factory(**network_options):
+    """stream_factory for CameraManager: device indices open as CameraStream, URLs and files as NetworkCameraStream."""
+    def create(source, name=None, profile=None):
+        if is_network_source(source):
+            return NetworkCameraStream(source, name=name, **network_options)
+        return CameraStream(source, name=name, profile=profile)
+    return create
+
+
+def load_network_cameras(config):
+    """[(url, name)] from the [NetworkCameras] section ("Lane 3 Entry = rtsp://..."; configparser lowercases keys, so names are title-cased)."""
+    if not config.has_section('NetworkCameras'):
+        return []
+    return [(url.strip(), name.strip().title()) for name, url in config.items('NetworkCameras', raw=True)
+            if url.strip() and name not in config.defaults()]
@@ -0,0 +1,85 @@
+import cv2
+
+
+def _size(text):
+    """'1280x720' -> (1280, 720); empty or '0' -> None (leave the driver default)."""
+    text = (text or '').strip().lower()
+    if text in ('', '0', 'default'):
+        return None
+    width, height = text.split('x')
+    return int(width), int(height)
+
+
+class CameraProfile:
+    """How to open one capture device: FOURCC, a preview mode for the live feed and an optional still mode for captures.
+
+    Most USB cameras send uncompressed YUYV unless MJPG is requested, which caps them at a low fps at
+    higher resolutions; with MJPG the preview can run small and fast while captures switch to full resolution."""
+    def __init__(self, fourcc="MJPG", preview_size=(1280, 720), preview_fps=25, still_size=None,
+                 still_warmup_frames=3, still_timeout_s=1.5, buffer_size=1):
+        self.fourcc = fourcc
+        self.preview_size = preview_size
+        self.preview_fps = preview_fps
+        self.still_size = still_size                # None: captures use the preview frame
+        self.still_warmup_frames = still_warmup_frames # Frames dropped after a mode switch (exposure/driver settling)
+        self.still_timeout_s = still_timeout_s
+        self.buffer_size = buffer_size
+
+    @classmethod
+    def from_config(cls, section):
+        """Builds a profile from a configparser section (or mapping proxy) with [Camera]-style keys."""
+        return cls(
+            fourcc=section.get('fourcc', 'MJPG').strip() or None,
+            preview_size=_size(section.get('preview_resolution', '1280x720')),
+            preview_fps=float(section.get('preview_fps', '25') or 0),
+            still_size=_size(section.get('still_resolution', '')),
+            still_warmup_frames=int(section.get('still_warmup_frames', '3')),
+            still_timeout_s=float(section.get('still_timeout_seconds', '1.5')),
+            buffer_size=int(section.get('buffer_size', '1')),
+        )
+
+    def apply(self, cap):
+        """Negotiates FOURCC, preview size and fps on an open capture. Returns what the driver actually chose."""
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc)) # Before the size: some drivers reset it
+        self.apply_size(cap, self.preview_size)
+        if self.preview_fps:
+            cap.set(cv2.CAP_PROP_FPS, self.preview_fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size) # Don't queue stale frames behind a slow reader
+        return self.negotiated(cap)
+
+    def apply_still(self, cap):
+        """Switches an open capture to the still size (FOURCC first again, as in apply())."""
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        self.apply_size(cap, self.still_size)
+
+    @staticmethod
+    def apply_size(cap, size):
+        if size is not None:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+
+    @staticmethod
+    def negotiated(cap):
+        code = int(cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code > 0 else "?"
+        return {'fourcc': fourcc, 'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), 'fps': round(cap.get(cv2.CAP_PROP_FPS), 1)}
+
+
+def load_profiles(config):
+    """Returns profile_for(source): the [Camera:<source>] section for that device (e.g. [Camera:0]) if present, else [Camera]."""
+    default_section = config['Camera'] if config.has_section('Camera') else {}
+    default = CameraProfile.from_config(default_section)
+    overrides = {}
+    for name in config.sections():
+        if name.startswith('Camera:') and name[7:].strip():
+            merged = dict(default_section)
+            merged.update(config[name])
+            overrides[name[7:].strip()] = CameraProfile.from_config(merged)
+
+    def profile_for(source):
+        return overrides.get(str(source), default)
+    return profile_for
@@ -0,0 +1,119 @@
+import multiprocessing
+import sys
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+
+# What crosses a pipe instead of the pixels: a few dozen bytes however large the frame is
+FrameRef = namedtuple("FrameRef", "slot seq shape dtype")
+
+
+def _attach(name):
+    """Opens an existing block without letting this process's resource tracker unlink it on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+    # Children of the owner (Pool/Process, fork or spawn) share its tracker: registering again is a no-op there,
+    # and unregistering would drop the owner's entry. Only an unrelated process has a tracker of its own.
+    shared_tracker = getattr(resource_tracker._resource_tracker, '_fd', None) is not None
+    shm = shared_memory.SharedMemory(name=name)
+    if not shared_tracker:
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+class SharedFramePool:
+    """Fixed set of frame-sized slots in shared memory, reference counted across processes.
+
+    The owner (camera/reader side) copies a frame in once with put() and passes the returned FrameRef to
+    worker processes; they map the same memory with view() (no copy, no pickling) and release() when done.
+    A slot is reused only when its count is back to 0, and put() waits (up to timeout) while all slots
+    are busy, which bounds memory and applies back-pressure. Workers get the pool via spec()/attach();
+    the lock and semaphore inside the spec must reach them at process start (Process args, Pool initargs),
+    and come from the same start-method context as the workers (pass context= for 'spawn')."""
+    def __init__(self, slots=8, slot_bytes=1920 * 1080 * 3, context=None, _spec=None):
+        if _spec is None:
+            self.slots = slots
+            self.slot_bytes = slot_bytes
+            self._data = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+            self._meta_shm = shared_memory.SharedMemory(create=True, size=slots * 2 * 8)
+            context = context or multiprocessing.get_context()
+            self._lock = context.Lock()
+            self._free = context.Semaphore(slots)
+            self.owner = True
+        else:
+            data_name, meta_name, self.slots, self.slot_bytes, self._lock, self._free = _spec
+            self._data = _attach(data_name)
+            self._meta_shm = _attach(meta_name)
+            self.owner = False
+        self._meta = np.ndarray((self.slots, 2), dtype=np.int64, buffer=self._meta_shm.buf) # [refs, seq] per slot
+        if self.owner:
+            self._meta[:] = 0
+
+    def spec(self):
+        """Picklable description for attach() in another process."""
+        return (self._data.name, self._meta_shm.name, self.slots, self.slot_bytes, self._lock, self._free)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(_spec=spec)
+
+    # --- Producer ---
+    def put(self, frame, timeout=None):
+        """Copies frame into a free slot (count 1, held by the caller). Returns a FrameRef, or None if no
+        slot freed up within timeout. Raises ValueError for frames larger than a slot."""
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+        if not self._free.acquire(timeout=timeout):
+            return None
+        with self._lock:
+            free = np.flatnonzero(self._meta[:, 0] == 0)
+            slot = int(free[0])
+            self._meta[slot, 0] = 1
+            self._meta[slot, 1] += 1
+            seq = int(self._meta[slot, 1])
+        target = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._data.buf, offset=slot * self.slot_bytes)
+        target[...] = frame
+        return FrameRef(slot, seq, frame.shape, frame.dtype.str)
+
+    # --- Any process ---
+    def retain(self, ref):
+        """Adds a holder (e.g. before handing the same frame to a second worker)."""
+        with self._lock:
+            self._check(ref)
+            self._meta[ref.slot, 0] += 1
+
+    def release(self, ref):
+        """Drops a holder; the slot becomes free when the last one releases."""
+        with self._lock:
+            self._check(ref)
+            self._meta[ref.slot, 0] -= 1
+            freed = self._meta[ref.slot, 0] == 0
+        if freed:
+            self._free.release()
+
+    def view(self, ref):
+        """Zero-copy numpy view of a held frame. Valid until the caller's release(); copy() to keep it longer."""
+        self._check(ref)
+        return np.ndarray(ref.shape, dtype=np.dtype(ref.dtype), buffer=self._data.buf, offset=ref.slot * self.slot_bytes)
+
+    def _check(self, ref):
+        if self._meta[ref.slot, 1] != ref.seq or self._meta[ref.slot, 0] <= 0:
+            raise ValueError(f"Stale FrameRef for slot {ref.slot} (already released and reused)")
+
+    def in_use(self):
+        with self._lock:
+            return int(np.count_nonzero(self._meta[:, 0]))
+
+    def close(self):
+        """Detaches this process; the owner also frees the shared memory (workers must be done with it)."""
+        self._meta = None
+        self._meta_shm.close()
+        self._data.close()
+        if self.owner:
+            self._meta_shm.unlink()
+            self._data.unlink()
@@ -0,0 +1,212 @@
+import atexit
+import io
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+_LEVEL_PREFIX = re.compile(r'^\s*(?:\d\d:\d\d:\d\d\s+)?\[(\w+)\]\s*') # "[WARN] ..." or "12:00:01 [SAVE] ..."
+_STOP = object()
+_URGENT_LEVELS = ('ERROR', 'FATAL', 'CRITICAL') # Echoed synchronously, not via the writer thread
+
+
+class EventLog:
+    """Structured JSON-lines log written by one background thread.
+
+    log() never blocks: records go into a bounded queue and are counted in `dropped` when it is full.
+    The writer appends to `path`, echoes a readable line to the console, and rotates the file when it
+    reaches max_bytes or a new rotate_hours period starts, keeping backup_count old files."""
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, rotate_hours=24.0, backup_count=14,
+                 queue_size=10000, echo=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_hours * 3600
+        self.backup_count = backup_count
+        self.echo = echo
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._counter_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._file = None
+        self._period = None
+        self._rotate_held = None # Period in which a rotation failed; size rotation waits for the next one
+        self._console = (sys.stdout, sys.stderr) # The real streams, before capture_console() replaces them
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    # --- Producers (any thread) ---
+    def log(self, level, message, **fields):
+        """Queues one record; extra fields (lane, plate, stage, latency_ms, ...) are stored as given."""
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'level': level.upper(), 'msg': message}
+        record.update((k, v) for k, v in fields.items() if v is not None)
+        self._submit(record, f"{datetime.now():%H:%M:%S} [{record['level']}] {message}", 0)
+
+    def _submit(self, record, text, stream):
+        if self.echo and (stream == 1 or record['level'] in _URGENT_LEVELS):
+            # Written through at once: the process may be about to die, and the writer thread with it
+            self._echo(self._console[1], text)
+            stream = None
+        self._put((record, text, stream))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+
+    def capture_console(self):
+        """Routes print() and stderr output through the log, so a slow console only ever blocks the writer thread.
+
+        Errors and stderr (tracebacks) are still echoed straight to the real stderr, and an atexit handler
+        drains the queue, so a crash or an early sys.exit() loses neither."""
+        sys.stdout = _ConsoleBridge(self, 0, "INFO")
+        sys.stderr = _ConsoleBridge(self, 1, "ERROR")
+        atexit.register(self.close)
+
+    def release_console(self):
+        sys.stdout, sys.stderr = self._console
+
+    def close(self):
+        """stop() and release_console(); safe to call more than once."""
+        self.stop()
+        self.release_console()
+
+    def stats(self):
+        with self._counter_lock:
+            return {'written': self.written, 'dropped': self.dropped, 'queued': self._queue.qsize(), 'rotations': self.rotations}
+
+    def stop(self, timeout=2.0):
+        """Writes what is queued (up to timeout) and closes the file."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # --- Writer thread ---
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not _STOP and len(batch) < 500:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            stop = batch[-1] is _STOP
+            self._write([i for i in batch if i is not _STOP])
+            if stop:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self._maybe_rotate()
+            for record, _, _ in batch:
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+            with self._counter_lock:
+                self.written += len(batch)
+        except (OSError, ValueError) as e:
+            with self._counter_lock:
+                self.dropped += len(batch)
+            self._echo(self._console[1], f"[ERROR] Event log write failed: {e}")
+        if self.echo:
+            for _, text, stream in batch:
+                if stream is not None: # None: already echoed when it was emitted
+                    self._echo(self._console[stream], text)
+
+    @staticmethod
+    def _echo(stream, text):
+        try:
+            stream.write(text + "\n")
+            stream.flush()
+        except Exception:
+            pass # No usable console (pythonw); the file still has it
+
+    def _current_period(self, timestamp):
+        return int(timestamp // self.rotate_seconds) if self.rotate_seconds > 0 else 0
+
+    def _maybe_rotate(self):
+        now_period = self._current_period(time.time())
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if os.path.exists(self.path) and self._current_period(os.path.getmtime(self.path)) != now_period:
+                self._try_rotate(now_period) # Left over from an earlier period (the app was restarted)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._period = now_period
+            return
+        if now_period != self._period or (self._file.tell() >= self.max_bytes and self._rotate_held != now_period):
+            self._file.close()
+            self._file = None
+            self._try_rotate(now_period)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._period = now_period
+
+    def _try_rotate(self, now_period):
+        """Rotates, or keeps appending to the current file if it cannot be moved (held open by a viewer or AV)."""
+        try:
+            self._rotate()
+        except OSError as e:
+            self._rotate_held = now_period
+            self._echo(self._console[1], f"[WARN] Event log rotation failed, continuing in {self.path}: {e}")
+
+    def _rotate(self):
+        base, ext = os.path.splitext(self.path)
+        target = f"{base}.{datetime.now():%Y%m%d-%H%M%S}{ext}"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{base}.{datetime.now():%Y%m%d-%H%M%S}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.path, target)
+        self.rotations += 1
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = os.path.basename(base) + "."
+        backups = sorted(f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(ext) and f != os.path.basename(self.path))
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            try:
+                os.remove(os.path.join(directory, old))
+            except OSError:
+                pass
+
+
+class _ConsoleBridge(io.TextIOBase):
+    """File-like stand-in for stdout/stderr: each completed line becomes an event, level taken from a "[LEVEL]" prefix."""
+    def __init__(self, event_log, stream, default_level):
+        self._log = event_log
+        self._stream = stream
+        self._default_level = default_level
+        self._local = threading.local() # print() writes text and newline separately; keep partial lines per thread
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        pending = getattr(self._local, 'pending', '') + text
+        *lines, self._local.pending = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                self._emit(line)
+        return len(text)
+
+    def _emit(self, line):
+        match = _LEVEL_PREFIX.match(line)
+        level = match.group(1).upper() if match else self._default_level
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'level': level,
+                  'msg': line[match.end():] if match else line.rstrip(), 'source': 'console'}
+        self._log._submit(record, line.rstrip(), self._stream)
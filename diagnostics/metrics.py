@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pymongo import monitoring
+
+# Optional: resident memory of this process; without it the panel falls back to the OS peak (or n/a)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Metrics:
+    """Thread-safe rolling timings and in-flight counters for the diagnostics panel.
+
+    observe() keeps the last `window` durations per name; track() also counts calls still running
+    on other threads (e.g. a background job)."""
+    def __init__(self, window=200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._timings = {}   # name -> deque of ms
+        self._counts = {}    # name -> total observations
+        self._in_flight = {} # name -> calls started but not finished
+
+    def observe(self, name, ms):
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self.window)
+            samples.append(ms)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    @contextmanager
+    def track(self, name):
+        """Times the block and counts it as in flight while it runs."""
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+            self.observe(name, (time.perf_counter() - started) * 1000.0)
+
+    def in_flight(self, name):
+        with self._lock:
+            return self._in_flight.get(name, 0)
+
+    def timing(self, name):
+        """{count, last_ms, avg_ms, p95_ms} over the window, or None before the first observation."""
+        with self._lock:
+            samples = list(self._timings.get(name) or ())
+            count = self._counts.get(name, 0)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {'count': count, 'last_ms': samples[-1], 'avg_ms': sum(samples) / len(samples),
+                'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]}
+
+
+class DbCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding round-trip times into Metrics under 'db' (failures under 'db_failed')."""
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.observe('db', event.duration_micros / 1000.0)
+
+    def failed(self, event):
+        self.metrics.observe('db_failed', event.duration_micros / 1000.0)
+
+
+def process_memory_mb():
+    """Resident memory in MB (psutil), else the peak reported by the OS, else None."""
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != 'Darwin' else peak / (1024 * 1024) # KB on Linux, bytes on macOS
+    return None
+
+
+METRICS = Metrics()
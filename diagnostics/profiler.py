@@ -0,0 +1,135 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILER_MODES = ("sampling", "cprofile")
+
+
+class SamplingProfiler:
+    """Samples the stack of every thread at a fixed interval from a background thread.
+
+    Costs one sys._current_frames() call per interval, so it can be switched on in a running gate
+    without slowing it down much. save() writes collapsed stacks ("thread;outer;inner count" per line),
+    the input format of flamegraph.pl, speedscope and inferno."""
+    suffix = ".folded"
+
+    def __init__(self, interval_s=0.005, max_depth=64):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.started_at = None
+        self.seconds = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+        self._stop_event.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self._thread = None
+        if self.started_at is not None:
+            self.seconds = time.perf_counter() - self.started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            folded = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                folded.append(";".join(reversed(stack)))
+            del frames
+            with self._lock:
+                self._stacks.update(folded)
+                self.samples += 1
+
+    def top(self, limit=10):
+        """[(leaf function, share of thread samples)] over all threads, busiest first."""
+        with self._lock:
+            leaves = Counter()
+            for stack, count in self._stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values())
+        return [(leaf, count / total) for leaf, count in leaves.most_common(limit)] if total else []
+
+    def save(self, path):
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in sorted(self._stacks.items())]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + ("\n" if lines else ""))
+        return path
+
+
+class CProfileSession:
+    """Deterministic profile of the thread that calls start() (the Tk thread: update_feed, OCR, _load_logs, saves).
+
+    Exact call counts but noticeable overhead; save() writes a pstats file for snakeviz/gprof2dot."""
+    suffix = ".prof"
+
+    def __init__(self):
+        self._profile = None
+        self.started_at = None
+        self.seconds = 0.0
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self._profile = cProfile.Profile()
+        self.started_at = time.perf_counter()
+        self._profile.enable()
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self._profile.disable()
+        self.running = False
+        self.seconds = time.perf_counter() - self.started_at
+
+    def save(self, path):
+        self._profile.dump_stats(path)
+        return path
+
+
+def create_profiler(mode, interval_ms=5):
+    """Profiler for a PROFILER_MODES name; both have start(), stop(), save(path) and a file suffix."""
+    if mode == "sampling":
+        return SamplingProfiler(interval_s=interval_ms / 1000.0)
+    if mode == "cprofile":
+        return CProfileSession()
+    raise ValueError(f"Unknown profiler mode '{mode}' (expected one of {', '.join(PROFILER_MODES)})")
+
+
+def profile_path(directory, profiler):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}{profiler.suffix}")
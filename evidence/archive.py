@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+import cv2
+
+
+class EvidenceArchive:
+    """Background writer that recompresses confirmed captures and stores them content-addressed
+    under <root>/YYYY/MM/DD/<sha256>.<ext>, with size/age retention and an index linking parking_id to images."""
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, root_dir, image_format="webp", quality=80, max_dimension=1280,
+                 max_total_mb=2048, max_age_days=90, queue_size=64, sweep_every=50, on_archived=None):
+        self.root_dir = root_dir
+        self.image_format = image_format.lower().lstrip('.')
+        if self.image_format not in ("webp", "jpg", "jpeg"):
+            raise ValueError(f"Unsupported evidence image format '{image_format}' (use webp or jpg)")
+        self.quality = quality
+        self.max_dimension = max_dimension      # Longest side after recompression; 0 keeps the original size
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.max_age_days = max_age_days
+        self.sweep_every = sweep_every          # Run retention after this many archived images
+        self.on_archived = on_archived          # Called on the writer thread with the index record
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._index_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'archived': 0, 'deduplicated': 0, 'dropped': 0, 'failed': 0, 'deleted': 0,
+                       'bytes_in': 0, 'bytes_out': 0, 'busy_s': 0.0, 'disk_bytes': 0}
+
+    # --- Lifecycle ---
+    def start(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="evidence-archive", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Finishes queued work (up to timeout) and stops the writer."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, source_path, parking_id, plate, action, delete_source=True):
+        """Queues a capture for archiving without blocking. Returns False (and counts a drop) if the queue is full."""
+        item = {'source': source_path, 'parking_id': parking_id, 'plate': plate, 'action': action,
+                'delete_source': delete_source, 'captured_at': datetime.now()}
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['dropped'] += 1
+            print(f"[WARN] Evidence archive queue full, dropped capture for {plate} ({parking_id}).")
+            return False
+
+    # --- Writer thread ---
+    def _run(self):
+        self._stats['disk_bytes'] = self._scan_disk_usage()
+        self._sweep()
+        since_sweep = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            started = time.perf_counter()
+            try:
+                self._archive(item)
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats['failed'] += 1
+                print(f"[ERROR] Archiving evidence for {item.get('parking_id')}: {e}")
+            finally:
+                if item['delete_source'] and item['source'] and os.path.exists(item['source']):
+                    try: os.remove(item['source'])
+                    except OSError as e: print(f"[ERROR] Deleting archived capture {item['source']}: {e}")
+                with self._stats_lock:
+                    self._stats['busy_s'] += time.perf_counter() - started
+            since_sweep += 1
+            if since_sweep >= self.sweep_every:
+                self._sweep()
+                since_sweep = 0
+
+    def _encode(self, image):
+        """Downscales (if needed) and recompresses an image. Returns (bytes, extension)."""
+        h, w = image.shape[:2]
+        if self.max_dimension and max(h, w) > self.max_dimension:
+            scale = self.max_dimension / float(max(h, w))
+            image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        if self.image_format == "webp":
+            ok, buf = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, self.quality])
+            ext = "webp"
+        else:
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+            ext = "jpg"
+        if not ok:
+            raise IOError(f"Could not encode image as {ext}")
+        return buf.tobytes(), ext
+
+    def _archive(self, item):
+        image = cv2.imread(item['source'])
+        if image is None:
+            raise IOError(f"Cannot read capture {item['source']}")
+        data, ext = self._encode(image)
+        digest = hashlib.sha256(data).hexdigest()
+
+        day = item['captured_at']
+        rel_path = os.path.join(f"{day:%Y}", f"{day:%m}", f"{day:%d}", f"{digest}.{ext}")
+        abs_path = os.path.join(self.root_dir, rel_path)
+        is_new = not os.path.exists(abs_path)
+        if is_new:
+            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+            tmp_path = abs_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, abs_path) # Atomic: readers never see a half-written file
+
+        record = {
+            'parking_id': item['parking_id'], 'plate': item['plate'], 'action': item['action'],
+            'path': rel_path.replace(os.sep, '/'), 'sha256': digest, 'bytes': len(data),
+            'captured_at': day.isoformat(timespec='seconds'),
+        }
+        with self._index_lock:
+            with open(os.path.join(self.root_dir, self.INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+
+        with self._stats_lock:
+            self._stats['archived'] += 1
+            self._stats['bytes_in'] += os.path.getsize(item['source'])
+            if is_new:
+                self._stats['bytes_out'] += len(data)
+                self._stats['disk_bytes'] += len(data)
+            else:
+                self._stats['deduplicated'] += 1
+
+        if callable(self.on_archived):
+            try:
+                self.on_archived(record)
+            except Exception as e:
+                print(f"[ERROR] Evidence archived callback failed for {item['parking_id']}: {e}")
+
+    # --- Retention ---
+    def _day_dirs(self):
+        """Yields (date, path) for every YYYY/MM/DD directory, oldest first."""
+        days = []
+        for year in os.listdir(self.root_dir):
+            year_path = os.path.join(self.root_dir, year)
+            if not (year.isdigit() and os.path.isdir(year_path)): continue
+            for month in os.listdir(year_path):
+                month_path = os.path.join(year_path, month)
+                if not (month.isdigit() and os.path.isdir(month_path)): continue
+                for dom in os.listdir(month_path):
+                    day_path = os.path.join(month_path, dom)
+                    if dom.isdigit() and os.path.isdir(day_path):
+                        try:
+                            days.append((datetime(int(year), int(month), int(dom)), day_path))
+                        except ValueError:
+                            continue
+        return sorted(days)
+
+    def _scan_disk_usage(self):
+        total = 0
+        for _, day_path in self._day_dirs():
+            for name in os.listdir(day_path):
+                total += os.path.getsize(os.path.join(day_path, name))
+        return total
+
+    def _sweep(self):
+        """Deletes whole days past max_age_days, then oldest files until under max_total_bytes."""
+        try:
+            cutoff = datetime.now() - timedelta(days=self.max_age_days)
+            deleted = 0
+            for day, day_path in self._day_dirs():
+                usage = self._stats['disk_bytes']
+                if day >= cutoff and usage <= self.max_total_bytes:
+                    break
+                if day < cutoff:
+                    freed = sum(os.path.getsize(os.path.join(day_path, n)) for n in os.listdir(day_path))
+                    count = len(os.listdir(day_path))
+                    shutil.rmtree(day_path, ignore_errors=True)
+                    deleted += count
+                    with self._stats_lock:
+                        self._stats['disk_bytes'] -= freed
+                    continue
+                # Over the size budget: trim this (oldest remaining) day file by file
+                for name in sorted(os.listdir(day_path), key=lambda n: os.path.getmtime(os.path.join(day_path, n))):
+                    if self._stats['disk_bytes'] <= self.max_total_bytes:
+                        break
+                    file_path = os.path.join(day_path, name)
+                    size = os.path.getsize(file_path)
+                    os.remove(file_path)
+                    deleted += 1
+                    with self._stats_lock:
+                        self._stats['disk_bytes'] -= size
+                if not os.listdir(day_path):
+                    os.rmdir(day_path)
+            if deleted:
+                with self._stats_lock:
+                    self._stats['deleted'] += deleted
+                print(f"[INFO] Evidence retention removed {deleted} image(s).")
+        except Exception as e:
+            print(f"[ERROR] Evidence retention sweep: {e}")
+
+    # --- Reporting ---
+    def lookup(self, parking_id):
+        """Returns all index records for a parking_id (newest last)."""
+        index_path = os.path.join(self.root_dir, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return []
+        with self._index_lock, open(index_path, encoding='utf-8') as f:
+            return [r for r in (json.loads(line) for line in f if line.strip()) if r.get('parking_id') == parking_id]
+
+    def stats(self):
+        """Counters plus queue depth, throughput (images/s of writer busy time) and disk usage in MB."""
+        with self._stats_lock:
+            s = dict(self._stats)
+        s['queue_depth'] = self._queue.qsize()
+        s['throughput'] = (s['archived'] / s['busy_s']) if s['busy_s'] > 0 else 0.0
+        s['disk_mb'] = s['disk_bytes'] / (1024 * 1024)
+        return s
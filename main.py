@@ -3,14 +3,15 @@ import io
 import uuid
 import re
 import csv
+import threading
+import queue
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog, simpledialog
 from PIL import Image, ImageTk, UnidentifiedImageError
 import cv2
 from datetime import datetime, timedelta, time # Import time class for combining date and time
-import math
-import time as standard_time # Import the standard time module with an alias
-from pymongo import MongoClient
+from time import perf_counter, monotonic
 from bson import ObjectId
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
@@ -45,8 +46,28 @@ import sys
 import pymongo
 import traceback
 import configparser
-from ocr_services.google_vision import GoogleVisionOcr
-from ocr_services.tesseract import TesseractOcr
+from ocr_services.registry import build_ocr_service, create_provider, get_preprocessor, OCR_STATS
+from ocr_services.voting import MultiFrameOcr
+from camera.motion_trigger import MotionTrigger, parse_roi
+from camera.manager import CameraManager
+from camera.clip_buffer import FrameRing, ClipWriter
+from camera.profiles import load_profiles
+from camera.network_source import camera_stream_factory, load_network_cameras
+from evidence.archive import EvidenceArchive
+from storage.open_index import OpenVehicleIndex
+from storage.tiering import TieredParkingHistory, archive_closed_records, ensure_archive_indexes
+from storage.bulk_import import BulkImporter
+from storage.reconcile import SlotReconciler
+from storage.repository import open_repository
+from analytics.forecast import OccupancyForecaster
+from analytics.portfolio import PortfolioMetrics
+from analytics.intraday import IntradayOccupancy, VEHICLE_TYPES as CHART_VEHICLE_TYPES
+from auth.credential_cache import CredentialCache
+from diagnostics.event_log import EventLog
+from diagnostics.metrics import METRICS, DbCommandTimer, process_memory_mb
+from diagnostics.profiler import create_profiler, profile_path, PROFILER_MODES
+import parking_ops
+from parking_ops import calculate_fee, fee_per_hour_for
 
 # ---- CONFIGURATION ----
 CONFIG_FILE = "config.ini"
@@ -110,36 +131,171 @@ try:
     PROPERTY_COL_NAME = config.get('Database', 'property_collection', fallback='property')
     USER_COL_NAME = config.get('Database', 'user_collection', fallback='user')             # Read user collection name
     EMPLOYEE_COL_NAME = config.get('Database', 'employee_collection', fallback='employee') # Read employee collection name
+    # Optional auto-trigger (motion/vehicle presence) settings
+    AUTO_TRIGGER_ENABLED = config.getboolean('AutoTrigger', 'enabled', fallback=False)
+    AUTO_TRIGGER_ROI = parse_roi(config.get('AutoTrigger', 'roi', fallback='0.0,0.0,1.0,1.0'))
+    AUTO_TRIGGER_OPTIONS = {
+        'process_width': config.getint('AutoTrigger', 'process_width', fallback=160),
+        'sample_every': config.getint('AutoTrigger', 'sample_every', fallback=3),
+        'presence_threshold': config.getfloat('AutoTrigger', 'presence_threshold', fallback=0.08),
+        'motion_threshold': config.getfloat('AutoTrigger', 'motion_threshold', fallback=0.01),
+        'still_frames': config.getint('AutoTrigger', 'still_frames', fallback=5),
+        'clear_frames': config.getint('AutoTrigger', 'clear_frames', fallback=10),
+        'cooldown_s': config.getfloat('AutoTrigger', 'cooldown_seconds', fallback=3.0),
+    }
+    # Optional multi-frame OCR voting (local engine first, one escalation call on low agreement)
+    MULTI_FRAME_OCR_ENABLED = config.getboolean('OCR', 'multi_frame', fallback=False)
+    MULTI_FRAME_OPTIONS = {
+        'max_frames': config.getint('OCR', 'vote_frames', fallback=5),
+        'min_votes': config.getint('OCR', 'vote_min_votes', fallback=3),
+        'accept_agreement': config.getfloat('OCR', 'vote_accept_agreement', fallback=0.8),
+        'time_budget_s': config.getfloat('OCR', 'vote_time_budget_seconds', fallback=1.5),
+        'crop_roi': parse_roi(config.get('OCR', 'vote_plate_roi')) if config.has_option('OCR', 'vote_plate_roi') else None,
+    }
+    # Local index of currently-parked vehicles (duplicate checks, exit previews, occupancy)
+    OPEN_INDEX_ENABLED = config.getboolean('OpenIndex', 'enabled', fallback=True)
+
+    # Occupancy forecast on the dashboard (hour-of-week profiles from parking history)
+    FORECAST_ENABLED = config.getboolean('Forecast', 'enabled', fallback=True)
+    FORECAST_HORIZON_HOURS = config.getint('Forecast', 'horizon_hours', fallback=6)
+    FORECAST_HISTORY_DAYS = config.getint('Forecast', 'history_days', fallback=365)
+    # Portfolio table refresh for managers covering several properties (employee.p_ids)
+    PORTFOLIO_REFRESH_MS = int(config.getfloat('Dashboard', 'portfolio_refresh_seconds', fallback=60) * 1000)
+
+    # Encrypted cache of recent logins (offline login while MongoDB is unreachable)
+    CREDENTIAL_CACHE_ENABLED = config.getboolean('Auth', 'credential_cache', fallback=True)
+    CREDENTIAL_CACHE_OPTIONS = {
+        'path': config.get('Auth', 'cache_file', fallback='credential_cache.bin'),
+        'offline_max_age_hours': config.getfloat('Auth', 'offline_max_age_hours', fallback=72.0),
+    }
+
+    # Hot/cold tiering of closed parking records (moved by a background job on manager login)
+    TIERING_ENABLED = config.getboolean('Tiering', 'enabled', fallback=False)
+    TIERING_OPTIONS = {
+        'archive_collection': config.get('Tiering', 'archive_collection', fallback=f"{PARKING_COL_NAME}_archive"),
+        'horizon_days': config.getint('Tiering', 'horizon_days', fallback=90),
+        'batch_size': config.getint('Tiering', 'batch_size', fallback=1000),
+    }
+    # Slot-count reconciliation: recompute available spaces from open records on a schedule and on demand
+    RECONCILE_ENABLED = config.getboolean('Reconcile', 'enabled', fallback=True)
+    RECONCILE_INTERVAL_MS = int(config.getfloat('Reconcile', 'interval_seconds', fallback=300) * 1000)
+    RECONCILE_SETTLE_SECONDS = config.getfloat('Reconcile', 'settle_seconds', fallback=0.2)
+    # Storage backend: 'mongo' (shared database), 'local' (SQLite file, single-gate sites) or 'memory' (demos/benchmarks)
+    STORAGE_BACKEND = config.get('Storage', 'backend', fallback='mongo').strip().lower()
+    LOCAL_STORE_PATH = config.get('Storage', 'local_path', fallback='bms_local.db')
+    STORAGE_SEED_FILE = config.get('Storage', 'seed_file', fallback='') or None
+    COLLECTION_NAMES = {'parking': PARKING_COL_NAME, 'property': PROPERTY_COL_NAME, 'user': USER_COL_NAME, 'employee': EMPLOYEE_COL_NAME}
+    # Bulk CSV import (Settings tab); rows per unordered insert_many
+    IMPORT_BATCH_SIZE = config.getint('Import', 'batch_size', fallback=1000)
+
+    # Evidence archive for confirmed captures (recompressed, content-addressed, with retention)
+    EVIDENCE_ENABLED = config.getboolean('Evidence', 'enabled', fallback=False)
+    EVIDENCE_OPTIONS = {
+        'root_dir': config.get('Evidence', 'archive_dir', fallback=os.path.join(ASSETS_DIR, 'evidence')),
+        'image_format': config.get('Evidence', 'format', fallback='webp'),
+        'quality': config.getint('Evidence', 'quality', fallback=80),
+        'max_dimension': config.getint('Evidence', 'max_dimension', fallback=1280),
+        'max_total_mb': config.getfloat('Evidence', 'max_total_mb', fallback=2048),
+        'max_age_days': config.getint('Evidence', 'max_age_days', fallback=90),
+    }
+
+    # Capture profiles: FOURCC and preview size for the live feed, separate still size for captures ([Camera], [Camera:<index>])
+    CAMERA_PROFILES = load_profiles(config)
+    # IP cameras (RTSP/HTTP URLs or video files) listed alongside the local devices; read newest-frame-first
+    NETWORK_CAMERAS = load_network_cameras(config)
+    NETWORK_CAMERA_OPTIONS = {
+        'transport': config.get('Camera', 'rtsp_transport', fallback='tcp'),
+        'open_timeout_s': config.getfloat('Camera', 'network_open_timeout_seconds', fallback=5.0),
+        'read_timeout_s': config.getfloat('Camera', 'network_read_timeout_seconds', fallback=5.0),
+    }
+    # Pre/post-event video clips: each camera keeps its last seconds as JPEGs, saved entries/exits get a clip
+    CLIPS_ENABLED = config.getboolean('Clips', 'enabled', fallback=False)
+    CLIP_RING_OPTIONS = {
+        'seconds': config.getfloat('Clips', 'buffer_seconds', fallback=20),
+        'fps': config.getfloat('Clips', 'fps', fallback=10),
+        'max_width': config.getint('Clips', 'max_width', fallback=960),
+        'quality': config.getint('Clips', 'jpeg_quality', fallback=70),
+        'max_mb': config.getfloat('Clips', 'max_mb_per_camera', fallback=32),
+    }
+    CLIP_WRITER_OPTIONS = {
+        'root_dir': config.get('Clips', 'clip_dir', fallback=os.path.join(ASSETS_DIR, 'clips')),
+        'pre_seconds': config.getfloat('Clips', 'pre_seconds', fallback=8),
+        'post_seconds': config.getfloat('Clips', 'post_seconds', fallback=4),
+        'fourcc': config.get('Clips', 'codec', fallback='mp4v'),
+        'extension': config.get('Clips', 'extension', fallback='mp4'),
+        'max_age_days': config.getint('Clips', 'max_age_days', fallback=30),
+    }
+
+    # Structured event log (JSON lines, written and rotated by a background thread; console output goes through it)
+    EVENT_LOG_ENABLED = config.getboolean('Logging', 'enabled', fallback=True)
+    EVENT_LOG_OPTIONS = {
+        'path': config.get('Logging', 'path', fallback=os.path.join('logs', 'events.jsonl')),
+        'max_bytes': int(config.getfloat('Logging', 'max_mb', fallback=10) * 1024 * 1024),
+        'rotate_hours': config.getfloat('Logging', 'rotate_hours', fallback=24),
+        'backup_count': config.getint('Logging', 'backup_count', fallback=14),
+        'queue_size': config.getint('Logging', 'queue_size', fallback=10000),
+        'echo': config.getboolean('Logging', 'echo_console', fallback=True),
+    }
+    # Manager-only diagnostics panel (live counters, on-demand profiler); toggled with the hotkey
+    DIAGNOSTICS_OPEN_AT_LOGIN = config.getboolean('Diagnostics', 'open_at_login', fallback=False)
+    DIAGNOSTICS_HOTKEY = config.get('Diagnostics', 'hotkey', fallback='<Control-Shift-D>')
+    DIAGNOSTICS_REFRESH_MS = config.getint('Diagnostics', 'refresh_ms', fallback=1000)
+    PROFILER_MODE = config.get('Diagnostics', 'profiler', fallback='sampling').strip().lower()
+    PROFILER_INTERVAL_MS = config.getfloat('Diagnostics', 'sample_interval_ms', fallback=5)
+    PROFILE_DIR = config.get('Diagnostics', 'profile_dir', fallback=os.path.join('logs', 'profiles'))
 except configparser.NoOptionError as e:
     root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Config Error", f"Missing required option in '{CONFIG_FILE}': {e}", parent=None); root_check.destroy(); sys.exit(1)
 except Exception as e:
     root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Config Error", f"Unexpected error reading config: {e}", parent=None); root_check.destroy(); sys.exit(1)
 
+EVENT_LOG = None
+if EVENT_LOG_ENABLED:
+    try:
+        EVENT_LOG = EventLog(**EVENT_LOG_OPTIONS)
+        EVENT_LOG.capture_console()
+    except OSError as e:
+        print(f"[WARN] Event log disabled, cannot write {EVENT_LOG_OPTIONS['path']}: {e}")
+        EVENT_LOG = None
 
 if not os.path.exists(SERVICE_ACCOUNT_PATH):
     root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Configuration Error", f"Service account JSON not found:\n{os.path.abspath(SERVICE_ACCOUNT_PATH)}\nCheck path in '{CONFIG_FILE}'.", parent=None); root_check.destroy(); sys.exit(1)
 # Set environment variable for Google Cloud library authentication
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = SERVICE_ACCOUNT_PATH
 
-# MongoDB Connection
-client = None; db = None; parking_col = None; property_col = None; user_col = None; employee_col = None
+# Time every MongoDB command for the diagnostics panel (listeners must be registered before the client exists)
+pymongo.monitoring.register(DbCommandTimer(METRICS))
+
+# Storage (MongoDB by default; 'memory' or 'local' run without a database server)
+repository = None; parking_col = None; property_col = None; user_col = None; employee_col = None
 try:
-    print(f"Connecting to MongoDB...");
-    # Added timeout and ping for better connection validation
-    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command('ping'); # Check connection
-    db = client[DB_NAME];
-    parking_col = db[PARKING_COL_NAME];
-    property_col = db[PROPERTY_COL_NAME]
-    user_col = db[USER_COL_NAME]             # Initialize user collection
-    employee_col = db[EMPLOYEE_COL_NAME]     # Initialize employee collection
-    print(f"MongoDB connection successful to database '{DB_NAME}'. Collections initialized.")
+    if STORAGE_BACKEND == "mongo":
+        print(f"Connecting to MongoDB...");
+    repository = open_repository(STORAGE_BACKEND, COLLECTION_NAMES, uri=MONGODB_URI, database=DB_NAME,
+                                 path=LOCAL_STORE_PATH, seed_file=STORAGE_SEED_FILE)
+    parking_col = repository.parking
+    property_col = repository.properties
+    user_col = repository.users
+    employee_col = repository.employees
+    repository.ping(); # Check connection
+    print(f"Storage '{STORAGE_BACKEND}' ready{f' (database {DB_NAME!r})' if STORAGE_BACKEND == 'mongo' else ''}. Collections initialized.")
+except ValueError as e: # Unknown backend name
+    root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Config Error", f"{e}\nCheck [Storage] in '{CONFIG_FILE}'.", parent=None); root_check.destroy(); sys.exit(1)
 except pymongo.errors.ConfigurationError as e:
     root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Database Config Error", f"MongoDB Configuration Error (check URI in config.ini):\n{e}", parent=None); root_check.destroy(); sys.exit(1)
 except pymongo.errors.ConnectionFailure as e:
-    root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Database Connection Error", f"Could not connect to MongoDB:\n{e}", parent=None); root_check.destroy(); sys.exit(1)
+    if CREDENTIAL_CACHE_ENABLED and os.path.exists(CREDENTIAL_CACHE_OPTIONS['path']):
+        # The client reconnects on its own; cached logins let the gate start while the database is unreachable
+        print(f"[WARN] MongoDB unreachable ({e}); starting with cached logins only.")
+    else:
+        root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Database Connection Error", f"Could not connect to MongoDB:\n{e}", parent=None); root_check.destroy(); sys.exit(1)
 except Exception as e: # Catch other potential errors during connection
-    root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Database Error", f"An unexpected error occurred connecting to MongoDB:\n{e}", parent=None); root_check.destroy(); sys.exit(1)
+    root_check = tk.Tk(); root_check.withdraw(); messagebox.showerror("Database Error", f"An unexpected error occurred opening storage '{STORAGE_BACKEND}':\n{e}", parent=None); root_check.destroy(); sys.exit(1)
+
+# Closed records past the tiering horizon live in an archive collection; export/analytics read both tiers
+if TIERING_ENABLED and repository is not None and not repository.shared:
+    print(f"[WARN] Tiering needs the MongoDB backend ($unionWith); disabled for storage '{STORAGE_BACKEND}'.")
+archive_col = repository.collection(TIERING_OPTIONS['archive_collection']) if TIERING_ENABLED and repository is not None and repository.shared else None
+parking_history = TieredParkingHistory(parking_col, archive_col) if archive_col is not None else parking_col
 
 
 def find_cameras(max_index=5):
@@ -192,18 +348,20 @@ def find_cameras(max_index=5):
     print(f"Cameras found: {len(cams)}")
     return cams
 
-AVAILABLE_CAMERAS = find_cameras(5) # Check first 5 indices
+AVAILABLE_CAMERAS = find_cameras(5) + NETWORK_CAMERAS # Check first 5 indices, then the configured IP cameras
+
 
 # --- Editable Dialog for Plate Correction ---
 class EditableDialog(tk.Toplevel):
     """Dialog for confirming or correcting the detected license plate."""
     ## ANALYSIS: Modal dialog to show captured image and allow plate correction. Handles confirm/retake/close actions.
     ## ANALYSIS: Includes basic validation for the entered plate format.
-    ## ANALYSIS: Attempts to delete the temporary image file on close.
-    def __init__(self, master, img_path, plate, on_confirm, on_retake):
+    ## ANALYSIS: Attempts to delete the temporary image file on close (on confirm, only if keep_image_on_confirm is False).
+    def __init__(self, master, img_path, plate, on_confirm, on_retake, keep_image_on_confirm=False, preview_func=None, suggest_func=None):
         super().__init__(master)
         self.title("Confirm/Edit Number Plate")
         self.on_confirm, self.on_retake = on_confirm, on_retake
+        self.keep_image_on_confirm = keep_image_on_confirm # on_confirm then owns (archives/deletes) the image
         self.transient(master) # Keep dialog on top of master
         self.grab_set() # Make dialog modal
         self.img_path = img_path
@@ -240,6 +398,22 @@ class EditableDialog(tk.Toplevel):
         self.entry.focus_set() # Set focus to entry
         self.entry.selection_range(0, tk.END) # Select current text
 
+        # Optional live preview under the entry (e.g. entry time and fee on exit), updated as the plate is edited
+        self.preview_func = preview_func
+        self.preview_var = tk.StringVar()
+        if callable(preview_func):
+            ttk.Label(self, textvariable=self.preview_var, font=('Segoe UI', 10), foreground="#555").pack(pady=(0, 5), padx=10)
+            self.plate_var.trace_add('write', self._update_preview)
+            self._update_preview()
+
+        # Optional "did you mean" buttons (e.g. open entries close to a misread exit plate)
+        self.suggest_func = suggest_func
+        if callable(suggest_func):
+            self.suggest_frame = ttk.Frame(self)
+            self.suggest_frame.pack(pady=(0, 5), padx=10)
+            self.plate_var.trace_add('write', self._update_suggestions)
+            self._update_suggestions()
+
         # Buttons Frame
         btn_frame = ttk.Frame(self)
         btn_frame.pack(pady=10, padx=10, fill='x', expand=True)
@@ -274,8 +448,9 @@ class EditableDialog(tk.Toplevel):
         """Cleanup: Delete temp image and call appropriate callback."""
         # Ensure this runs only when the dialog itself is destroyed
         if event and event.widget == self:
-            # Delete the temporary image file if it exists
-            if self.img_path and os.path.exists(self.img_path):
+            # Delete the temporary image file if it exists (unless a confirmed capture is handed to on_confirm)
+            keep_image = self.result_plate and self.keep_image_on_confirm
+            if not keep_image and self.img_path and os.path.exists(self.img_path):
                 try:
                     os.remove(self.img_path)
                     print(f"[INFO] Deleted temp image: {self.img_path}")
@@ -291,6 +466,29 @@ class EditableDialog(tk.Toplevel):
                 if callable(self.on_retake):
                     self.on_retake()
 
+    def _update_preview(self, *args):
+        """Refreshes the preview line for the current plate text."""
+        try:
+            self.preview_var.set(self.preview_func(self.plate_var.get().strip().upper()) or "")
+        except Exception as e:
+            self.preview_var.set("")
+            print(f"[ERROR] Plate preview: {e}")
+
+    def _update_suggestions(self, *args):
+        """Rebuilds the suggestion buttons for the current plate text; clicking one fills the entry."""
+        for child in self.suggest_frame.winfo_children():
+            child.destroy()
+        try:
+            suggestions = self.suggest_func(self.plate_var.get().strip().upper()) or []
+        except Exception as e:
+            suggestions = []
+            print(f"[ERROR] Plate suggestions: {e}")
+        if not suggestions:
+            return
+        ttk.Label(self.suggest_frame, text="Did you mean:", font=('Segoe UI', 10)).pack(side='left', padx=(0, 5))
+        for suggestion in suggestions:
+            ttk.Button(self.suggest_frame, text=suggestion, command=lambda s=suggestion: self.plate_var.set(s)).pack(side='left', padx=2)
+
     def _validate_plate(self, plate_str):
         """Basic validation for number plate format."""
         if not plate_str:
@@ -326,14 +524,70 @@ class ParkingApp:
         self._make_styles() # Apply custom ttk styles
 
         # --- OCR Service ---
-        ocr_provider = config.get('OCR', 'provider', fallback='google_vision')
-        if ocr_provider == 'tesseract':
-            self.ocr_service = TesseractOcr()
-        else:
-            self.ocr_service = GoogleVisionOcr()
+        # Provider (or local-first cascade) comes from the registry, see [OCR] in config.ini
+        ocr_provider = config.get('OCR', 'provider', fallback='google_vision').strip()
+        self.ocr_service = build_ocr_service(config)
+        # Multi-frame voting always reads locally first; the configured provider is only the escalation path
+        self.multi_frame_ocr = None
+        if MULTI_FRAME_OCR_ENABLED:
+            escalation = None if ocr_provider == 'tesseract' else self.ocr_service
+            vote_options = dict(MULTI_FRAME_OPTIONS)
+            preprocessor = get_preprocessor()
+            if preprocessor is not None and preprocessor.plate_roi is not None:
+                vote_options['crop_roi'] = None # The local engine's preprocessor crops to the plate region itself
+            self.multi_frame_ocr = MultiFrameOcr(create_provider('tesseract'), escalation_service=escalation, **vote_options)
 
         # Store camera mapping: Name -> Index for easy lookup
         self.camera_name_to_index = {name: index for index, name in AVAILABLE_CAMERAS}
+        # Owns the open camera devices; streams keep running in the background across tab switches
+        ring_factory = (lambda: FrameRing(**CLIP_RING_OPTIONS)) if CLIPS_ENABLED else None
+        self.camera_manager = CameraManager(camera_stream_factory(**NETWORK_CAMERA_OPTIONS), ring_factory=ring_factory,
+                                            profile_for=CAMERA_PROFILES)
+
+        # --- Open-Vehicle Index (loaded at login, kept current by saves + change feed) ---
+        self.open_index = OpenVehicleIndex()
+
+        # --- Occupancy Forecaster (dashboard; updated incrementally on a background thread) ---
+        self.forecaster = OccupancyForecaster(history_days=FORECAST_HISTORY_DAYS) if FORECAST_ENABLED else None
+        self._forecast_thread = None
+        # Portfolio metrics for managers covering several properties (set at login)
+        self.portfolio = None
+        self._portfolio_thread = None
+
+        # --- Evidence Archive (background writer) ---
+        self.evidence_archive = None
+        if EVIDENCE_ENABLED:
+            try:
+                self.evidence_archive = EvidenceArchive(on_archived=self._link_evidence, **EVIDENCE_OPTIONS)
+                self.evidence_archive.start()
+            except Exception as e:
+                print(f"[ERROR] Evidence archive disabled: {e}")
+                self.evidence_archive = None
+
+        # --- Clip Writer (encodes pre/post-event clips from the camera ring buffers) ---
+        self.clip_writer = None
+        if CLIPS_ENABLED:
+            try:
+                self.clip_writer = ClipWriter(on_written=self._link_clip, **CLIP_WRITER_OPTIONS)
+                self.clip_writer.start()
+            except Exception as e:
+                print(f"[ERROR] Clip writer disabled: {e}")
+                self.clip_writer = None
+
+        # --- Login (runs on a worker thread; results come back through a queue) ---
+        self.credential_cache = CredentialCache(**CREDENTIAL_CACHE_OPTIONS) if CREDENTIAL_CACHE_ENABLED else None
+        self.repo = repository # Records, properties and users (storage/repository.py)
+        self._login_thread = None
+        self._login_results = queue.Queue()
+        self._tiering_stop = threading.Event() # Set on exit so the tiering job stops between batches
+        self._import_thread = None
+        self.slot_reconciler = SlotReconciler(parking_col, property_col, RECONCILE_SETTLE_SECONDS)
+        self._reconcile_thread = None
+        self._import_progress = None # Latest stats dict from the running import
+        # --- Diagnostics (manager hotkey) ---
+        self.profiler = None
+        self.diagnostics_window = None
+        self._diagnostics_after_id = None
 
         # --- App State ---
         self.logged_in_user_role = None
@@ -370,111 +624,271 @@ class ParkingApp:
         self.password_entry = ttk.Entry(self.login_frame, textvariable=self.password_var, show="*", width=25)
         self.password_entry.grid(row=2, column=1, padx=5, pady=5)
 
-        login_button = ttk.Button(self.login_frame, text="Login", command=self._attempt_login, style="Accent.TButton")
-        login_button.grid(row=3, column=0, columnspan=2, pady=20)
+        self.login_button = ttk.Button(self.login_frame, text="Login", command=self._attempt_login, style="Accent.TButton")
+        self.login_button.grid(row=3, column=0, columnspan=2, pady=(20, 5))
+
+        self.login_status_var = tk.StringVar()
+        ttk.Label(self.login_frame, textvariable=self.login_status_var, foreground="#555").grid(row=4, column=0, columnspan=2)
 
         # Set focus to username entry initially
         self.username_entry.focus_set()
 
     def _attempt_login(self, event=None): # Added event=None for binding
-        """Checks credentials against DB and proceeds if correct."""
+        """Starts authentication on a worker thread; the login screen stays responsive meanwhile."""
         username = self.username_var.get().strip()
         password = self.password_var.get() # Don't strip password
 
         if not username or not password:
             messagebox.showerror("Login Failed", "Username and Password cannot be empty.", parent=self.root)
             return
+        if self._login_thread is not None and self._login_thread.is_alive():
+            return # Already signing in
 
-        try:
-            # 1. Find user by user_id
-            user_doc = user_col.find_one({"user_id": username})
-            if not user_doc:
-                messagebox.showerror("Login Failed", "Invalid username or password.", parent=self.root)
-                print(f"[WARN] Login failed: User '{username}' not found.")
-                self.password_var.set("")
-                self.password_entry.focus_set()
-                return
+        self.login_button.config(state="disabled")
+        self.login_status_var.set("Signing in...")
+        self._login_thread = threading.Thread(target=lambda: self._login_results.put(self._authenticate(username, password)),
+                                              name="login", daemon=True)
+        self._login_thread.start()
+        self.root.after(50, self._poll_login)
 
-            # 2. Check user role
-            user_role = user_doc.get("role")
-            allowed_roles = ["manager", "security"]
-            if user_role not in allowed_roles:
-                messagebox.showerror("Login Failed", "Access denied. Insufficient privileges.", parent=self.root)
-                print(f"[WARN] Login failed: User '{username}' role '{user_role}' not allowed.")
-                self.password_var.set("")
-                self.password_entry.focus_set()
-                return
+    def _poll_login(self):
+        try:
+            result = self._login_results.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._poll_login)
+            return
+        self._finish_login(result)
 
-            # 3. Verify password using bcrypt
-            stored_hash = user_doc.get("password")
-            if not stored_hash:
-                 messagebox.showerror("Login Error", "User account configuration issue (missing password hash).", parent=self.root)
-                 print(f"[ERROR] Login failed: User '{username}' has no password hash in DB.")
-                 return
-
-            # Ensure password and hash are bytes for bcrypt
-            if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
-                # Password matches
-                print(f"[INFO] User '{username}' password verified.")
-
-                # 4. Find associated active employee and property
-                employee_doc = employee_col.find_one({"userid": username, "status": "active"})
-                if not employee_doc:
-                    messagebox.showerror("Login Failed", "No active employee record found for this user.", parent=self.root)
-                    print(f"[WARN] Login failed: No active employee record for user '{username}'.")
-                    self.password_var.set("")
-                    self.password_entry.focus_set()
-                    return
+    def _login_failure(self, title, message, log):
+        print(log)
+        return {'ok': False, 'title': title, 'message': message}
 
-                assigned_p_id_str = employee_doc.get("p_id")
-                if not assigned_p_id_str:
-                     messagebox.showerror("Login Error", "Employee account configuration issue (missing property assignment).", parent=self.root)
-                     print(f"[ERROR] Login failed: Employee record for '{username}' has no p_id.")
-                     return
-
-                # 5. Fetch the assigned property details
-                property_document = property_col.find_one({"property_id": assigned_p_id_str})
-                if not property_document:
-                     messagebox.showerror("Login Error", f"Assigned property '{assigned_p_id_str}' not found in database.", parent=self.root)
-                     print(f"[ERROR] Login failed: Property '{assigned_p_id_str}' for user '{username}' not found.")
-                     return
-
-                # 6. Store user info and proceed
-                self.logged_in_user_role = user_role
-                self.assigned_property_id_str = assigned_p_id_str
-                self.assigned_property_doc = property_document # Store the whole doc
-                print(f"[INFO] Login successful for user '{username}' (Role: {user_role}, Property: {self.assigned_property_doc.get('name', assigned_p_id_str)}).")
-
-                # --- Proceed to main application ---
-                self.login_frame.destroy() # Remove login widgets
-                self._build_main_ui()      # Build the main application UI
-                self.main_app_frame.pack(fill="both", expand=True) # Show the main app frame
-                # Resize window for the main application
-                self.root.geometry("1200x750")
-                self.root.minsize(1100, 700)
-                self.root.title(f"🚗 Parking Management System - Property: {self.assigned_property_doc.get('name', assigned_p_id_str)}") # Update title
-                # Start camera for the initially selected tab after UI is built
-                self.root.after(150, self._trigger_initial_camera_start)
+    def _authenticate(self, username, password):
+        """Runs on the login thread (no Tk calls). Always returns a result dict for _finish_login."""
+        try:
+            return self._check_login(username, password)
+        except Exception as e:
+            return self._login_failure("Login Error", f"An unexpected error occurred during login:\n{e}", f"[ERROR] Unexpected error during login: {e}")
 
-            else:
-                # Password does not match
-                messagebox.showerror("Login Failed", "Invalid username or password.", parent=self.root)
-                print(f"[WARN] Login failed: Incorrect password for user '{username}'.")
-                self.password_var.set("")
-                self.password_entry.focus_set()
-                return
+    def _check_login(self, username, password):
+        allowed_roles = ["manager", "security"]
+        cache = self.credential_cache
 
+        # The database is always the authority; the cache only stands in while it is unreachable
+        cached = None
+        offline = False
+        try:
+            doc = self.repo.login_assignment(username) # User, active employee record and assigned property
+            if not doc:
+                if cache: cache.forget(username)
+                return self._login_failure("Login Failed", "Invalid username or password.", f"[WARN] Login failed: User '{username}' not found.")
+            stored_hash = doc.get("password")
+            user_role = doc.get("role")
+            employee_doc = doc.get("employee")
+            assigned_p_id_str = employee_doc.get("p_id") if employee_doc else None
+            property_document = doc.get("property")
         except pymongo.errors.ConnectionFailure as e:
-             messagebox.showerror("Database Error", f"Could not connect to database during login:\n{e}", parent=self.root)
-             print(f"[ERROR] DB Connection Failure during login: {e}")
+            cached = cache.get(username) if cache else None
+            if cached is None:
+                return self._login_failure("Database Error", f"Could not connect to database during login:\n{e}", f"[ERROR] DB Connection Failure during login: {e}")
+            offline = True
+            print(f"[WARN] Database unreachable, using cached login for '{username}'.")
+
+        if cached is not None:
+            stored_hash = cached.get("password_hash")
+            user_role = cached.get("role")
+            employee_doc = {"p_id": cached.get("p_id"), "p_ids": cached.get("p_ids")}
+            assigned_p_id_str = cached.get("p_id")
+            property_document = cached.get("property")
+
+        # Check user role
+        if user_role not in allowed_roles:
+            if cache and not offline: cache.forget(username) # Revoked in the database: no offline login either
+            return self._login_failure("Login Failed", "Access denied. Insufficient privileges.", f"[WARN] Login failed: User '{username}' role '{user_role}' not allowed.")
+
+        # Verify password using bcrypt
+        if not stored_hash:
+            return self._login_failure("Login Error", "User account configuration issue (missing password hash).", f"[ERROR] Login failed: User '{username}' has no password hash in DB.")
+        if not bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+            return self._login_failure("Login Failed", "Invalid username or password.", f"[WARN] Login failed: Incorrect password for user '{username}'.")
+        print(f"[INFO] User '{username}' password verified{' (cached)' if cached is not None else ''}.")
+
+        # Associated active employee and property
+        if not employee_doc:
+            if cache and not offline: cache.forget(username)
+            return self._login_failure("Login Failed", "No active employee record found for this user.", f"[WARN] Login failed: No active employee record for user '{username}'.")
+        if not assigned_p_id_str:
+            return self._login_failure("Login Error", "Employee account configuration issue (missing property assignment).", f"[ERROR] Login failed: Employee record for '{username}' has no p_id.")
+        if not property_document:
+            return self._login_failure("Login Error", f"Assigned property '{assigned_p_id_str}' not found in database.", f"[ERROR] Login failed: Property '{assigned_p_id_str}' for user '{username}' not found.")
+
+        # Regional managers list every lot they cover in employee.p_ids (the assigned p_id is always included)
+        portfolio_ids = [assigned_p_id_str] + [p for p in (employee_doc.get("p_ids") or []) if p != assigned_p_id_str]
+
+        if cache and cached is None:
+            cache.store(username, stored_hash, user_role, assigned_p_id_str, property_document, portfolio_ids)
+
+        # Store user info and warm the open-vehicle index before the UI is built
+        self.logged_in_user_role = user_role
+        self.assigned_property_id_str = assigned_p_id_str
+        self.assigned_property_doc = property_document
+        self.portfolio = PortfolioMetrics(portfolio_ids) if user_role == "manager" and len(portfolio_ids) > 1 else None
+        if not offline:
+            self._load_open_index()
+        return {'ok': True, 'username': username, 'offline': offline}
+
+    def _finish_login(self, result):
+        """Back on the Tk thread: report a failure or switch to the main application."""
+        if not result.get('ok'):
+            self.login_button.config(state="normal")
+            self.login_status_var.set("")
+            messagebox.showerror(result['title'], result['message'], parent=self.root)
+            self.password_var.set("")
+            self.password_entry.focus_set()
+            return
+
+        prop_name = self.assigned_property_doc.get('name', self.assigned_property_id_str)
+        print(f"[INFO] Login successful for user '{result['username']}' (Role: {self.logged_in_user_role}, Property: {prop_name}).")
+        try:
+            # --- Proceed to main application ---
+            self.login_frame.destroy() # Remove login widgets
+            self._build_main_ui()      # Build the main application UI
+            self.main_app_frame.pack(fill="both", expand=True) # Show the main app frame
+            # Resize window for the main application
+            self.root.geometry("1200x750")
+            self.root.minsize(1100, 700)
+            offline_note = " (offline)" if result.get('offline') else ""
+            self.root.title(f"🚗 Parking Management System - Property: {prop_name}{offline_note}") # Update title
+            # Start camera for the initially selected tab after UI is built
+            self.root.after(150, self._trigger_initial_camera_start)
+            if RECONCILE_ENABLED and not result.get('offline'):
+                self.root.after(2000, self._auto_reconcile_slots)
+            # Managers move this property's old closed records to the archive tier in the background
+            if self.logged_in_user_role == "manager" and archive_col is not None and not result.get('offline'):
+                self._start_tiering_job()
         except Exception as e:
             messagebox.showerror("Login Error", f"An unexpected error occurred during login:\n{e}", parent=self.root)
             print(f"[ERROR] Unexpected login error: {e}")
             traceback.print_exc()
-            self.password_var.set("")
-            self.password_entry.focus_set()
 
 
+    def _reconcile_slots(self, on_done=None):
+        """Checks/corrects the assigned property's slot counters on a worker thread; on_done(result) runs on the Tk thread.
+        Returns False if a check is already running."""
+        if not self.assigned_property_doc:
+            return False
+        if self._reconcile_thread is not None and self._reconcile_thread.is_alive():
+            return False
+        prop_id = self.assigned_property_doc.get('_id')
+
+        def work():
+            try:
+                result = self.slot_reconciler.reconcile(prop_id)
+                if result is not None:
+                    print(f"[INFO] Slot reconciliation took {result['seconds'] * 1000:.0f} ms"
+                          f"{', corrected ' + ', '.join(result['corrected']) if result['corrected'] else ', no drift'}.")
+            except pymongo.errors.PyMongoError as e:
+                print(f"[ERROR] Slot reconciliation failed: {e}")
+
+        self._reconcile_thread = threading.Thread(target=work, name="slot-reconcile", daemon=True)
+        self._reconcile_thread.start()
+        self._poll_reconcile(on_done)
+        return True
+
+    def _reconcile_soon(self, attempts=10):
+        """Starts a reconciliation, retrying shortly while one is still running (it may predate a totals change)."""
+        if not self._reconcile_slots() and self.assigned_property_doc and attempts > 1:
+            self.root.after(500, lambda: self._reconcile_soon(attempts - 1))
+
+    def _poll_reconcile(self, on_done):
+        if self._reconcile_thread is not None and self._reconcile_thread.is_alive():
+            self.root.after(200, lambda: self._poll_reconcile(on_done))
+            return
+        result = self.slot_reconciler.last_result
+        if result is not None and result['corrected']:
+            try:
+                self.assigned_property_doc = self.repo.get_property(self.assigned_property_doc['_id']) or self.assigned_property_doc
+            except pymongo.errors.PyMongoError as e:
+                print(f"[WARN] Could not re-read property after reconciliation: {e}")
+            for tab_name in ('entry_tab', 'exit_tab'):
+                tab = getattr(self, tab_name, None)
+                if tab is not None and tab.winfo_exists():
+                    tab._refresh_slots()
+        if hasattr(self, 'settings_tab') and self.settings_tab.winfo_exists():
+            self._refresh_reconcile_status(self.settings_tab)
+        if on_done:
+            on_done(result)
+
+    def _auto_reconcile_slots(self):
+        if not hasattr(self, 'main_app_frame') or not self.main_app_frame.winfo_exists():
+            return
+        self._reconcile_slots()
+        self.root.after(RECONCILE_INTERVAL_MS, self._auto_reconcile_slots)
+
+    def _reconcile_slots_now(self):
+        """Settings button: reconcile and report what was found."""
+        def report(result):
+            if result is None:
+                messagebox.showerror("Reconcile Error", "Slot reconciliation failed; see the log for details.", parent=self.root)
+                return
+            lines = [f"{t.capitalize()}: {st['open']} parked of {st['total']}, {st['available']} available"
+                     + (f" (was {result['corrected'][t][0]})" if t in result['corrected'] else "")
+                     for t, st in result['types'].items()]
+            title = "Slot Counts Corrected" if result['corrected'] else "Slot Counts OK"
+            messagebox.showinfo(title, "\n".join(lines) + f"\n\nChecked in {result['seconds'] * 1000:.0f} ms.", parent=self.root)
+        if self._reconcile_thread is not None and self._reconcile_thread.is_alive():
+            messagebox.showinfo("Reconcile", "A slot count check is already running.", parent=self.root)
+            return
+        self.slot_reconciler.last_result = None
+        self._reconcile_slots(on_done=report)
+
+    def _start_tiering_job(self):
+        """Archives closed records older than the horizon on a worker thread (safe to interrupt)."""
+        prop_id = self.assigned_property_doc.get('_id')
+
+        def work():
+            try:
+                ensure_archive_indexes(archive_col)
+                result = archive_closed_records(parking_col, archive_col, TIERING_OPTIONS['horizon_days'], property_id=prop_id,
+                                                batch_size=TIERING_OPTIONS['batch_size'], stop_event=self._tiering_stop)
+                print(f"[INFO] Tiering moved {result['moved']} closed record(s) older than {TIERING_OPTIONS['horizon_days']} days "
+                      f"to '{archive_col.name}' in {result['seconds']:.1f}s.")
+            except pymongo.errors.PyMongoError as e:
+                print(f"[ERROR] Tiering job failed: {e}")
+
+        threading.Thread(target=work, name="tiering", daemon=True).start()
+
+    def _load_open_index(self):
+        """Loads the open-vehicle index for the assigned property and starts its change feed."""
+        if not OPEN_INDEX_ENABLED or not self.assigned_property_doc:
+            return
+        try:
+            self.open_index.load(parking_col, self.assigned_property_doc.get('_id'))
+            self.open_index.start_change_feed(parking_col)
+        except pymongo.errors.PyMongoError as e:
+            print(f"[WARN] Could not load open-vehicle index, falling back to database lookups: {e}")
+
+    def _exit_fee_preview(self, plate):
+        """Text for the exit dialog: when the vehicle entered and what it would pay now (from the local index)."""
+        if not self.open_index.loaded or not plate:
+            return ""
+        record = self.open_index.get(plate)
+        if not record:
+            return "No open entry found for this plate."
+        entry_time = record.get('entry_time')
+        v_type = record.get('vehicle_type') or 'Unknown'
+        if not isinstance(entry_time, datetime):
+            return f"Open entry ({v_type}), entry time unknown."
+        fee_per_hour = fee_per_hour_for(self.assigned_property_doc or {}, v_type) # Same lookup as the exit charge
+        fee, hours = calculate_fee(entry_time, datetime.now(), fee_per_hour)
+        return f"In since {entry_time:%d %b %H:%M} ({v_type}), {hours:.1f} h, est. fee ₹{fee:.2f}"
+
+    def _exit_suggestions(self, plate):
+        """Open plates that plate may be a misreading of (empty if plate itself is open)."""
+        if not self.open_index.loaded or not plate or self.open_index.get(plate):
+            return []
+        return [p for p, cost in self.open_index.suggest(plate)]
+
     def _build_main_ui(self):
         """Builds the main application UI after successful login."""
         # --- Top Bar for Date/Time ---
@@ -515,6 +929,10 @@ class ParkingApp:
         # self.root.unbind('<Return>') # Or just don't bind it globally initially
         # Re-bind Enter key press globally for capture (if desired after login)
         self.root.bind('<Return>', self._on_enter_press_main)
+        if self.logged_in_user_role == 'manager':
+            self.root.bind(DIAGNOSTICS_HOTKEY, self._toggle_diagnostics)
+            if DIAGNOSTICS_OPEN_AT_LOGIN:
+                self._toggle_diagnostics()
 
 
     def _update_datetime(self):
@@ -567,8 +985,8 @@ class ParkingApp:
             print(f"[ERROR] During Enter press handling (main): {e}")
 
     def _on_tab_change(self, event):
-        """Handles tab changes: stops camera on old tab, starts on new (if applicable)."""
-        ## ANALYSIS: Manages camera resources efficiently by only running the camera for the active Entry/Exit tab.
+        """Handles tab changes: pauses rendering on hidden tabs, resumes it on the new one (cameras stay warm)."""
+        ## ANALYSIS: Cameras keep streaming in the background (see CameraManager); only rendering follows the visible tab.
         # Check if main UI components exist before proceeding
         if not hasattr(self, 'nav') or not self.nav.winfo_exists():
             return # Main UI not built yet
@@ -589,15 +1007,15 @@ class ParkingApp:
              if hasattr(self, 'settings_tab'):
                  active_tabs.append(self.settings_tab)
 
-        # Stop camera on any tab that is *not* the newly selected one
+        # Pause rendering on any tab that is *not* the newly selected one
         for tab in active_tabs:
             if tab and tab.winfo_exists() and tab != newly_selected_tab_widget: # Check if tab exists
-                # Check if the tab has a 'stop_camera' method
-                if hasattr(tab, 'stop_camera') and callable(getattr(tab, 'stop_camera')):
+                # Check if the tab has a 'pause_feed' method
+                if hasattr(tab, 'pause_feed') and callable(getattr(tab, 'pause_feed')):
                     try:
-                        tab.stop_camera()
+                        tab.pause_feed()
                     except Exception as e:
-                        print(f"[ERROR] Stopping camera on non-active tab change: {e}")
+                        print(f"[ERROR] Pausing camera feed on non-active tab change: {e}")
 
         # Start camera if the new tab is Entry or Exit
         if newly_selected_tab_widget in (self.entry_tab, self.exit_tab):
@@ -623,8 +1041,8 @@ class ParkingApp:
                  self.settings_tab._load_assigned_property_details() # Load assigned property
 
     def _trigger_initial_camera_start(self):
-        """Trigger the start_camera for the initially selected tab."""
-        ## ANALYSIS: Ensures the camera starts when the app launches for the default tab.
+        """Opens the cameras for both Entry and Exit tabs and starts rendering the selected one."""
+        ## ANALYSIS: Both lanes are opened at launch so later tab switches never wait for a cold camera.
         # Check if main UI components exist before proceeding
         if not hasattr(self, 'nav') or not self.nav.winfo_exists():
             print("[INFO] Main UI not ready for initial camera start.")
@@ -635,6 +1053,11 @@ class ParkingApp:
             if not current_tab_name: return
             current_tab_widget = self.nav.nametowidget(current_tab_name)
 
+            # Warm the hidden lane's camera in the background (no rendering)
+            for tab in (self.entry_tab, self.exit_tab):
+                if tab != current_tab_widget and hasattr(tab, 'start_camera'):
+                    tab.start_camera(render=False)
+
             if current_tab_widget in (self.entry_tab, self.exit_tab):
                 if hasattr(current_tab_widget, 'start_camera') and callable(getattr(current_tab_widget, 'start_camera')):
                     current_tab_widget.start_camera()
@@ -834,15 +1257,18 @@ class ParkingApp:
         log = scrolledtext.ScrolledText(right_frame, width=50, height=15, font=("Consolas", 10), wrap=tk.WORD, bg="#ffffff", fg="#333333", relief="solid", borderwidth=1, state=tk.DISABLED)
         log.grid(row=1, column=0, sticky="nsew")
 
-        # --- Log Utility Function (Prints to Console) ---
-        ## ANALYSIS: This function only prints to console, doesn't update the GUI log. GUI log updated via _load_logs.
-        def append_log(message, level="INFO"):
-            """Appends a message to the CONSOLE log with timestamp and level."""
-            timestamp = datetime.now().strftime("%H:%M:%S")
+        # --- Log Utility Function (Event Log / Console) ---
+        ## ANALYSIS: This function doesn't update the GUI log. GUI log updated via _load_logs.
+        lane = "entry" if is_entry else "exit"
+        def append_log(message, level="INFO", **fields):
+            """Records a gate event (plate, stage, latency_ms, ...) for this lane in the event log; console if it is off."""
             prefix_map = {"INFO": "[INFO]", "WARN": "[WARN]", "ERROR": "[ERROR]", "SAVE": "[SAVE]", "OCR": "[OCR]"}
-            prefix = prefix_map.get(level.upper(), "[INFO]")
-            full_message = f"{timestamp} {prefix} {message}\n"
-            print(full_message.strip()) # Print status/debug to console
+            level = level.upper() if level.upper() in prefix_map else "INFO"
+            if EVENT_LOG is not None:
+                EVENT_LOG.log(level, message, lane=lane, **fields)
+                return
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            print(f"{timestamp} {prefix_map[level]} {message}") # Print status/debug to console
 
         # --- Refresh Slots Function (Uses assigned property) ---
         def refresh_slots_typed(*args):
@@ -869,7 +1295,8 @@ class ParkingApp:
             refresh_slots_typed()
 
         # --- Store references and state on the frame widget itself ---
-        frame._state = {'cap': None, 'frame': None, 'after_id': None} # Camera state
+        frame._state = {'stream': None, 'frame': None, 'after_id': None, 'last_seq': 0, 'live': None, # Camera state
+                        'recent_frames': deque(maxlen=MULTI_FRAME_OPTIONS['max_frames'])} # Last few frames for OCR voting
         frame._log_widget = log # Reference to the log display widget
         frame._append_log = append_log # Reference to the console log function
         frame._canvas = canvas # Reference to the video display label
@@ -878,27 +1305,64 @@ class ParkingApp:
         frame._vehicle_type_var = vehicle_type_var # Reference to vehicle type variable
         frame._cam_name_var = cam_name_var # Reference to camera selection variable
         frame._log_date_var = log_date_var # Reference to log date variable
+        # Optional motion/presence auto-trigger, fed from the preview loop
+        frame._motion_trigger = MotionTrigger(roi=AUTO_TRIGGER_ROI, **AUTO_TRIGGER_OPTIONS) if AUTO_TRIGGER_ENABLED else None
 
         # --- Camera Handling Functions (Specific to this tab) ---
+        ## ANALYSIS: Devices are owned by self.camera_manager and stream on background threads, so they stay
+        ## ANALYSIS: warm across tab switches. These functions only attach to a stream and render it.
+        def camera_live():
+            """True if this tab's camera stream is delivering frames."""
+            stream = frame._state.get('stream')
+            return stream is not None and stream.is_streaming()
+
+        def on_live_change(live):
+            """Updates buttons/log when the stream goes live or drops (not during a capture in progress)."""
+            stream = frame._state.get('stream')
+            try:
+                if btn_capture['text'].startswith("⏳"):
+                    return # Capture/save in progress; its own cleanup restores the buttons
+                if live and self.assigned_property_doc:
+                    btn_capture.config(state="normal", text="📸 Capture & Process")
+                elif live:
+                    btn_capture.config(state="disabled", text="🚫 Property Error")
+                else:
+                    btn_capture.config(state="disabled", text="🚫 Camera Offline")
+            except tk.TclError: pass # Ignore if buttons destroyed
+            if stream is not None:
+                append_log(f"{section} {stream.name} {'streaming' if live else stream.state}.", "INFO" if live else "WARN")
+
         def update_feed():
-            """Reads frame from camera and updates the canvas label."""
-            cap = frame._state.get('cap')
-            # Stop if capture device is gone or closed
-            if cap is None or not cap.isOpened():
-                if frame._state.get('after_id') is not None:
-                    try:
-                        frame._canvas.after_cancel(frame._state['after_id'])
-                    except tk.TclError: pass # Ignore if already cancelled/destroyed
-                    frame._state['after_id'] = None
+            """Renders the newest frame of the attached stream onto the canvas label."""
+            stream = frame._state.get('stream')
+            if stream is None:
+                frame._state['after_id'] = None
                 return
 
             try:
-                ok, frm = cap.read()
-                if ok and frm is not None:
+                live = stream.is_streaming()
+                if live != frame._state.get('live'):
+                    frame._state['live'] = live
+                    on_live_change(live)
+
+                seq, frm, _ = stream.latest()
+                if not live:
+                    # Still opening/reconnecting in the background: show status instead of a frozen frame
+                    status = {"opening": f"Starting {stream.name}...", "reconnecting": f"Reconnecting {stream.name}..."}.get(stream.state, "Camera Offline")
+                    frame._canvas.config(image='', text=status)
+                    frame._canvas.imgtk = None
+                elif frm is not None and seq != frame._state['last_seq']:
+                    frame._state['last_seq'] = seq
                     frame._state['frame'] = frm # Store the latest frame
-                    img_rgb = cv2.cvtColor(frm, cv2.COLOR_BGR2RGB) # Convert for PIL/Tkinter
-                    img_pil = Image.fromarray(img_rgb)
-
+                    if self.multi_frame_ocr is not None:
+                        frame._state['recent_frames'].append(frm)
+                    # Auto-trigger: fire the capture pipeline once when a vehicle stops in the ROI
+                    if frame._motion_trigger is not None and frame._motion_trigger.update(frm):
+                        if btn_capture['state'] == tk.NORMAL: # Skip while a capture/dialog is already in progress
+                            append_log("Vehicle detected in ROI, auto-capturing...", "INFO")
+                            frame._canvas.after(0, trigger_capture_local)
+
+                    render_started = perf_counter()
                     # Resize image to fit canvas dimensions
                     canvas_w = frame._canvas.winfo_width()
                     canvas_h = frame._canvas.winfo_height()
@@ -908,34 +1372,44 @@ class ParkingApp:
                         frame._state['after_id'] = frame._canvas.after(100, update_feed) # Retry later
                         return
 
-                    img_pil.thumbnail((canvas_w, canvas_h), Image.Resampling.LANCZOS) # Resize smoothly
+                    # Shrink first, so colour conversion and the Tk image only touch the displayed pixels
+                    frm_h, frm_w = frm.shape[:2]
+                    scale = min(canvas_w / frm_w, canvas_h / frm_h, 1.0)
+                    if scale < 1.0:
+                        frm = cv2.resize(frm, (max(1, int(frm_w * scale)), max(1, int(frm_h * scale))), interpolation=cv2.INTER_AREA)
+                    img_pil = Image.fromarray(cv2.cvtColor(frm, cv2.COLOR_BGR2RGB)) # Convert for PIL/Tkinter
                     photo = ImageTk.PhotoImage(img_pil)
 
                     # Update the canvas label
                     frame._canvas.imgtk = photo # Keep a reference! Important.
                     frame._canvas.config(image=photo, text="") # Display image, clear text
+                    METRICS.observe('render', (perf_counter() - render_started) * 1000)
 
+            except tk.TclError:
+                return # Widget destroyed
             except Exception as e:
                 print(f"[ERROR] in update_feed cam {cam_name_var.get()}: {e}")
-                stop_camera() # Stop feed on error
-                try:
-                    frame._canvas.config(image='', text=f"Feed Error")
-                    frame._canvas.imgtk = None
-                except tk.TclError: pass # Ignore if widget destroyed
-                return # Stop the loop
 
             # Schedule the next update
             try:
                 frame._state['after_id'] = frame._canvas.after(40, update_feed) # Aim for ~25 FPS
             except tk.TclError: pass # Ignore if widget destroyed
 
-        def start_camera(event=None):
-            """Initializes and starts the selected camera feed."""
-            stop_camera() # Ensure any previous camera is stopped first
+        def pause_feed():
+            """Stops rendering (e.g. tab hidden). The camera keeps streaming in the background."""
+            if frame._state.get('after_id') is not None:
+                try:
+                    frame._canvas.after_cancel(frame._state['after_id'])
+                except tk.TclError: pass # Ignore if already cancelled/destroyed
+                frame._state['after_id'] = None
+
+        def start_camera(event=None, render=True):
+            """Attaches this tab to the selected camera (opening it in the background if needed) and renders it."""
             selected_cam_name = cam_name_var.get()
             selected_cam_index = self.camera_name_to_index.get(selected_cam_name)
 
             if selected_cam_index is None or selected_cam_name == "N/A":
+                stop_camera()
                 try:
                     frame._canvas.config(text="No Camera Selected", image='')
                     frame._canvas.imgtk = None
@@ -943,87 +1417,30 @@ class ParkingApp:
                 except tk.TclError: pass # Ignore if widget destroyed
                 return
 
-            append_log(f"Initializing {selected_cam_name}...")
-            try:
-                frame._canvas.config(text=f"Starting {selected_cam_name}...", image='')
-                frame._canvas.imgtk = None
-                self.root.update_idletasks() # Force UI update to show "Starting..."
-            except tk.TclError: pass # Ignore if widget destroyed
-
-            cap_api = cv2.CAP_DSHOW if sys.platform == 'win32' else cv2.CAP_ANY
-            cap = cv2.VideoCapture(selected_cam_index, cap_api)
-            # Use the standard time module's sleep (aliased)
-            standard_time.sleep(0.5) # Give camera time to initialize (may need adjustment)
-
-            if not cap.isOpened():
-                messagebox.showerror("Camera Error", f"Cannot open {selected_cam_name}", parent=self.root)
-                append_log(f"Failed to open {selected_cam_name}", "ERROR")
-                frame._state['cap'] = None
-                try:
-                    frame._canvas.config(text="Failed to Open", image='')
-                    frame._canvas.imgtk = None
-                    btn_capture.config(state="disabled", text="🚫 Camera Error")
-                except tk.TclError: pass # Ignore if widget destroyed
-                return
-
-            # Try a few initial reads to ensure camera is responsive
-            read_success = False
-            try:
-                for _ in range(5): # Try up to 5 times
-                    ok, test_frame = cap.read()
-                    # Use the standard time module's sleep (aliased)
-                    standard_time.sleep(0.05) # Small delay between reads
-                    if ok and test_frame is not None:
-                        read_success = True
-                        break
-                if not read_success:
-                    raise IOError("Failed initial reads after opening.")
-            except Exception as e:
-                cap.release() # Release the failed capture device
-                frame._state['cap'] = None
-                messagebox.showerror("Camera Error", f"Error reading from {selected_cam_name}: {e}", parent=self.root)
-                append_log(f"Failed initial read {selected_cam_name}: {e}", "ERROR")
-                try:
-                    frame._canvas.config(text="Read Error", image='')
-                    frame._canvas.imgtk = None
-                    btn_capture.config(state="disabled", text="🚫 Read Error")
-                except tk.TclError: pass # Ignore if widget destroyed
-                return
-
-            # Store the capture device and start the feed
-            frame._state['cap'] = cap
-            append_log(f"{section} {selected_cam_name} started.", "INFO")
-            try:
-                frame._canvas.config(text="") # Clear "Starting..." text
-            except tk.TclError: pass # Ignore if widget destroyed
-
-            # Enable buttons if property doc loaded successfully
-            try:
-                if self.assigned_property_doc:
-                    btn_capture.config(state="normal", text="📸 Capture & Process")
-                    btn_manual.config(state="normal")
-                else:
-                    btn_capture.config(state="disabled", text="🚫 Property Error")
-                    btn_manual.config(state="disabled")
-            except tk.TclError: pass # Ignore if buttons destroyed
+            stream = frame._state.get('stream')
+            if stream is None or stream.source != selected_cam_index:
+                # Camera changed (or first start): swap streams without blocking the UI
+                stop_camera()
+                append_log(f"Attaching {selected_cam_name}...")
+                frame._state['stream'] = self.camera_manager.acquire(selected_cam_index, name=selected_cam_name)
+                frame._state['live'] = None
+                frame._state['last_seq'] = 0
+                if frame._motion_trigger is not None:
+                    frame._motion_trigger.reset() # Relearn the empty-lane background for this camera
 
-            update_feed() # Start the update loop
+            if render and frame._state.get('after_id') is None:
+                update_feed() # Start the render loop
 
         def stop_camera():
-            """Stops the camera feed and releases resources."""
-            # Cancel any pending frame update
-            if frame._state.get('after_id') is not None:
-                try:
-                    frame._canvas.after_cancel(frame._state['after_id'])
-                except tk.TclError: pass # Ignore if already cancelled/destroyed
-                frame._state['after_id'] = None
-
-            # Release the capture device
-            cap = frame._state.get('cap')
-            if cap and cap.isOpened():
-                cap.release()
-                frame._state['cap'] = None
-                append_log(f"Camera {cam_name_var.get()} stopped.", "INFO") # Log stop
+            """Detaches from the camera stream (closing the device if no other tab uses it)."""
+            pause_feed()
+            stream = frame._state.get('stream')
+            if stream is not None:
+                frame._state['stream'] = None
+                frame._state['frame'] = None
+                frame._state['recent_frames'].clear()
+                self.camera_manager.release(stream)
+                append_log(f"Camera {stream.name} detached.", "INFO") # Log stop
 
             # Update UI
             try:
@@ -1068,9 +1485,11 @@ class ParkingApp:
         # --- Attach camera control functions to the frame ---
         frame.start_camera = start_camera
         frame.stop_camera = stop_camera
+        frame.pause_feed = pause_feed
+        frame._camera_live = camera_live
 
         # Bind camera selection change to restart the camera
-        cbcam.bind("<<ComboboxSelected>>", start_camera)
+        cbcam.bind("<<ComboboxSelected>>", lambda e: start_camera(render=(self.nav.select() == str(frame))))
 
         # Load initial logs for this tab (will be done by _trigger_initial_camera_start or _on_tab_change)
 
@@ -1127,14 +1546,33 @@ class ParkingApp:
         self.occupancy_bike_label = ttk.Label(occupancy_frame, text="0 / 0", font=("Segoe UI", 12, "bold"))
         self.occupancy_bike_label.grid(row=1, column=1, sticky="e")
 
+        # --- Forecast Frame ---
+        if self.forecaster is not None:
+            forecast_frame = ttk.LabelFrame(frame, text=f"Forecast (next {FORECAST_HORIZON_HOURS} h)", padding=10)
+            forecast_frame.grid(row=1, column=2, padx=5, pady=5, sticky="nsew")
+            self.forecast_label = ttk.Label(forecast_frame, text="Building forecast...", font=("Segoe UI", 10), justify="left")
+            self.forecast_label.pack(anchor="w")
 
-        # --- Chart Frame ---
-        chart_frame = ttk.LabelFrame(frame, text="7-Day Revenue Trend", padding=10)
-        chart_frame.grid(row=2, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
 
-        # Placeholder for the chart
-        self.chart_canvas_placeholder = ttk.Label(chart_frame, text="Chart will be displayed here.", anchor="center")
-        self.chart_canvas_placeholder.pack(fill="both", expand=True)
+        # --- Chart Frame (one figure for the session; refreshes only update the artists) ---
+        chart_frame = ttk.LabelFrame(frame, text="Revenue Trend & Today's Occupancy", padding=10)
+        chart_frame.grid(row=2, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
+        self._build_dashboard_chart(chart_frame)
+
+        # --- Portfolio Frame (managers covering several properties) ---
+        if self.portfolio is not None:
+            portfolio_frame = ttk.LabelFrame(frame, text=f"Portfolio ({len(self.portfolio.property_ids)} properties)", padding=10)
+            portfolio_frame.grid(row=3, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
+            columns = ("name", "cars", "bikes", "entries", "exits", "revenue")
+            headings = ("Property", "Cars", "Bikes", "Entries Today", "Exits Today", "Revenue Today")
+            self.portfolio_tree = ttk.Treeview(portfolio_frame, columns=columns, show="headings", height=min(6, len(self.portfolio.property_ids)))
+            for col, heading in zip(columns, headings):
+                self.portfolio_tree.heading(col, text=heading)
+                self.portfolio_tree.column(col, anchor="w" if col == "name" else "e", width=180 if col == "name" else 110)
+            self.portfolio_tree.pack(fill="both", expand=True)
+            self.portfolio_status_label = ttk.Label(portfolio_frame, text="Loading...", foreground="#555")
+            self.portfolio_status_label.pack(anchor="e")
+            self.root.after(PORTFOLIO_REFRESH_MS, self._auto_refresh_portfolio)
 
         # Initial data load
         self.root.after(100, self._refresh_dashboard_data)
@@ -1149,36 +1587,29 @@ class ParkingApp:
 
         prop_id = self.assigned_property_doc.get('_id')
         now = datetime.now()
-        start_of_day = datetime.combine(now.date(), time.min)
-        end_of_day = datetime.combine(now.date(), time.max)
 
         try:
-            # --- Today's Revenue ---
-            revenue_pipeline = [
-                {"$match": {"property_id": prop_id, "exit_time": {"$gte": start_of_day, "$lte": end_of_day}}},
-                {"$group": {"_id": None, "total_revenue": {"$sum": "$fee"}}}
-            ]
-            revenue_result = list(parking_col.aggregate(revenue_pipeline))
-            today_revenue = revenue_result[0]['total_revenue'] if revenue_result else 0
-            self.revenue_label.config(text=f"₹ {today_revenue:,.2f}")
-
-            # --- Today's Entries & Exits ---
-            entries_count = parking_col.count_documents({"property_id": prop_id, "entry_time": {"$gte": start_of_day, "$lte": end_of_day}})
-            exits_count = parking_col.count_documents({"property_id": prop_id, "exit_time": {"$gte": start_of_day, "$lte": end_of_day}})
-            self.entries_label.config(text=str(entries_count))
-            self.exits_label.config(text=str(exits_count))
-
-            # --- Current Occupancy ---
+            # --- Today's Revenue, Entries & Exits ---
+            summary = self.repo.today_summary(prop_id, now.date())
+            self.revenue_label.config(text=f"₹ {summary['revenue']:,.2f}")
+            self.entries_label.config(text=str(summary['entries']))
+            self.exits_label.config(text=str(summary['exits']))
+
+            # --- Current Occupancy (from the open-vehicle index when it is live) ---
             total_car_spaces = self.assigned_property_doc.get("parking_spaces_car", 0)
             avail_car_spaces = self.assigned_property_doc.get("available_parking_spaces_car", 0)
-            occupied_car = total_car_spaces - avail_car_spaces
+            occupied_car = self.open_index.occupancy("car") if self.open_index.ready else total_car_spaces - avail_car_spaces
             self.occupancy_car_label.config(text=f"{occupied_car} / {total_car_spaces}")
 
             total_bike_spaces = self.assigned_property_doc.get("parking_spaces_bike", 0)
             avail_bike_spaces = self.assigned_property_doc.get("available_parking_spaces_bike", 0)
-            occupied_bike = total_bike_spaces - avail_bike_spaces
+            occupied_bike = self.open_index.occupancy("bike") if self.open_index.ready else total_bike_spaces - avail_bike_spaces
             self.occupancy_bike_label.config(text=f"{occupied_bike} / {total_bike_spaces}")
 
+            # --- Forecast and portfolio (aggregations run in the background) ---
+            self._refresh_forecast()
+            self._refresh_portfolio()
+
             # --- 7-Day Revenue Chart ---
             self._update_revenue_chart()
 
@@ -1186,8 +1617,179 @@ class ParkingApp:
             messagebox.showerror("Database Error", f"Failed to fetch dashboard data:\n{e}", parent=self.root)
             print(f"[ERROR] Dashboard data fetch error: {e}")
 
+    def _refresh_forecast(self):
+        """Brings the forecaster up to date on a worker thread, then renders the forecast."""
+        if self.forecaster is None or not self.assigned_property_doc:
+            return
+        if self._forecast_thread is not None and self._forecast_thread.is_alive():
+            return # An update is already running; it will render when done
+        prop_id = self.assigned_property_doc.get('_id')
+
+        def work():
+            try:
+                took = self.forecaster.update(parking_history, prop_id)
+                print(f"[INFO] Forecast model updated in {took:.2f}s.")
+            except pymongo.errors.PyMongoError as e:
+                print(f"[ERROR] Forecast update failed: {e}")
+
+        self._forecast_thread = threading.Thread(target=work, name="forecast-update", daemon=True)
+        self._forecast_thread.start()
+        self._poll_forecast()
+
+    def _poll_forecast(self):
+        if self._forecast_thread is not None and self._forecast_thread.is_alive():
+            self.root.after(200, self._poll_forecast)
+            return
+        self._render_forecast()
+
+    def _render_forecast(self):
+        """Shows projected occupancy per hour and time-to-full for cars and bikes."""
+        if not hasattr(self, 'forecast_label') or not self.forecast_label.winfo_exists():
+            return
+        if self.forecaster.watermark is None:
+            self.forecast_label.config(text="Forecast unavailable.")
+            return
+        prop = self.assigned_property_doc
+        lines = []
+        for v_type, label in (("car", "Cars"), ("bike", "Bikes")):
+            capacity = prop.get(f"parking_spaces_{v_type}", 0)
+            if self.open_index.ready:
+                current = self.open_index.occupancy(v_type)
+            else:
+                current = capacity - prop.get(f"available_parking_spaces_{v_type}", 0)
+            result = self.forecaster.forecast(v_type, current, capacity, hours=FORECAST_HORIZON_HOURS)
+            hourly = "  ".join(f"{t:%H}h:{round(o)}" for t, o in zip(result['times'], result['occupancy']))
+            ttf = result['time_to_full']
+            if ttf is None:
+                full_text = "not expected to fill"
+            elif ttf <= 0:
+                full_text = "full now"
+            else:
+                full_text = f"full in ~{ttf:.1f} h"
+            lines.append(f"{label} ({current}/{capacity}), {full_text}\n  {hourly}")
+        self.forecast_label.config(text="\n".join(lines))
+
+    def _refresh_portfolio(self):
+        """Updates the portfolio metrics on a worker thread, then fills the table."""
+        if self.portfolio is None:
+            return
+        if self._portfolio_thread is not None and self._portfolio_thread.is_alive():
+            return
+
+        def work():
+            try:
+                took = self.portfolio.refresh(property_col, parking_col)
+                print(f"[INFO] Portfolio metrics refreshed in {took * 1000:.0f} ms.")
+            except pymongo.errors.PyMongoError as e:
+                print(f"[ERROR] Portfolio refresh failed: {e}")
+
+        self._portfolio_thread = threading.Thread(target=work, name="portfolio-refresh", daemon=True)
+        self._portfolio_thread.start()
+        self._poll_portfolio()
+
+    def _poll_portfolio(self):
+        if self._portfolio_thread is not None and self._portfolio_thread.is_alive():
+            self.root.after(200, self._poll_portfolio)
+            return
+        self._render_portfolio()
+
+    def _auto_refresh_portfolio(self):
+        if not hasattr(self, 'portfolio_tree') or not self.portfolio_tree.winfo_exists():
+            return
+        self._refresh_portfolio()
+        self.root.after(PORTFOLIO_REFRESH_MS, self._auto_refresh_portfolio)
+
+    def _render_portfolio(self):
+        if not hasattr(self, 'portfolio_tree') or not self.portfolio_tree.winfo_exists():
+            return
+        self.portfolio_tree.delete(*self.portfolio_tree.get_children())
+        rows = self.portfolio.rows()
+        for row in rows:
+            self.portfolio_tree.insert("", "end", values=(
+                row['name'], f"{row['car_occupied']} / {row['car_total']}", f"{row['bike_occupied']} / {row['bike_total']}",
+                row['entries'], row['exits'], f"₹ {row['revenue']:,.2f}"))
+        if rows:
+            total_revenue = sum(r['revenue'] for r in rows)
+            self.portfolio_status_label.config(
+                text=f"Total revenue today: ₹ {total_revenue:,.2f}   (updated {datetime.now():%H:%M:%S}, {self.portfolio.last_refresh_s * 1000:.0f} ms)")
+
+    def _build_dashboard_chart(self, chart_frame):
+        """Creates the revenue bars and the intraday occupancy lines once; they are updated in place and blitted."""
+        fig = Figure(figsize=(8, 2.5), dpi=100)
+        ax_rev = fig.add_subplot(121)
+        ax_occ = fig.add_subplot(122)
+
+        self._revenue_bars = ax_rev.bar(range(7), [0] * 7, color='#0078d4', animated=True)
+        ax_rev.set_xticks(range(7))
+        ax_rev.set_ylim(0, 100)
+        ax_rev.set_ylabel("Revenue (₹)")
+        ax_rev.set_title("Revenue Last 7 Days")
+
+        colors = {"car": '#0078d4', "bike": '#e3008c'}
+        self._occupancy_lines = {}
+        for v_type in CHART_VEHICLE_TYPES:
+            capacity = self.assigned_property_doc.get(f"parking_spaces_{v_type}", 0)
+            self._occupancy_lines[v_type], = ax_occ.plot([], [], drawstyle='steps-post', color=colors[v_type],
+                                                         label=f"{v_type.capitalize()}s", animated=True)
+            ax_occ.axhline(capacity, color=colors[v_type], linestyle=':', linewidth=1) # Capacity
+        ax_occ.set_xlim(0, 24)
+        ax_occ.set_xticks([0, 6, 12, 18, 24])
+        ax_occ.set_ylim(0, max(10, max(self.assigned_property_doc.get(f"parking_spaces_{v}", 0) for v in CHART_VEHICLE_TYPES) * 1.1))
+        ax_occ.set_xlabel("Hour")
+        ax_occ.set_title("Occupancy Today")
+        ax_occ.legend(loc="upper left", fontsize=8)
+        fig.tight_layout() # Once; later updates never re-run the layout
+
+        self._chart_axes = (ax_rev, ax_occ)
+        self._chart_days = None
+        self._chart_background = None
+        self.chart_canvas = FigureCanvasTkAgg(fig, master=chart_frame)
+        self.chart_canvas.mpl_connect('draw_event', self._on_chart_draw)
+        self.chart_canvas.get_tk_widget().pack(fill="both", expand=True)
+
+        # Intraday occupancy: seeded once, then stepped by entry/exit events from this gate and the change feed
+        self.intraday = IntradayOccupancy()
+        self._intraday_thread = None
+        self._occupancy_events = queue.Queue() # Index listeners run on the feed thread; the Tk loop drains this
+        self._occupancy_drawn_at = None
+        self.open_index.add_listener(lambda event, summary: self._occupancy_events.put((event, summary, datetime.now())))
+        self._seed_intraday()
+        self.root.after(500, self._drain_occupancy_events)
+
+    def _chart_artists(self):
+        return list(self._revenue_bars) + list(self._occupancy_lines.values())
+
+    def _on_chart_draw(self, event):
+        """After a full draw (first show, resize, rescale): keep the static background and draw the data on it."""
+        self._chart_background = self.chart_canvas.copy_from_bbox(self.chart_canvas.figure.bbox)
+        for artist in self._chart_artists():
+            artist.axes.draw_artist(artist)
+
+    def _blit_chart(self, full_redraw=False):
+        if not hasattr(self, 'chart_canvas') or not self.chart_canvas.get_tk_widget().winfo_exists():
+            return
+        if full_redraw or self._chart_background is None:
+            self.chart_canvas.draw_idle()
+            return
+        self.chart_canvas.restore_region(self._chart_background)
+        for artist in self._chart_artists():
+            artist.axes.draw_artist(artist)
+        self.chart_canvas.blit(self.chart_canvas.figure.bbox)
+
+    @staticmethod
+    def _rescale_needed(ax, peak):
+        """True if peak no longer fits the y-axis (or uses under a quarter of it); adjusts the limit."""
+        top = ax.get_ylim()[1]
+        if peak <= top and peak >= top / 4:
+            return False
+        new_top = max(10, peak * 1.2)
+        if abs(new_top - top) < 1e-9:
+            return False
+        ax.set_ylim(0, new_top)
+        return True
+
     def _update_revenue_chart(self):
-        """Fetches 7-day revenue data and updates the chart."""
+        """Fetches 7-day revenue data and updates the bar heights in place."""
         prop_id = self.assigned_property_doc.get('_id')
         today = datetime.now()
         dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
@@ -1203,30 +1805,83 @@ class ParkingApp:
                 "daily_revenue": {"$sum": "$fee"}
             }}
         ]
-        result = list(parking_col.aggregate(pipeline))
+        result = list(parking_history.aggregate(pipeline))
         for item in result:
             if item['_id'] in revenue_by_day:
                 revenue_by_day[item['_id']] = item['daily_revenue']
 
-        # --- Create Chart ---
-        fig = Figure(figsize=(5, 2.5), dpi=100)
-        ax = fig.add_subplot(111)
-
-        days = [datetime.strptime(d, "%Y-%m-%d").strftime("%a") for d in revenue_by_day.keys()]
         revenues = list(revenue_by_day.values())
+        for bar, revenue in zip(self._revenue_bars, revenues):
+            bar.set_height(revenue)
+
+        ax_rev = self._chart_axes[0]
+        full_redraw = self._rescale_needed(ax_rev, max(revenues))
+        if self._chart_days != dates: # New day: shift the weekday labels
+            ax_rev.set_xticklabels([datetime.strptime(d, "%Y-%m-%d").strftime("%a") for d in dates])
+            self._chart_days = dates
+            full_redraw = True
+        self._blit_chart(full_redraw)
+
+    def _update_occupancy_chart(self):
+        peak = 0
+        for v_type, line in self._occupancy_lines.items():
+            hours, counts = self.intraday.series(v_type)
+            line.set_data(hours, counts)
+            peak = max([peak] + counts)
+        ax_occ = self._chart_axes[1]
+        capacity = max(self.assigned_property_doc.get(f"parking_spaces_{v}", 0) for v in CHART_VEHICLE_TYPES)
+        top = ax_occ.get_ylim()[1]
+        full_redraw = False
+        if peak > top: # Over capacity (or capacity unset): grow; never shrink below the capacity lines
+            ax_occ.set_ylim(0, max(peak, capacity) * 1.1)
+            full_redraw = True
+        self._blit_chart(full_redraw)
+
+    def _seed_intraday(self):
+        """Reads today's records for the occupancy line on a worker thread."""
+        if self._intraday_thread is not None and self._intraday_thread.is_alive():
+            return
+        prop_id = self.assigned_property_doc.get('_id')
 
-        ax.bar(days, revenues, color='#0078d4')
-        ax.set_ylabel("Revenue (₹)")
-        ax.set_title("Revenue Last 7 Days")
-        fig.tight_layout()
+        def work():
+            try:
+                count = self.intraday.seed(self.repo.parking, prop_id)
+                print(f"[INFO] Intraday occupancy seeded from {count} record(s).")
+            except pymongo.errors.PyMongoError as e:
+                print(f"[ERROR] Intraday occupancy seed failed: {e}")
 
-        # --- Embed in Tkinter ---
-        if hasattr(self, 'chart_canvas'):
-            self.chart_canvas.get_tk_widget().destroy()
+        self._intraday_thread = threading.Thread(target=work, name="intraday-seed", daemon=True)
+        self._intraday_thread.start()
 
-        self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_canvas_placeholder)
-        self.chart_canvas.draw()
-        self.chart_canvas.get_tk_widget().pack(fill="both", expand=True)
+    def _drain_occupancy_events(self):
+        """Applies queued entry/exit events to the occupancy line (Tk thread), and advances it to now."""
+        if not hasattr(self, 'chart_canvas') or not self.chart_canvas.get_tk_widget().winfo_exists():
+            return
+        now = datetime.now()
+        today = now.date()
+        changed = False
+        while True:
+            try:
+                event, summary, seen_at = self._occupancy_events.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if event == 'reload':
+                self._seed_intraday() # The index re-read the open records; events may have been missed
+            elif event == 'add':
+                entry_time = summary.get('entry_time')
+                when = entry_time if isinstance(entry_time, datetime) and entry_time.date() == today else seen_at
+                self.intraday.record(summary.get('vehicle_type'), 1, when)
+            elif event == 'remove':
+                self.intraday.record(summary.get('vehicle_type'), -1, seen_at)
+        seeding = self._intraday_thread is not None and self._intraday_thread.is_alive()
+        # Redraw on events, once a seed has finished, and every minute so the line keeps up with the clock
+        if not seeding and (changed or self._occupancy_drawn_at is None or (now - self._occupancy_drawn_at).total_seconds() >= 60):
+            self._update_occupancy_chart()
+            self._occupancy_drawn_at = now
+        elif seeding:
+            self._occupancy_drawn_at = None
+        self.root.after(500, self._drain_occupancy_events)
 
 
     # --- Build Settings Tab ---
@@ -1288,8 +1943,30 @@ class ParkingApp:
         # Export Button
         ttk.Button(export_frame, text="⬇️ Export to CSV", command=self._export_records_date_range).grid(row=2, column=0, columnspan=2, pady=10)
 
+        # --- Import Records Section (same CSV format as the export) ---
+        import_frame = ttk.LabelFrame(frame, text="Import Parking Records", padding=10)
+        import_frame.grid(row=3, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+        frame._import_status_var = tk.StringVar(value="Import an exported CSV or offline records in the same format.")
+        ttk.Label(import_frame, textvariable=frame._import_status_var).pack(side="left")
+        frame._import_button = ttk.Button(import_frame, text="⬆️ Import from CSV", command=self._import_records_csv)
+        frame._import_button.pack(side="right")
+
+        # --- Evidence Archive Status ---
+        evidence_frame = ttk.LabelFrame(frame, text="Evidence Archive", padding=10)
+        evidence_frame.grid(row=4, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+        frame._evidence_status_var = tk.StringVar(value="Evidence archive disabled.")
+        ttk.Label(evidence_frame, textvariable=frame._evidence_status_var).pack(side="left")
+        ttk.Button(evidence_frame, text="🔄", style="Refresh.TButton", width=3, command=lambda: self._refresh_evidence_status(frame)).pack(side="right")
+
+        # --- Slot Count Reconciliation ---
+        reconcile_frame = ttk.LabelFrame(frame, text="Slot Counts", padding=10)
+        reconcile_frame.grid(row=5, column=0, columnspan=2, sticky="nsew", pady=(5, 0))
+        frame._reconcile_status_var = tk.StringVar(value="Not checked yet.")
+        ttk.Label(reconcile_frame, textvariable=frame._reconcile_status_var).pack(side="left")
+        ttk.Button(reconcile_frame, text="🧮 Reconcile Now", command=self._reconcile_slots_now).pack(side="right")
+
         # Store function ref for easy calling on tab change
-        frame._load_assigned_property_details = lambda: self._load_assigned_property_details(frame)
+        frame._load_assigned_property_details = lambda: (self._load_assigned_property_details(frame), self._refresh_evidence_status(frame))
 
         # Initial load of assigned property details
         frame._load_assigned_property_details()
@@ -1318,6 +1995,25 @@ class ParkingApp:
             messagebox.showerror("UI Error", f"Failed load assigned property details: {e}", parent=self.root)
             self._clear_property_details(settings_tab_frame)
 
+    def _refresh_evidence_status(self, settings_tab_frame):
+        """Shows evidence archive throughput and disk usage in the settings tab."""
+        if self.evidence_archive is None:
+            settings_tab_frame._evidence_status_var.set("Evidence archive disabled.")
+            return
+        st = self.evidence_archive.stats()
+        settings_tab_frame._evidence_status_var.set(
+            f"{st['archived']} archived ({st['deduplicated']} duplicate), {st['dropped']} dropped, {st['failed']} failed | "
+            f"queue {st['queue_depth']} | {st['throughput']:.1f} img/s | {st['disk_mb']:.1f} MB on disk, {st['deleted']} expired")
+
+    def _refresh_reconcile_status(self, settings_tab_frame):
+        """Shows the last slot reconciliation result in the settings tab."""
+        result = self.slot_reconciler.last_result
+        if result is None:
+            return
+        checked = "  ".join(f"{t.capitalize()}: {st['open']}/{st['total']} parked" for t, st in result['types'].items())
+        corrected = f", corrected {', '.join(result['corrected'])}" if result['corrected'] else ", no drift"
+        settings_tab_frame._reconcile_status_var.set(f"{checked} | checked {datetime.now():%H:%M:%S} in {result['seconds'] * 1000:.0f} ms{corrected}")
+
     def _clear_property_details(self, settings_tab_frame):
         """Clears the property detail fields in the settings tab."""
         try:
@@ -1376,45 +2072,28 @@ class ParkingApp:
             return
 
         try:
-            # Fetch the current available spaces before updating totals
-            current_prop_doc = property_col.find_one({"_id": prop_mongo_id})
+            # Make sure the property still exists before updating it
+            current_prop_doc = self.repo.get_property(prop_mongo_id)
             if not current_prop_doc:
                 messagebox.showerror("Save Error", "Could not find the assigned property in the database to update.", parent=self.root)
                 return
 
-            current_available_car = current_prop_doc.get("available_parking_spaces_car", 0)
-            current_available_bike = current_prop_doc.get("available_parking_spaces_bike", 0)
-            current_total_car = current_prop_doc.get("parking_spaces_car", 0)
-            current_total_bike = current_prop_doc.get("parking_spaces_bike", 0)
-
-            # Calculate the difference in total spaces
-            diff_car = spaces_car - current_total_car
-            diff_bike = spaces_bike - current_total_bike
-
-            # Adjust available spaces based on the change in total spaces
-            # Ensure available doesn't exceed new total or go below zero
-            new_available_car = max(0, min(spaces_car, current_available_car + diff_car))
-            new_available_bike = max(0, min(spaces_bike, current_available_bike + diff_bike))
-
-
-            # Prepare update data - update totals, fees, and adjusted available counts
-            update_data = {
-                "$set": {
-                    "parking_spaces_car": spaces_car,
-                    "parking_spaces_bike": spaces_bike,
-                    "available_parking_spaces_car": new_available_car, # Update available based on change
-                    "available_parking_spaces_bike": new_available_bike, # Update available based on change
-                    "fee_per_hour_car": fee_car,
-                    "fee_per_hour_bike": fee_bike
-                    # Add other fee fields if they become editable (e.g., one_hour_rate)
-                }
+            # Prepare update data - totals and fees; available counts are recomputed from the open records below
+            update_fields = {
+                "parking_spaces_car": spaces_car,
+                "parking_spaces_bike": spaces_bike,
+                "fee_per_hour_car": fee_car,
+                "fee_per_hour_bike": fee_bike
+                # Add other fee fields if they become editable (e.g., one_hour_rate)
             }
-            result = property_col.update_one({"_id": prop_mongo_id}, update_data)
+            result = self.repo.update_property(prop_mongo_id, update_fields)
+            if result.matched_count > 0:
+                self._reconcile_soon() # The counters follow the new totals (in the background, with the settle re-check)
 
             if result.modified_count > 0:
                 messagebox.showinfo("Success", f"Property details updated successfully.", parent=self.root)
                 # Refresh the stored property document
-                self.assigned_property_doc = property_col.find_one({"_id": prop_mongo_id})
+                self.assigned_property_doc = self.repo.get_property(prop_mongo_id)
                 # Reload details in settings tab
                 self._load_assigned_property_details(self.settings_tab)
                 # Refresh slots display on Entry/Exit tabs
@@ -1492,9 +2171,9 @@ class ParkingApp:
         btn_manual.config(state="disabled")
         self.root.update_idletasks() # Force UI update
 
-        cap = tab_frame._state.get('cap')
+        stream = tab_frame._state.get('stream')
         # Check again if camera is running
-        if cap is None or not cap.isOpened():
+        if stream is None or not stream.is_streaming():
             messagebox.showwarning("No Camera", "Camera is not running or not selected.", parent=self.root)
             # Restore button states
             btn_capture.config(state="normal" if AVAILABLE_CAMERAS else "disabled", text=original_capture_text) # Re-enable only if cameras exist
@@ -1505,16 +2184,24 @@ class ParkingApp:
                  tab_frame.start_camera()
             return
 
-        append_log_func("Capturing frame...", "INFO")
-        captured_frame = tab_frame._state.get('frame') # Get the latest frame stored by update_feed
+        append_log_func("Capturing frame...", "INFO", stage="capture")
+        event_at = monotonic() # The clip is centred on the capture, not on the (possibly much later) confirmation
+        # Full-resolution still for OCR/evidence if the camera profile has one; else the latest preview frame
+        still_started = perf_counter()
+        captured_frame = stream.grab_still()
+        if captured_frame is not None:
+            append_log_func(f"Still captured at {captured_frame.shape[1]}x{captured_frame.shape[0]}.", "INFO", stage="still",
+                            latency_ms=round((perf_counter() - still_started) * 1000, 1))
+        else:
+            captured_frame = tab_frame._state.get('frame') # Get the latest frame stored by update_feed
 
-        # Fallback: Try one more read if frame wasn't stored (shouldn't happen often)
+        # Fallback: Take the stream's newest frame if the feed hasn't rendered one yet (shouldn't happen often)
         if captured_frame is None:
-            append_log_func("No frame in state, attempting final read...", "WARN")
+            append_log_func("No frame in state, taking newest stream frame...", "WARN")
             try:
-                ok, captured_frame = cap.read()
-                if not ok or captured_frame is None:
-                    raise IOError("Final frame read failed.")
+                _, captured_frame, _ = stream.latest()
+                if captured_frame is None:
+                    raise IOError("No frame available from camera stream.")
             except cv2.error as e: # Catch OpenCV specific errors
                 messagebox.showerror("Capture Error", f"Failed to capture frame (OpenCV error):\n{e}", parent=self.root)
                 append_log_func(f"OpenCV capture error: {e}", "ERROR")
@@ -1554,12 +2241,26 @@ class ParkingApp:
             return
 
         # --- Perform OCR ---
-        plate = self.ocr_service.detect_text(path)
-        append_log_func(f"OCR Result: '{plate}'" if plate and not plate.startswith("OCR Failed") else f"OCR Result: {plate if plate else 'No plate detected'}", "OCR")
+        recent_frames = list(tab_frame._state.get('recent_frames') or [])
+        ocr_started = perf_counter()
+        with METRICS.track('ocr'):
+            if self.multi_frame_ocr is not None and recent_frames:
+                vote = self.multi_frame_ocr.recognise(recent_frames)
+                plate = vote.plate
+                append_log_func(f"Multi-frame vote: '{plate}' agreement {vote.agreement:.0%} from {vote.votes} reading(s)"
+                                + (" (escalated)" if vote.escalated else ""), "OCR", stage="ocr_vote", plate=plate)
+            else:
+                plate = self.ocr_service.detect_text(path)
+        append_log_func(f"OCR Result: '{plate}'" if plate and not plate.startswith("OCR Failed") else f"OCR Result: {plate if plate else 'No plate detected'}", "OCR",
+                        stage="ocr", plate=plate, latency_ms=round((perf_counter() - ocr_started) * 1000, 1))
+
+        # Remember which provider produced the plate so operator corrections count against it
+        ocr_source = 'multi_frame' if (self.multi_frame_ocr is not None and recent_frames) else getattr(self.ocr_service, 'last_provider', None)
 
         # --- Show Confirmation Dialog ---
         def on_confirm_callback(edited_plate):
-            append_log_func(f"Plate Confirmed/Edited: {edited_plate}", "INFO")
+            append_log_func(f"Plate Confirmed/Edited: {edited_plate}", "INFO", stage="confirm", plate=edited_plate, ocr_plate=plate)
+            OCR_STATS.record_outcome(ocr_source, plate, edited_plate)
             try:
                 btn_capture.config(text="⏳ Saving...") # Update button state before save
                 self.root.update_idletasks()
@@ -1567,16 +2268,22 @@ class ParkingApp:
 
             log_date_to_refresh = tab_frame._log_date_var.get() if hasattr(tab_frame, '_log_date_var') else None
             # Use assigned_prop_name here
-            self._save_record(edited_plate, is_entry, append_log_func, assigned_prop_name, vehicle_type, refresh_slots, log_date_to_refresh)
+            parking_id = self._save_record(edited_plate, is_entry, append_log_func, assigned_prop_name, vehicle_type, refresh_slots,
+                                           log_date_to_refresh, event_at=event_at)
+            # The dialog leaves the confirmed image to us: archive it as evidence (or delete it)
+            self._archive_capture(path, parking_id, edited_plate, "entry" if is_entry else "exit")
 
         def on_retake_callback():
             append_log_func("Retake/Cancel requested.", "INFO")
 
 
         try:
-            dialog = EditableDialog(self.root, path, plate, on_confirm_callback, on_retake_callback)
+            preview = None if is_entry else self._exit_fee_preview
+            suggest = None if is_entry else self._exit_suggestions
+            dialog = EditableDialog(self.root, path, plate, on_confirm_callback, on_retake_callback, keep_image_on_confirm=True,
+                                    preview_func=preview, suggest_func=suggest)
             dialog.bind("<Destroy>", lambda e, b_cap=btn_capture, b_man=btn_manual, txt=original_capture_text: (
-                b_cap.config(state="normal" if tab_frame._state.get('cap') and tab_frame._state['cap'].isOpened() else "disabled", text=txt if tab_frame._state.get('cap') and tab_frame._state['cap'].isOpened() else "🚫 Camera Stopped"),
+                b_cap.config(state="normal" if tab_frame._camera_live() else "disabled", text=txt if tab_frame._camera_live() else "🚫 Camera Offline"),
                 b_man.config(state="normal" if self.assigned_property_doc else "disabled") # Check assigned_property_doc
             ), add="+")
 
@@ -1603,6 +2310,7 @@ class ParkingApp:
         assigned_prop_name = self.assigned_property_doc.get('name', 'Error')
 
         section = "Entry" if is_entry else "Exit"
+        event_at = monotonic() # The vehicle is at the gate now; typing the plate comes after
         plate = simpledialog.askstring("Manual Input", f"Enter Number Plate for Manual {section} ({vehicle_type}):", parent=self.root)
 
         if not plate: # User cancelled or entered nothing
@@ -1616,7 +2324,7 @@ class ParkingApp:
             append_log_func(f"Manual input validation failed: '{plate}'", "WARN")
             return
 
-        append_log_func(f"Manual Plate Entered: {plate} ({vehicle_type}) for {section}", "INFO")
+        append_log_func(f"Manual Plate Entered: {plate} ({vehicle_type}) for {section}", "INFO", stage="manual", plate=plate)
 
         original_manual_text = btn_manual['text']
         try:
@@ -1628,12 +2336,13 @@ class ParkingApp:
         try:
             log_date_to_refresh = tab_frame._log_date_var.get() if hasattr(tab_frame, '_log_date_var') else None
             # Use assigned_prop_name here
-            self._save_record(plate, is_entry, append_log_func, assigned_prop_name, vehicle_type, refresh_slots, log_date_to_refresh)
+            self._save_record(plate, is_entry, append_log_func, assigned_prop_name, vehicle_type, refresh_slots, log_date_to_refresh,
+                              event_at=event_at)
         finally:
             # Restore button states after save attempt (success or failure)
             try:
                 btn_manual.config(state="normal", text=original_manual_text)
-                is_cam_running = tab_frame._state.get('cap') and tab_frame._state['cap'].isOpened()
+                is_cam_running = tab_frame._camera_live()
                 capture_button_state = "normal" if is_cam_running else "disabled"
                 capture_button_text = "📸 Capture & Process" if is_cam_running else "🚫 Camera Stopped"
                 if not self.assigned_property_doc: # Check assigned property again
@@ -1644,13 +2353,20 @@ class ParkingApp:
             except tk.TclError: pass # Ignore if buttons destroyed
 
 
-    def _save_record(self, plate, is_entry, append_log_func, prop_name, vehicle_type, refresh_slots_func, log_date_to_refresh=None):
-        """Saves entry/exit record to DB, updates slots, calculates fee on exit, and refreshes log for the specified date."""
+    def _save_record(self, plate, is_entry, append_log_func, prop_name, vehicle_type, refresh_slots_func, log_date_to_refresh=None, event_at=None):
+        """Saves entry/exit record to DB, updates slots, calculates fee on exit, and refreshes log for the specified date.
+        event_at is the monotonic() time of the capture (the clip is centred on it; defaults to now).
+        Returns the parking_id of the saved record, or None if nothing was saved."""
         ## ANALYSIS: Uses the assigned property document fetched during login.
+        saved_parking_id = None
         now = datetime.now()
-        v_type_lower = vehicle_type.lower() # Use lowercase for consistency in DB keys
+        started = perf_counter()
+        if event_at is None:
+            event_at = monotonic()
         action = "entry" if is_entry else "exit"
-        append_log_func(f"Attempting to save {action} for {plate} ({vehicle_type})...", "SAVE")
+        append_log_func(f"Attempting to save {action} for {plate} ({vehicle_type})...", "SAVE", stage="save", plate=plate)
+        # Fields for the outcome events: how long the database round trips took
+        outcome = lambda status: {'stage': "save", 'plate': plate, 'status': status, 'latency_ms': round((perf_counter() - started) * 1000, 1)}
 
         if not self.assigned_property_doc:
              messagebox.showerror("Save Error", "Assigned property data is missing. Cannot save record.", parent=self.root)
@@ -1672,111 +2388,60 @@ class ParkingApp:
             return
 
         try:
-            avail_space_key = f"available_parking_spaces_{v_type_lower}"
-            total_space_key = f"parking_spaces_{v_type_lower}"
-            fee_key = f"fee_per_hour_{v_type_lower}"
-
             if is_entry:
                 # --- Handle Vehicle Entry ---
-                existing_entry = parking_col.find_one({"vehicle_no": plate, "property_id": pid, "exit_time": None})
-                if existing_entry:
+                result = self.repo.record_entry(prop, plate, vehicle_type, now, self.open_index)
+                if result.status == parking_ops.DUPLICATE_ENTRY:
                     messagebox.showwarning("Duplicate Entry", f"Vehicle {plate} already has an active parking session at {prop_name}.", parent=self.root)
-                    append_log_func(f"Duplicate entry prevented: {plate} at {prop_name}.", "WARN")
+                    append_log_func(f"Duplicate entry prevented: {plate} at {prop_name}.", "WARN", **outcome(result.status))
                     return
-
-                # Re-fetch latest property details just before update for accurate counts
-                latest_prop = property_col.find_one({"_id": pid}, {avail_space_key: 1})
-                if not latest_prop or latest_prop.get(avail_space_key, 0) <= 0:
+                if result.status == parking_ops.PARKING_FULL:
                     messagebox.showwarning("Parking Full", f"No {vehicle_type} slots currently available at {prop_name}.", parent=self.root)
-                    append_log_func(f"Entry failed: Parking full ({vehicle_type}) for {plate} at {prop_name}.", "WARN")
+                    append_log_func(f"Entry failed: Parking full ({vehicle_type}) for {plate} at {prop_name}.", "WARN", **outcome(result.status))
                     return
 
-                # Create new parking record
-                new_record = {
-                    "parking_id": str(uuid.uuid4()),
-                    "property_id": pid,
-                    "vehicle_no": plate,
-                    "vehicle_type": vehicle_type,
-                    "entry_time": now,
-                    "exit_time": None,
-                    "fee": 0,
-                    "mode_of_payment": None
-                }
-                insert_result = parking_col.insert_one(new_record)
-
-                # Decrement available space count for the property
-                update_result = property_col.update_one(
-                    {"_id": pid, avail_space_key: {"$gt": 0}},
-                    {"$inc": {avail_space_key: -1}}
-                )
-
-                if insert_result.inserted_id and update_result.modified_count > 0:
-                    append_log_func(f"Entry Saved: {plate} ({vehicle_type}) @ {now:%Y-%m-%d %H:%M:%S}", "SAVE")
+                saved_parking_id = result.parking_id
+                if result.status == parking_ops.ENTRY_SAVED:
+                    append_log_func(f"Entry Saved: {plate} ({vehicle_type}) @ {now:%Y-%m-%d %H:%M:%S}", "SAVE", parking_id=result.parking_id, **outcome(result.status))
                     messagebox.showinfo("Entry Success", f"{vehicle_type} {plate} entry recorded successfully at {prop_name}.", parent=self.root)
                     # Refresh the stored property doc after update
-                    self.assigned_property_doc = property_col.find_one({"_id": pid})
+                    self.assigned_property_doc = self.repo.get_property(pid)
                     self._load_logs(self.entry_tab._log_widget, True, log_date_to_refresh)
-                elif insert_result.inserted_id:
-                     append_log_func(f"Entry saved for {plate}, but slot count update failed (maybe already 0?).", "WARN")
-                     messagebox.showwarning("DB Warning", "Entry recorded, but failed to update slot count. Please check property details.", parent=self.root)
-                     self.assigned_property_doc = property_col.find_one({"_id": pid}) # Refresh anyway
+                elif result.status == parking_ops.ENTRY_SAVED_NO_SLOT:
+                     append_log_func(f"Entry saved for {plate}, but slot count update failed (maybe already 0?). Reconciling slot counts.", "WARN",
+                                     parking_id=result.parking_id, **outcome(result.status))
+                     self.assigned_property_doc = self.repo.get_property(pid) # Refresh anyway
                      self._load_logs(self.entry_tab._log_widget, True, log_date_to_refresh)
+                     self._reconcile_slots() # Recount from the open records instead of asking staff to fix it
                 else:
-                     append_log_func(f"Entry DB insert issue for {plate}.", "ERROR")
+                     append_log_func(f"Entry DB insert issue for {plate}.", "ERROR", **outcome(result.status))
                      messagebox.showerror("DB Error", "Failed to save entry record to database.", parent=self.root)
 
             else:
                 # --- Handle Vehicle Exit ---
-                updated_doc = parking_col.find_one_and_update(
-                    {"vehicle_no": plate, "exit_time": None, "property_id": pid},
-                    {"$set": {"exit_time": now}},
-                    sort=[('entry_time', -1)],
-                    return_document=pymongo.ReturnDocument.AFTER
-                )
-
-                if updated_doc:
-                    entry_time = updated_doc.get('entry_time')
-                    calculated_fee = 0.0
-                    exiting_vehicle_type = updated_doc.get('vehicle_type', 'Unknown')
-                    exiting_v_type_lower = exiting_vehicle_type.lower()
-                    exit_fee_key = f"fee_per_hour_{exiting_v_type_lower}"
-                    exit_avail_space_key = f"available_parking_spaces_{exiting_v_type_lower}"
-
-                    if entry_time and isinstance(entry_time, datetime):
-                        duration = now - entry_time
-                        total_hours = duration.total_seconds() / 3600
-                        # Use fee from the stored property doc
-                        fee_per_hour = prop.get(exit_fee_key, 10.0)
-
-                        if not isinstance(fee_per_hour, (int, float)) or fee_per_hour < 0:
-                            print(f"[WARN] Invalid {exit_fee_key} ({fee_per_hour}) in DB for {prop_name}. Using default 10.0.")
-                            fee_per_hour = 10.0
-
-                        if total_hours <= 1.0:
-                            calculated_fee = 0.0
-                        else:
-                            chargeable_hours = math.ceil(total_hours) - 1
-                            calculated_fee = chargeable_hours * fee_per_hour
-
-                        calculated_fee = round(max(0.0, calculated_fee), 2)
-                        parking_col.update_one({"_id": updated_doc["_id"]}, {"$set": {"fee": calculated_fee}})
-                        append_log_func(f"Fee Calculated: ₹{calculated_fee:.2f} ({total_hours:.2f} hrs).", "INFO")
+                result = self.repo.record_exit(prop, plate, now, self.open_index)
+                if result.status == parking_ops.EXIT_SAVED:
+                    saved_parking_id = result.parking_id
+                    exiting_vehicle_type = result.record.get('vehicle_type', 'Unknown')
+                    calculated_fee = result.fee if result.fee is not None else 0.0
+                    if result.fee is not None:
+                        append_log_func(f"Fee Calculated: ₹{result.fee:.2f} ({result.hours:.2f} hrs).", "INFO")
                     else:
                         append_log_func(f"Could not calculate fee for {plate}: Invalid or missing entry time in record.", "WARN")
                         messagebox.showwarning("Fee Warning", "Could not calculate parking fee. Entry time missing or invalid.", parent=self.root)
 
-                    # Increment available space count for the correct vehicle type
-                    property_col.update_one({"_id": pid}, {"$inc": {exit_avail_space_key: 1}})
-
                     log_msg = f"Exit Saved: {plate} ({exiting_vehicle_type}) Fee: ₹{calculated_fee:.2f} @ {now:%Y-%m-%d %H:%M:%S}"
-                    append_log_func(log_msg, "SAVE")
+                    append_log_func(log_msg, "SAVE", parking_id=saved_parking_id, fee=calculated_fee, **outcome(result.status))
                     messagebox.showinfo("Exit Success", f"Exit recorded for {plate} from {prop_name}.\nCalculated Fee: ₹{calculated_fee:.2f}", parent=self.root)
                     # Refresh the stored property doc after update
-                    self.assigned_property_doc = property_col.find_one({"_id": pid})
+                    self.assigned_property_doc = self.repo.get_property(pid)
                     self._load_logs(self.exit_tab._log_widget, False, log_date_to_refresh)
                 else:
-                    messagebox.showwarning("No Entry Found", f"No active parking session found for {plate} at {prop_name}.", parent=self.root)
-                    append_log_func(f"Exit failed: No open entry found for {plate} at {prop_name}.", "WARN")
+                    suggestions = self._exit_suggestions(plate)
+                    hint = f"\n\nClosest open entries: {', '.join(suggestions)}" if suggestions else ""
+                    messagebox.showwarning("No Entry Found", f"No active parking session found for {plate} at {prop_name}.{hint}", parent=self.root)
+                    append_log_func(f"Exit failed: No open entry found for {plate} at {prop_name}." + (f" Did you mean {', '.join(suggestions)}?" if suggestions else ""), "WARN",
+                                    suggestions=suggestions or None, **outcome(result.status))
 
             # Refresh the slot count display on the current tab after entry or exit
             if callable(refresh_slots_func):
@@ -1786,10 +2451,10 @@ class ParkingApp:
 
         except pymongo.errors.ConnectionFailure as e:
             messagebox.showerror("Database Error", f"Database connection lost during save:\n{e}", parent=self.root)
-            append_log_func(f"DB Connection Failure during save: {e}", "ERROR")
+            append_log_func(f"DB Connection Failure during save: {e}", "ERROR", **outcome("connection_failure"))
         except pymongo.errors.PyMongoError as e: # Catch specific pymongo errors
             messagebox.showerror("Database Error", f"A database error occurred during save:\n{e}", parent=self.root)
-            append_log_func(f"DB Error during save: {e}", "ERROR")
+            append_log_func(f"DB Error during save: {e}", "ERROR", **outcome("db_error"))
         except Exception as e:
             messagebox.showerror("Unexpected Error", f"An unexpected error occurred while saving record:\n{e}", parent=self.root)
             append_log_func(f"Unexpected Save Error: {e}", "ERROR")
@@ -1801,7 +2466,45 @@ class ParkingApp:
                       refresh_slots_func()
                   except Exception as refresh_e:
                       print(f"[ERROR] Error during final slot refresh in _save_record: {refresh_e}")
+        if saved_parking_id:
+            self._request_clip(is_entry, saved_parking_id, plate, action, event_at)
+        return saved_parking_id
+
+    # --- Evidence Handling ---
+    def _archive_capture(self, image_path, parking_id, plate, action):
+        """Hands a confirmed capture to the evidence archive, or deletes it if nothing was saved/archiving is off."""
+        if not image_path or not os.path.exists(image_path):
+            return
+        if parking_id and self.evidence_archive is not None:
+            if self.evidence_archive.submit(image_path, parking_id, plate, action, delete_source=True):
+                return
+        try:
+            os.remove(image_path)
+            print(f"[INFO] Deleted temp image: {image_path}")
+        except Exception as e:
+            print(f"[ERROR] Deleting temp image {image_path}: {e}")
 
+    def _link_evidence(self, record):
+        """Runs on the archive thread: links an archived image to its parking record."""
+        self.repo.link_evidence(record['parking_id'],
+                                {"path": record['path'], "sha256": record['sha256'], "action": record['action'], "archived_at": datetime.now()})
+
+
+    def _request_clip(self, is_entry, parking_id, plate, action, event_at):
+        """Queues a clip from the lane's camera ring buffer (no-op if clips are off or the lane has no camera)."""
+        if self.clip_writer is None:
+            return
+        tab = self.entry_tab if is_entry else self.exit_tab
+        stream = tab._state.get('stream') if hasattr(tab, '_state') else None
+        if stream is None or stream.clip_ring is None:
+            return
+        self.clip_writer.submit(stream.clip_ring, parking_id, plate, action, event_at)
+
+    def _link_clip(self, record):
+        """Runs on the clip writer thread: links a written clip to its parking record."""
+        self.repo.link_evidence(record['parking_id'],
+                                {"path": record['path'], "kind": "clip", "action": record['action'],
+                                 "seconds": record['seconds'], "archived_at": datetime.now()})
 
     def _load_logs(self, log_widget, is_entry, selected_date_str=None):
         """Loads parking records for a specific date and the assigned property into the specified log display."""
@@ -1824,8 +2527,6 @@ class ParkingApp:
 
         try:
             selected_date = datetime.strptime(selected_date_str, "%Y-%m-%d")
-            start_of_day = datetime.combine(selected_date.date(), time.min)
-            end_of_day = datetime.combine(selected_date.date(), time.max)
             date_header = selected_date.strftime("%Y-%m-%d") # For the log title
         except ValueError:
             messagebox.showerror("Invalid Date", f"Invalid date format: '{selected_date_str}'. Please use YYYY-MM-DD.", parent=self.root)
@@ -1843,24 +2544,10 @@ class ParkingApp:
 
         print(f"[INFO] Loading {section.lower()} logs for property '{self.assigned_property_doc.get('name')}' on date: {date_header}...") # Console log
 
+        load_started = perf_counter()
         try:
-            # Define query based on entry/exit, date range, AND property_id
-            if is_entry:
-                query = {
-                    "property_id": assigned_prop_mongo_id, # Filter by assigned property
-                    "entry_time": {"$gte": start_of_day, "$lte": end_of_day},
-                    "exit_time": None
-                }
-                sort_key = "entry_time"
-            else:
-                query = {
-                    "property_id": assigned_prop_mongo_id, # Filter by assigned property
-                    "exit_time": {"$gte": start_of_day, "$lte": end_of_day}
-                }
-                sort_key = "exit_time"
-
-            records_cursor = parking_col.find(query).sort(sort_key, pymongo.DESCENDING)
-            records_list = list(records_cursor)
+            # Records for the date range AND property_id (entry log: still parked; exit log: exited that day)
+            records_list = self.repo.log_records(assigned_prop_mongo_id, is_entry, selected_date.date())
 
             if not records_list:
                 log_widget.config(state=tk.NORMAL)
@@ -1904,6 +2591,8 @@ class ParkingApp:
             traceback.print_exc()
             messagebox.showerror("Log Error", f"Failed to load logs:\n{e}", parent=self.root)
             log_widget.config(state=tk.NORMAL); log_widget.insert(tk.END, "Error loading logs\n"); log_widget.config(state=tk.DISABLED)
+        finally:
+            METRICS.observe('load_logs', (perf_counter() - load_started) * 1000)
 
     def _export_records_date_range(self):
         """Exports parking records for the assigned property within a selected date range to CSV."""
@@ -1950,13 +2639,12 @@ class ParkingApp:
                     "$lte": end_date_exclusive
                 }
             }
-            records_cursor = parking_col.find(query).sort("entry_time", pymongo.ASCENDING)
+            records_cursor = parking_history.find(query).sort("entry_time", pymongo.ASCENDING) # Live and archived records
 
             count = 0
             with open(path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                header = ["Plate", "Vehicle Type", "Entry Time", "Exit Time", "Fee (₹)", "Property Name", "Parking ID"] # Changed Property ID header
-                writer.writerow(header)
+                writer.writerow(parking_ops.EXPORT_COLUMNS) # Property name instead of ID
 
                 for record in records_cursor:
                     entry_ts = record.get('entry_time')
@@ -1966,8 +2654,8 @@ class ParkingApp:
                     writer.writerow([
                         record.get('vehicle_no', 'N/A'),
                         record.get('vehicle_type', ''),
-                        entry_ts.strftime('%Y-%m-%d %H:%M:%S') if entry_ts else '',
-                        exit_ts.strftime('%Y-%m-%d %H:%M:%S') if exit_ts else 'PARKED',
+                        entry_ts.strftime(parking_ops.EXPORT_TIME_FORMAT) if entry_ts else '',
+                        exit_ts.strftime(parking_ops.EXPORT_TIME_FORMAT) if exit_ts else 'PARKED',
                         f"{fee:.2f}" if isinstance(fee, (int, float)) else '',
                         assigned_prop_name, # Write property name instead of ID
                         record.get('parking_id', '')
@@ -1992,10 +2680,207 @@ class ParkingApp:
             print(f"[ERROR] Export error: {e}")
             traceback.print_exc()
 
+    def _import_records_csv(self):
+        """Imports an export-format CSV into the assigned property on a worker thread."""
+        if not self.assigned_property_doc:
+            messagebox.showerror("Error", "Cannot import records, assigned property not loaded.", parent=self.root)
+            return
+        if self._import_thread is not None and self._import_thread.is_alive():
+            return
+        path = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Import Parking Records",
+            parent=self.root
+        )
+        if not path: return
+        prop_name = self.assigned_property_doc.get('name', 'UnknownProperty')
+        if not messagebox.askyesno("Confirm Import", f"Import records from:\n{path}\n\ninto property '{prop_name}'?\n"
+                                   "Slot counts are recalculated from the open records afterwards.", parent=self.root):
+            return
+
+        rejects_path = os.path.splitext(path)[0] + "_rejected.csv"
+        lookup_cols = [parking_col] + ([archive_col] if archive_col is not None else []) # Archived records count as imported
+        importer = BulkImporter(parking_col, property_col, self.assigned_property_doc, lookup_cols=lookup_cols,
+                                batch_size=IMPORT_BATCH_SIZE, reconciler=self.slot_reconciler)
+        self._import_progress = {'rows': 0, 'imported': 0, 'duplicates': 0, 'rejected': 0}
+
+        def work():
+            try:
+                self._import_progress = importer.run(path, rejects_path, on_progress=lambda st: setattr(self, '_import_progress', st))
+            except (pymongo.errors.PyMongoError, OSError, UnicodeDecodeError) as e:
+                print(f"[ERROR] Import of {path} failed: {e}")
+                self._import_progress = dict(importer.stats, error=str(e))
+
+        print(f"[INFO] Importing records for property '{prop_name}' from {path}")
+        self.settings_tab._import_button.config(state="disabled")
+        self._import_thread = threading.Thread(target=work, name="bulk-import", daemon=True)
+        self._import_thread.start()
+        self._poll_import(path, rejects_path)
+
+    def _poll_import(self, path, rejects_path):
+        st = self._import_progress
+        status_var = self.settings_tab._import_status_var
+        if self._import_thread is not None and self._import_thread.is_alive():
+            status_var.set(f"Importing... {st['rows']} rows read, {st['imported']} imported, {st['rejected']} rejected")
+            self.root.after(200, lambda: self._poll_import(path, rejects_path))
+            return
+        self.settings_tab._import_button.config(state="normal")
+        summary = (f"{st['rows']} rows read, {st['imported']} imported, {st['duplicates']} duplicate(s) skipped, "
+                   f"{st['rejected']} rejected")
+        status_var.set(summary)
+        if 'error' in st:
+            messagebox.showerror("Import Error", f"Import stopped:\n{st['error']}\n\n{summary}", parent=self.root)
+            return
+        print(f"[INFO] Import finished: {summary} in {st['seconds']:.1f}s ({st['rows_per_s']:.0f} rows/s).")
+        message = f"{summary}\nTook {st['seconds']:.1f}s ({st['rows_per_s']:.0f} rows/s)."
+        if st['rejected']:
+            message += f"\n\nRejected rows and reasons were written to:\n{rejects_path}"
+        messagebox.showinfo("Import Finished", message, parent=self.root)
+
+        if st['imported']:
+            try:
+                self.assigned_property_doc = self.repo.get_property(self.assigned_property_doc['_id']) or self.assigned_property_doc
+            except pymongo.errors.PyMongoError as e:
+                print(f"[WARN] Could not re-read property after import: {e}")
+            if self.open_index.loaded and not self.open_index.ready:
+                self._load_open_index() # No change feed to deliver the imported open sessions
+            self._load_assigned_property_details(self.settings_tab)
+            self._refresh_dashboard_data()
+
+    # --- Diagnostics Panel (Manager role only) ---
+    def _toggle_diagnostics(self, event=None):
+        """Opens the diagnostics window, or closes it if it is open (hotkey)."""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self._close_diagnostics()
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Diagnostics")
+        win.resizable(False, False)
+        win.protocol("WM_DELETE_WINDOW", self._close_diagnostics)
+        self.diagnostics_window = win
+
+        counters = ttk.LabelFrame(win, text="Live Counters", padding=10)
+        counters.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 5))
+        win._counter_vars = {}
+        for row, (key, label) in enumerate((("camera", "Camera FPS:"), ("render", "Render:"), ("ocr", "OCR:"), ("queues", "Queues:"),
+                                            ("load_logs", "Load logs:"), ("db", "Database:"), ("memory", "Memory:"), ("event_log", "Event log:"))):
+            ttk.Label(counters, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            win._counter_vars[key] = tk.StringVar(value="...")
+            ttk.Label(counters, textvariable=win._counter_vars[key], font=("Consolas", 9)).grid(row=row, column=1, sticky="w", padx=5, pady=2)
+
+        prof = ttk.LabelFrame(win, text="Profiler", padding=10)
+        prof.grid(row=1, column=0, sticky="ew", padx=10, pady=(5, 10))
+        win._profiler_mode_var = tk.StringVar(value=PROFILER_MODE if PROFILER_MODE in PROFILER_MODES else PROFILER_MODES[0])
+        mode_box = ttk.Combobox(prof, textvariable=win._profiler_mode_var, values=PROFILER_MODES, state="readonly", width=10)
+        mode_box.grid(row=0, column=0, padx=5, pady=2)
+        win._profiler_button = ttk.Button(prof, text="Start Profiling", command=self._toggle_profiler)
+        win._profiler_button.grid(row=0, column=1, padx=5, pady=2)
+        win._profiler_mode_box = mode_box
+        win._profiler_status_var = tk.StringVar(value=f"Saves to {os.path.abspath(PROFILE_DIR)}")
+        ttk.Label(prof, textvariable=win._profiler_status_var, wraplength=420).grid(row=1, column=0, columnspan=2, sticky="w", padx=5, pady=2)
+        win._profiler_top_var = tk.StringVar(value="")
+        ttk.Label(prof, textvariable=win._profiler_top_var, font=("Consolas", 8), justify="left").grid(row=2, column=0, columnspan=2, sticky="w", padx=5)
+        if self.profiler is not None and self.profiler.running: # Reopened while a profile is being recorded
+            win._profiler_button.config(text="Stop & Save")
+            mode_box.config(state="disabled")
+
+        self._refresh_diagnostics()
+
+    def _close_diagnostics(self):
+        """Closes the window; a running profiler keeps recording until stopped from a reopened panel or exit."""
+        if self._diagnostics_after_id is not None:
+            try: self.root.after_cancel(self._diagnostics_after_id)
+            except tk.TclError: pass
+            self._diagnostics_after_id = None
+        if self.diagnostics_window is not None:
+            try: self.diagnostics_window.destroy()
+            except tk.TclError: pass
+        self.diagnostics_window = None
+
+    @staticmethod
+    def _format_timing(timing):
+        if timing is None:
+            return "n/a"
+        return f"avg {timing['avg_ms']:.1f} ms, p95 {timing['p95_ms']:.1f} ms, last {timing['last_ms']:.1f} ms ({timing['count']})"
+
+    def _refresh_diagnostics(self):
+        """Updates the live counters (Tk thread, every DIAGNOSTICS_REFRESH_MS while the window is open)."""
+        win = self.diagnostics_window
+        if win is None or not win.winfo_exists():
+            self._diagnostics_after_id = None
+            return
+        values = win._counter_vars
+        cameras = self.camera_manager.health()
+        values['camera'].set(", ".join(f"{c['name']} {c['fps']:.1f} ({c['state']})"
+                                       + (f", lag {c['lag_ms']:.0f} ms, jitter {c['jitter_ms']:.1f} ms, {c['dropped']} stale" if 'lag_ms' in c else "")
+                                       + (f", clip buffer {c['clip_buffer']['mb']:.1f} MB" if c.get('clip_buffer') else "")
+                                       for c in cameras) or "no camera open")
+        values['render'].set(self._format_timing(METRICS.timing('render')))
+        values['ocr'].set(self._format_timing(METRICS.timing('ocr')))
+        # Work waiting on background threads (OCR itself runs on this thread, so only pools and hedges can queue)
+        queues = [f"OCR {self.ocr_service.pending()}"]
+        for label, writer in (("evidence", self.evidence_archive), ("clips", self.clip_writer)):
+            queues.append(f"{label} {writer.stats()['queue_depth']}" if writer is not None else f"{label} off")
+        values['queues'].set(", ".join(queues))
+        values['load_logs'].set(self._format_timing(METRICS.timing('load_logs')))
+        failed = METRICS.timing('db_failed')
+        db_text = self._format_timing(METRICS.timing('db')) if self.repo.shared else f"{self.repo.backend} store (in process)"
+        values['db'].set(db_text + (f"; {failed['count']} failed" if failed else ""))
+        memory = process_memory_mb()
+        values['memory'].set(f"{memory:.0f} MB" if memory is not None else "n/a")
+        if EVENT_LOG is not None:
+            st = EVENT_LOG.stats()
+            values['event_log'].set(f"{st['written']} written, {st['queued']} queued, {st['dropped']} dropped")
+        else:
+            values['event_log'].set("disabled")
+
+        if self.profiler is not None and self.profiler.running:
+            elapsed = perf_counter() - self.profiler.started_at
+            if hasattr(self.profiler, 'top'):
+                win._profiler_status_var.set(f"Sampling for {elapsed:.0f}s ({self.profiler.samples} samples)...")
+                win._profiler_top_var.set("\n".join(f"{share:5.1%}  {leaf}" for leaf, share in self.profiler.top(8)))
+            else:
+                win._profiler_status_var.set(f"Profiling the UI thread for {elapsed:.0f}s...")
+        self._diagnostics_after_id = self.root.after(DIAGNOSTICS_REFRESH_MS, self._refresh_diagnostics)
+
+    def _toggle_profiler(self):
+        """Starts a profile in the selected mode, or stops the running one and saves it."""
+        win = self.diagnostics_window
+        if self.profiler is not None and self.profiler.running:
+            path = self._stop_profiler()
+            if win is not None and win.winfo_exists():
+                win._profiler_button.config(text="Start Profiling")
+                win._profiler_mode_box.config(state="readonly")
+                win._profiler_status_var.set(f"Saved {path}" if path else "Could not save the profile (see log).")
+            return
+        try:
+            self.profiler = create_profiler(win._profiler_mode_var.get(), PROFILER_INTERVAL_MS)
+        except ValueError as e:
+            messagebox.showerror("Profiler", str(e), parent=win)
+            return
+        self.profiler.start()
+        print(f"[INFO] Profiler started ({win._profiler_mode_var.get()}).")
+        win._profiler_button.config(text="Stop & Save")
+        win._profiler_mode_box.config(state="disabled")
+        win._profiler_top_var.set("")
+
+    def _stop_profiler(self):
+        """Stops a running profiler and writes it under PROFILE_DIR. Returns the path, or None on failure."""
+        if self.profiler is None or not self.profiler.running:
+            return None
+        self.profiler.stop()
+        try:
+            path = self.profiler.save(profile_path(PROFILE_DIR, self.profiler))
+        except OSError as e:
+            print(f"[ERROR] Saving profile: {e}")
+            return None
+        print(f"[INFO] Profile of {self.profiler.seconds:.1f}s saved to {path}")
+        return path
+
 # --- Main Execution ---
 if __name__ == "__main__":
     # Crucial check: Ensure DB connection was successful before starting GUI
-    if db is None or client is None or parking_col is None or property_col is None or user_col is None or employee_col is None:
+    if repository is None or parking_col is None or property_col is None or user_col is None or employee_col is None:
          print("[FATAL] Exiting: Database connection or collection initialization failed.")
          try:
              root_err = tk.Tk(); root_err.withdraw()
@@ -2023,7 +2908,7 @@ if __name__ == "__main__":
                     print("[WARN] Could not cancel date/time update loop (already cancelled or window destroyed).")
                 app.datetime_after_id = None
 
-            # Stop cameras only if the main app was built and tabs exist
+            # Detach tabs from their cameras only if the main app was built and tabs exist
             if hasattr(app, 'entry_tab') and hasattr(app, 'exit_tab'):
                 tabs_to_check = [app.entry_tab, app.exit_tab] # Add settings tab if it might have camera later
                 # if hasattr(app, 'settings_tab'): tabs_to_check.append(app.settings_tab)
@@ -2036,15 +2921,50 @@ if __name__ == "__main__":
                         except Exception as e:
                             print(f"[ERROR] Error stopping camera during shutdown: {e}")
 
-            # Close MongoDB connection
-            global client
-            if client:
+            # Close any camera streams still open in the background
+            try:
+                app.camera_manager.close_all()
+            except Exception as e:
+                print(f"[ERROR] Error closing camera streams during shutdown: {e}")
+
+            # Stop following the open-vehicle change feed
+            if hasattr(app, 'open_index'):
+                app.open_index.stop()
+            # Let a running tiering job stop after its current batch
+            if hasattr(app, '_tiering_stop'):
+                app._tiering_stop.set()
+
+            # Flush the evidence archive (queued captures are written before exit)
+            if getattr(app, 'evidence_archive', None) is not None:
+                app.evidence_archive.stop()
+                stats = app.evidence_archive.stats()
+                print(f"[INFO] Evidence archive: {stats['archived']} archived, {stats['dropped']} dropped, "
+                      f"{stats['throughput']:.1f} img/s, {stats['disk_mb']:.1f} MB on disk.")
+
+            # Keep a profile that was still recording
+            if hasattr(app, 'profiler'):
+                app._stop_profiler()
+
+            # Write queued clips (without waiting for their post-event seconds)
+            if getattr(app, 'clip_writer', None) is not None:
+                app.clip_writer.stop()
+                stats = app.clip_writer.stats()
+                print(f"[INFO] Clips: {stats['written']} written, {stats['dropped']} dropped, {stats['empty']} without frames, "
+                      f"{stats['failed']} failed.")
+
+            # Report OCR provider counters for this session
+            for line in OCR_STATS.summary_lines():
+                print(f"[INFO] OCR {line}")
+
+            # Close the database connection (or flush the local store)
+            global repository
+            if repository:
                 try:
-                    client.close()
-                    print("[INFO] MongoDB connection closed.")
+                    repository.close()
+                    print(f"[INFO] Storage '{repository.backend}' closed.")
                 except Exception as e:
-                    print(f"[ERROR] Error closing MongoDB connection: {e}")
-                client = None # Clear the reference
+                    print(f"[ERROR] Error closing storage: {e}")
+                repository = None # Clear the reference
 
             root.destroy() # Close the Tkinter window
             print("[INFO] Application closed.")
@@ -2056,3 +2976,10 @@ if __name__ == "__main__":
 
     # Start the Tkinter main loop
     root.mainloop()
+
+    # Flush the event log last so everything printed during shutdown is kept
+    if EVENT_LOG is not None:
+        st = EVENT_LOG.stats()
+        print(f"[INFO] Event log: {st['written'] + st['queued']} event(s), {st['dropped']} dropped, {st['rotations']} rotation(s).")
+        EVENT_LOG.stop()
+        EVENT_LOG.release_console()
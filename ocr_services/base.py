@@ -1,6 +1,32 @@
+import os
+import tempfile
 from abc import ABC, abstractmethod
+import cv2
 
 class OcrService(ABC):
     @abstractmethod
     def detect_text(self, image_path):
         pass
+
+    def detect_text_with_confidence(self, image_path):
+        """Returns (plate_text, confidence 0..1). Services without native scores report 1.0 for any non-empty result."""
+        text = self.detect_text(image_path)
+        if not text or text.startswith("OCR Failed"):
+            return text, 0.0
+        return text, 1.0
+
+    def pending(self):
+        """Requests queued or still running inside the service (worker pools, hedge calls still out)."""
+        return 0
+
+    def detect_text_from_frame(self, frame):
+        """Runs detect_text_with_confidence on an in-memory BGR frame. The default goes through a temporary JPEG."""
+        fd, path = tempfile.mkstemp(suffix=".jpg")
+        os.close(fd)
+        try:
+            if not cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95]):
+                return "OCR Failed: Could not encode frame", 0.0
+            return self.detect_text_with_confidence(path)
+        finally:
+            try: os.remove(path)
+            except OSError: pass
@@ -6,12 +6,19 @@ from google.cloud import vision
 from google.cloud.vision_v1 import AnnotateImageResponse
 from google.api_core import exceptions as google_exceptions
 from ocr_services.base import OcrService
+from ocr_services.plate_format import format_plate
 
 class GoogleVisionOcr(OcrService):
+    def __init__(self, client=None):
+        # The client is created once on first use; pass one in to stub the API (e.g. offline benchmarks)
+        self._client = client
+
     def detect_text(self, image_path):
         """Detects text (potential number plate) in an image, handling standard Indian and BH series formats."""
         try:
-            v_client = vision.ImageAnnotatorClient()
+            if self._client is None:
+                self._client = vision.ImageAnnotatorClient()
+            v_client = self._client
         except Exception as e:
             print(f"[ERROR] Initializing Vision Client: {e}")
             return f"OCR Failed: Vision Client Init Error - {e}"
@@ -42,25 +49,12 @@ class GoogleVisionOcr(OcrService):
                 compact_raw = re.sub(r'[^A-Z0-9]', '', block_text) # Remove non-alphanumeric
                 if not compact_raw: continue # Skip empty blocks
 
-                # Regex for BH series: YY BH NNNN LL(L)
-                bh_match = re.search(r'^(\d{2})(BH)(\d{4})([A-Z]{1,2})$', compact_raw)
-                if bh_match:
-                    year, bh_marker, nums, letters = bh_match.groups()
-                    formatted_plate = f"{year}-{bh_marker}-{nums}-{letters}"
+                # Standard / BH series formats (see plate_format)
+                formatted_plate = format_plate(compact_raw)
+                if formatted_plate:
                     possible_plates.append(formatted_plate)
                     continue # Found a match, move to next block
 
-                # Regex for Standard series: LL NN L(L) NNNN
-                standard_match = re.search(r'^([A-Z]{2})(\d{1,2})([A-Z]{1,2})?(\d{3,4})$', compact_raw)
-                if standard_match:
-                    state, rto, letters, nums = standard_match.groups()
-                    rto_padded = rto.rjust(2, '0') # Pad RTO code if single digit
-                    nums_padded = nums.rjust(4, '0') # Pad final numbers
-                    letters_formatted = letters if letters else 'XX' # Use XX if letters part is missing
-                    formatted_plate = f"{state}-{rto_padded}-{letters_formatted}-{nums_padded}"
-                    possible_plates.append(formatted_plate)
-                    continue # Found a match
-
                 # Fallback: If block looks somewhat like a plate (length, mix of letters/numbers)
                 if 6 <= len(compact_raw) <= 10 and re.search(r'\d', compact_raw) and re.search(r'[A-Z]', compact_raw):
                     possible_plates.append(compact_raw) # Add the raw compact version
@@ -78,18 +72,8 @@ class GoogleVisionOcr(OcrService):
                     full_compact_raw = re.sub(r'[^A-Z0-9]', '', full_text_raw)
 
                     # Try matching BH/Standard within the full compact text
-                    bh_match = re.search(r'(\d{2})(BH)(\d{4})([A-Z]{1,2})', full_compact_raw) # Search within
-                    if bh_match:
-                        year, bh_marker, nums, letters = bh_match.groups()
-                        formatted_plate = f"{year}-{bh_marker}-{nums}-{letters}"
-                        return formatted_plate
-
-                    standard_match = re.search(r'([A-Z]{2})(\d{1,2})([A-Z]{1,2})?(\d{3,4})', full_compact_raw) # Search within
-                    if standard_match:
-                        state, rto, letters, nums = standard_match.groups()
-                        rto_padded = rto.rjust(2, '0'); nums_padded = nums.rjust(4, '0')
-                        letters_formatted = letters if letters else 'XX'
-                        formatted_plate = f"{state}-{rto_padded}-{letters_formatted}-{nums_padded}"
+                    formatted_plate = format_plate(full_compact_raw, search=True)
+                    if formatted_plate:
                         return formatted_plate
 
                 return "" # Return empty if nothing found
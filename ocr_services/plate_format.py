@@ -0,0 +1,38 @@
+import re
+
+# Same rule the confirmation dialog and manual entry use
+PLATE_PATTERN = re.compile(r'[A-Z0-9\-]{6,13}')
+
+# BH series: YY BH NNNN LL(L); Standard series: LL NN L(L) NNNN
+BH_PATTERN = re.compile(r'(\d{2})(BH)(\d{4})([A-Z]{1,2})')
+STANDARD_PATTERN = re.compile(r'([A-Z]{2})(\d{1,2})([A-Z]{1,2})?(\d{3,4})')
+
+
+def compact_plate(text):
+    """Uppercases and strips everything except A-Z and 0-9."""
+    return re.sub(r'[^A-Z0-9]', '', (text or '').upper())
+
+
+def is_valid_plate(plate):
+    """True if the plate passes the app's format check."""
+    return bool(plate) and PLATE_PATTERN.fullmatch(plate) is not None
+
+
+def format_plate(compact, search=False):
+    """Formats a compact plate as BH series (YY-BH-NNNN-LL) or standard (LL-NN-LL-NNNN).
+    The whole string must match unless search=True. Returns None if neither matches."""
+    match = BH_PATTERN.search if search else BH_PATTERN.fullmatch
+    bh_match = match(compact)
+    if bh_match:
+        year, bh_marker, nums, letters = bh_match.groups()
+        return f"{year}-{bh_marker}-{nums}-{letters}"
+
+    match = STANDARD_PATTERN.search if search else STANDARD_PATTERN.fullmatch
+    standard_match = match(compact)
+    if standard_match:
+        state, rto, letters, nums = standard_match.groups()
+        rto_padded = rto.rjust(2, '0') # Pad RTO code if single digit
+        nums_padded = nums.rjust(4, '0') # Pad final numbers
+        letters_formatted = letters if letters else 'XX' # Use XX if letters part is missing
+        return f"{state}-{rto_padded}-{letters_formatted}-{nums_padded}"
+    return None
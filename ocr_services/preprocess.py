@@ -0,0 +1,145 @@
+import threading
+import time
+import cv2
+import numpy as np
+from ocr_services.voting import crop_frame
+
+PROFILES = ("day", "night", "ir", "auto")
+
+
+class PlatePreprocessor:
+    """Turns a (cropped) plate image into a clean, upright, dark-on-light binary image for Tesseract.
+
+    grayscale -> scale to target_height -> profile-specific contrast -> adaptive threshold
+    -> polarity fix -> deskew. Every step is one OpenCV/NumPy call on the whole image, so a plate crop
+    costs a few milliseconds. Profiles:
+      day   - CLAHE
+      night - Gaussian denoise and a gamma lift before CLAHE (sensor noise, underexposure)
+      ir    - black-hat against a large closing to remove headlight/IR glare (monochrome IR frames)
+      auto  - picks one per image: ir for monochrome (IR-lit) frames, night for dark ones, else day
+
+    process() expects a tight plate crop. The engines call prepare() with whole captures, which crops to
+    plate_roi first and does not shrink it; without a plate region it leaves the frame alone, since
+    scaling a full scene to target_height would reduce the plate glyphs to a few pixels."""
+    def __init__(self, profile="auto", target_height=96, clahe_clip=2.0, clahe_tile=8, block_size=31, c=10,
+                 deskew=True, max_skew_deg=15.0, night_gamma=0.6, night_brightness=70, mono_threshold=1.5,
+                 plate_roi=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown preprocessing profile '{profile}' (expected one of {', '.join(PROFILES)})")
+        self.profile = profile
+        self.target_height = target_height      # Tesseract reads best at roughly 30-60 px glyphs
+        self.block_size = block_size | 1        # Adaptive threshold window (odd)
+        self.c = c
+        self.deskew = deskew
+        self.max_skew_deg = max_skew_deg
+        self.night_brightness = night_brightness # Mean gray level below which 'auto' treats a frame as night
+        self.mono_threshold = mono_threshold     # Mean channel difference below which a frame is from a monochrome/IR sensor
+        self.clahe_clip = clahe_clip
+        self.clahe_tile = clahe_tile
+        self.plate_roi = plate_roi               # Fractional (x1, y1, x2, y2) plate region of a full capture
+        self._local = threading.local() # A CLAHE object keeps working buffers, so one per OCR worker thread
+        self._gamma_lut = (np.linspace(0, 1, 256) ** night_gamma * 255).astype(np.uint8)
+        self._glare_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (31, 31))
+        self._speck_kernel = np.ones((3, 3), np.uint8)
+        self.last_ms = 0.0
+        self.last_profile = None
+
+    @classmethod
+    def from_config(cls, config):
+        """From the preprocess_* keys of [OCR]; None if preprocessing is off."""
+        profile = config.get('OCR', 'preprocess', fallback='off').strip().lower()
+        if profile in ('', 'off', 'none', 'false'):
+            return None
+        from camera.motion_trigger import parse_roi
+        roi_str = config.get('OCR', 'preprocess_plate_roi', fallback=config.get('OCR', 'vote_plate_roi', fallback='')).strip()
+        plate_roi = parse_roi(roi_str) if roi_str else None
+        if plate_roi == (0.0, 0.0, 1.0, 1.0):
+            plate_roi = None
+        preprocessor = cls(
+            profile=profile,
+            target_height=config.getint('OCR', 'preprocess_target_height', fallback=96),
+            clahe_clip=config.getfloat('OCR', 'preprocess_clahe_clip', fallback=2.0),
+            block_size=config.getint('OCR', 'preprocess_block_size', fallback=31),
+            c=config.getint('OCR', 'preprocess_threshold_c', fallback=10),
+            deskew=config.getboolean('OCR', 'preprocess_deskew', fallback=True),
+            plate_roi=plate_roi,
+        )
+        if plate_roi is None:
+            print("[WARN] OCR preprocessing needs a plate region (preprocess_plate_roi or vote_plate_roi); "
+                  "full captures are read unprocessed.")
+        return preprocessor
+
+    def _clahe(self):
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=self.clahe_clip, tileGridSize=(self.clahe_tile, self.clahe_tile))
+        return clahe
+
+    def choose_profile(self, image):
+        """'day', 'night' or 'ir' for one BGR or gray image (what 'auto' uses)."""
+        if image.ndim == 2:
+            return "ir" # Gray input comes from a monochrome camera
+        # Not saturation: a white plate in daylight is nearly colourless too, but its channels never match exactly
+        small = cv2.resize(image, (64, 32), interpolation=cv2.INTER_NEAREST).astype(np.int16)
+        if (np.abs(small[:, :, 0] - small[:, :, 1]).mean() + np.abs(small[:, :, 1] - small[:, :, 2]).mean()) / 2 < self.mono_threshold:
+            return "ir"
+        return "night" if small.mean() < self.night_brightness else "day"
+
+    def prepare(self, frame):
+        """Whole capture -> processed plate region, or None if no plate region is set (use the frame as is)."""
+        if self.plate_roi is None:
+            return None
+        # The region is larger than the plate, so it is only ever enlarged towards target_height, never shrunk
+        return self.process(crop_frame(frame, self.plate_roi), shrink=False)
+
+    def process(self, image, shrink=True):
+        """BGR or gray uint8 image -> binary uint8 image (text black on white)."""
+        started = time.perf_counter()
+        profile = self.choose_profile(image) if self.profile == "auto" else self.profile
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+        h, w = gray.shape[:2]
+        if self.target_height and (h < self.target_height or (shrink and h > self.target_height)):
+            scale = self.target_height / float(h)
+            gray = cv2.resize(gray, (max(1, int(w * scale)), self.target_height),
+                              interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA)
+
+        if profile == "night":
+            gray = cv2.LUT(cv2.GaussianBlur(gray, (5, 5), 0), self._gamma_lut)
+            gray = self._clahe().apply(gray)
+        elif profile == "ir":
+            # Subtract the large-scale glare so characters keep their local contrast
+            background = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, self._glare_kernel)
+            gray = cv2.normalize(cv2.subtract(background, gray), None, 0, 255, cv2.NORM_MINMAX)
+            gray = cv2.bitwise_not(gray) # Contrast is already even; CLAHE here would only lift the noise
+        else:
+            gray = self._clahe().apply(gray)
+
+        gray = cv2.medianBlur(gray, 3) # CLAHE also lifts sensor noise; keep it from turning into speckles
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                       self.block_size, self.c)
+        if cv2.countNonZero(binary) < binary.size // 2:
+            binary = cv2.bitwise_not(binary) # Light text on a dark plate: make the background white
+        if self.deskew:
+            binary = self._deskew(binary)
+
+        self.last_profile = profile
+        self.last_ms = (time.perf_counter() - started) * 1000
+        return binary
+
+    def _deskew(self, binary):
+        """Rotates by the angle of the minimum-area rectangle around the dark (text) pixels."""
+        text = cv2.morphologyEx(cv2.bitwise_not(binary), cv2.MORPH_OPEN, self._speck_kernel) # Stray specks would widen the box
+        points = cv2.findNonZero(text)
+        if points is None or len(points) < 20:
+            return binary
+        angle = cv2.minAreaRect(points)[-1]
+        if angle > 45: # OpenCV >= 4.5 reports (0, 90]; older versions [-90, 0)
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+        if abs(angle) < 0.5 or abs(angle) > self.max_skew_deg:
+            return binary
+        h, w = binary.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        return cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST, borderValue=255)
@@ -0,0 +1,292 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ocr_services.base import OcrService
+from ocr_services.plate_format import compact_plate, is_valid_plate
+from ocr_services.preprocess import PlatePreprocessor
+
+# name -> {'factory': callable returning an OcrService, 'cost_per_call': float, 'local': bool}
+_PROVIDERS = {}
+# Image preprocessing handed to the local engines (set from [OCR] by build_ocr_service)
+_LOCAL_OPTIONS = {'preprocessor': None}
+
+
+def register_provider(name, factory, cost_per_call=0.0, local=True):
+    """Registers an OCR provider factory under a config name (e.g. 'tesseract')."""
+    _PROVIDERS[name] = {'factory': factory, 'cost_per_call': cost_per_call, 'local': local}
+
+
+def available_providers():
+    """Names of all registered providers."""
+    return sorted(_PROVIDERS)
+
+
+def create_provider(name, cost_per_call=None):
+    """Instantiates a registered provider wrapped with latency/cost/accuracy metering."""
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown OCR provider '{name}'. Available: {', '.join(available_providers())}")
+    entry = _PROVIDERS[name]
+    cost = entry['cost_per_call'] if cost_per_call is None else cost_per_call
+    return MeteredOcr(name, entry['factory'](), cost)
+
+
+def set_preprocessor(preprocessor):
+    """Preprocessor for local providers created from now on (None for raw images)."""
+    _LOCAL_OPTIONS['preprocessor'] = preprocessor
+
+
+def get_preprocessor():
+    return _LOCAL_OPTIONS['preprocessor']
+
+
+def _tesseract_factory():
+    from ocr_services.tesseract import TesseractOcr # Imported lazily so missing engines only fail when selected
+    return TesseractOcr(preprocessor=_LOCAL_OPTIONS['preprocessor'])
+
+
+def _tesseract_pool_factory():
+    from ocr_services.tesseract_pool import PooledTesseractOcr
+    return PooledTesseractOcr(preprocessor=_LOCAL_OPTIONS['preprocessor'])
+
+
+def _google_vision_factory():
+    from ocr_services.google_vision import GoogleVisionOcr
+    return GoogleVisionOcr()
+
+
+register_provider('tesseract', _tesseract_factory, cost_per_call=0.0, local=True)
+register_provider('tesseract_pool', _tesseract_pool_factory, cost_per_call=0.0, local=True)
+register_provider('google_vision', _google_vision_factory, cost_per_call=0.0015, local=False)
+
+
+def _is_success(text):
+    return bool(text) and not text.startswith("OCR Failed")
+
+
+def _safe_detect(provider, image_path):
+    """Calls a provider, turning unexpected exceptions into the usual 'OCR Failed' result."""
+    try:
+        return provider.detect_text_with_confidence(image_path)
+    except Exception as e:
+        print(f"[ERROR] OCR provider '{provider.name}' raised: {e}")
+        return f"OCR Failed: {e}", 0.0
+
+
+# --- Per-provider counters ---
+class ProviderStats:
+    """Thread-safe latency, failure, cost and accuracy counters for every provider."""
+    MAX_LATENCY_SAMPLES = 500 # Rolling window for percentiles
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        return self._stats.setdefault(name, {
+            'calls': 0, 'failures': 0, 'total_latency_s': 0.0, 'latencies': [],
+            'cost': 0.0, 'confirmed': 0, 'correct': 0,
+        })
+
+    def record_call(self, name, latency_s, ok, cost):
+        with self._lock:
+            e = self._entry(name)
+            e['calls'] += 1
+            e['failures'] += 0 if ok else 1
+            e['total_latency_s'] += latency_s
+            e['cost'] += cost
+            e['latencies'].append(latency_s)
+            if len(e['latencies']) > self.MAX_LATENCY_SAMPLES:
+                del e['latencies'][:len(e['latencies']) - self.MAX_LATENCY_SAMPLES]
+
+    def record_outcome(self, name, detected, confirmed):
+        """Records whether the operator accepted the provider's plate unchanged."""
+        if not name:
+            return
+        with self._lock:
+            e = self._entry(name)
+            e['confirmed'] += 1
+            if compact_plate(detected) == compact_plate(confirmed):
+                e['correct'] += 1
+
+    def snapshot(self):
+        """Returns {name: {calls, failures, avg_ms, p95_ms, cost, accuracy}}."""
+        with self._lock:
+            result = {}
+            for name, e in self._stats.items():
+                lat = sorted(e['latencies'])
+                result[name] = {
+                    'calls': e['calls'],
+                    'failures': e['failures'],
+                    'avg_ms': (e['total_latency_s'] / e['calls'] * 1000.0) if e['calls'] else 0.0,
+                    'p95_ms': (lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000.0) if lat else 0.0,
+                    'cost': e['cost'],
+                    'accuracy': (e['correct'] / e['confirmed']) if e['confirmed'] else None,
+                }
+            return result
+
+    def summary_lines(self):
+        lines = []
+        for name, s in sorted(self.snapshot().items()):
+            acc = f"{s['accuracy']:.0%}" if s['accuracy'] is not None else "n/a"
+            lines.append(f"{name}: {s['calls']} calls, {s['failures']} failed, avg {s['avg_ms']:.0f} ms, "
+                         f"p95 {s['p95_ms']:.0f} ms, cost {s['cost']:.4f}, accuracy {acc}")
+        return lines
+
+
+OCR_STATS = ProviderStats()
+
+
+class MeteredOcr(OcrService):
+    """Wraps a provider and records latency, failures and cost for every call."""
+    def __init__(self, name, service, cost_per_call=0.0):
+        self.name = name
+        self.service = service
+        self.cost_per_call = cost_per_call
+        self.last_provider = name
+
+    def _timed(self, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        text = result[0] if isinstance(result, tuple) else result
+        OCR_STATS.record_call(self.name, time.perf_counter() - started, _is_success(text), self.cost_per_call)
+        return result
+
+    def detect_text(self, image_path):
+        return self._timed(self.service.detect_text, image_path)
+
+    def detect_text_with_confidence(self, image_path):
+        return self._timed(self.service.detect_text_with_confidence, image_path)
+
+    def detect_text_from_frame(self, frame):
+        return self._timed(self.service.detect_text_from_frame, frame)
+
+    def pending(self):
+        return self.service.pending()
+
+
+class CascadeOcr(OcrService):
+    """Runs providers local-first and only escalates when confidence is low ('cascade'),
+    or additionally when the first provider exceeds a latency budget ('hedge')."""
+    POLICIES = ('cascade', 'hedge')
+
+    def __init__(self, providers, policy='cascade', confidence_threshold=0.75, hedge_budget_s=0.7):
+        if not providers:
+            raise ValueError("CascadeOcr needs at least one provider.")
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown OCR policy '{policy}'. Use one of: {', '.join(self.POLICIES)}")
+        self.providers = providers # Ordered list of MeteredOcr, cheapest/fastest first
+        self.policy = policy
+        self.confidence_threshold = confidence_threshold
+        self.hedge_budget_s = hedge_budget_s
+        self.last_provider = None # Name of the provider whose result was returned last
+        self._executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="ocr-hedge") if policy == 'hedge' else None
+        self._outstanding = 0 # Hedge calls submitted and not finished (a losing call keeps running after the winner returns)
+        self._outstanding_lock = threading.Lock()
+
+    def pending(self):
+        if self._executor is not None:
+            with self._outstanding_lock:
+                return self._outstanding
+        return sum(p.pending() for p in self.providers)
+
+    def _submit(self, provider, image_path):
+        with self._outstanding_lock:
+            self._outstanding += 1
+        future = self._executor.submit(_safe_detect, provider, image_path)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._outstanding_lock:
+            self._outstanding -= 1
+
+    def _acceptable(self, text, confidence):
+        return _is_success(text) and is_valid_plate(text) and confidence >= self.confidence_threshold
+
+    def detect_text(self, image_path):
+        return self.detect_text_with_confidence(image_path)[0]
+
+    def detect_text_with_confidence(self, image_path):
+        if self.policy == 'hedge':
+            return self._run_hedged(image_path)
+        return self._run_cascade(image_path)
+
+    def _pick(self, results):
+        """Best of (name, text, confidence) results: successful ones by confidence, else the last failure."""
+        successes = [r for r in results if _is_success(r[1])]
+        name, text, confidence = max(successes, key=lambda r: r[2]) if successes else results[-1]
+        self.last_provider = name
+        return text, confidence
+
+    def _run_cascade(self, image_path):
+        results = []
+        for provider in self.providers:
+            text, confidence = _safe_detect(provider, image_path)
+            results.append((provider.name, text, confidence))
+            if self._acceptable(text, confidence):
+                break
+        return self._pick(results)
+
+    def _run_hedged(self, image_path):
+        first, rest = self.providers[0], self.providers[1:]
+        pending = {self._submit(first, image_path): first.name}
+        results = []
+
+        # Give the local engine its latency budget before paying for a hedge request
+        done, _ = wait(pending, timeout=self.hedge_budget_s)
+        for fut in done:
+            text, confidence = fut.result()
+            results.append((pending.pop(fut), text, confidence))
+            if self._acceptable(text, confidence):
+                return self._pick(results[-1:])
+
+        for provider in rest:
+            pending[self._submit(provider, image_path)] = provider.name
+
+        # First acceptable answer wins; otherwise the best of everything once all have finished
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                text, confidence = fut.result()
+                results.append((pending.pop(fut), text, confidence))
+                if self._acceptable(text, confidence):
+                    return self._pick(results[-1:])
+        return self._pick(results)
+
+
+def build_ocr_service(config):
+    """Builds the OCR service described by the [OCR] section of config.ini.
+    A configuration that cannot be built (unknown provider or policy, no usable cascade provider)
+    falls back to google_vision, the original default, so the app still starts."""
+    try:
+        preprocessor = PlatePreprocessor.from_config(config)
+    except ValueError as e:
+        print(f"[WARN] {e}; OCR preprocessing disabled.")
+        preprocessor = None
+    set_preprocessor(preprocessor)
+    costs = {name: config.getfloat('OCRCost', name) for name in available_providers() if config.has_option('OCRCost', name)}
+    try:
+        return _build_configured_service(config, costs)
+    except Exception as e:
+        print(f"[WARN] OCR configuration unusable ({e}); falling back to google_vision.")
+        return create_provider('google_vision', costs.get('google_vision'))
+
+
+def _build_configured_service(config, costs):
+    provider = config.get('OCR', 'provider', fallback='google_vision').strip()
+    if provider != 'cascade':
+        return create_provider(provider, costs.get(provider))
+
+    names = [n.strip() for n in config.get('OCR', 'cascade_providers', fallback='tesseract, google_vision').split(',') if n.strip()]
+    providers = []
+    for name in names:
+        try:
+            providers.append(create_provider(name, costs.get(name)))
+        except Exception as e:
+            print(f"[WARN] OCR provider '{name}' unavailable, skipping it in the cascade: {e}")
+    return CascadeOcr(
+        providers,
+        policy=config.get('OCR', 'cascade_policy', fallback='cascade').strip(),
+        confidence_threshold=config.getfloat('OCR', 'cascade_confidence', fallback=0.75),
+        hedge_budget_s=config.getint('OCR', 'hedge_budget_ms', fallback=700) / 1000.0,
+    )
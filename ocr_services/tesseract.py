@@ -1,26 +1,77 @@
 import pytesseract
 from PIL import Image
 import re
+import cv2
 from ocr_services.base import OcrService
 
 class TesseractOcr(OcrService):
+    def __init__(self, preprocessor=None, psm=6):
+        self.preprocessor = preprocessor # Optional PlatePreprocessor (ocr_services/preprocess.py)
+        self.psm = psm
+
+    def _load(self, image_path):
+        """Opens an image for Tesseract, preprocessed if a preprocessor with a plate region is set."""
+        if self.preprocessor is None or self.preprocessor.plate_roi is None:
+            return Image.open(image_path)
+        image = cv2.imread(image_path)
+        if image is None:
+            raise IOError(f"Cannot read image {image_path}")
+        return Image.fromarray(self.preprocessor.prepare(image))
+
     def detect_text(self, image_path):
         """Detects text from an image using Tesseract and filters for license plates."""
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image, config='--psm 6')
+            image = self._load(image_path)
+            text = pytesseract.image_to_string(image, config=f'--psm {self.psm}')
+            return self._extract_plate(text)
 
-            # Filter for alphanumeric characters, remove whitespace
-            text = re.sub(r'[^A-Z0-9]', '', text.upper())
-
-            # Look for common license plate patterns
-            # This is a basic filter and can be improved
-            potential_plates = re.findall(r'[A-Z]{2}[0-9]{1,2}[A-Z]{1,2}[0-9]{3,4}', text)
-            if potential_plates:
-                return potential_plates[0]
+        except Exception as e:
+            print(f"Error during Tesseract OCR: {e}")
+            return f"OCR Failed: {e}"
 
-            return text
+    def detect_text_with_confidence(self, image_path):
+        """Like detect_text, but also returns Tesseract's mean word confidence (0..1)."""
+        try:
+            return self._read_with_confidence(self._load(image_path))
+        except Exception as e:
+            print(f"Error during Tesseract OCR: {e}")
+            return f"OCR Failed: {e}", 0.0
 
+    def detect_text_from_frame(self, frame):
+        """OCRs a BGR numpy frame in memory (preprocessed if set) instead of through a temporary JPEG."""
+        try:
+            prepared = self.preprocessor.prepare(frame) if self.preprocessor is not None else None
+            if prepared is not None:
+                image = Image.fromarray(prepared)
+            else:
+                image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if frame.ndim == 3 else frame)
+            return self._read_with_confidence(image)
         except Exception as e:
             print(f"Error during Tesseract OCR: {e}")
-            return f"OCR Failed: {e}"
+            return f"OCR Failed: {e}", 0.0
+
+    def _read_with_confidence(self, image):
+        data = pytesseract.image_to_data(image, config=f'--psm {self.psm}', output_type=pytesseract.Output.DICT)
+        words, confs = [], []
+        for word, conf in zip(data.get('text', []), data.get('conf', [])):
+            conf = float(conf)
+            if word.strip() and conf >= 0: # -1 marks layout rows without text
+                words.append(word)
+                confs.append(conf)
+        plate = self._extract_plate(" ".join(words))
+        confidence = (sum(confs) / len(confs) / 100.0) if (plate and confs) else 0.0
+        return plate, confidence
+
+    @staticmethod
+    def _extract_plate(text):
+        """Filters raw Tesseract output down to the most plate-like string."""
+        # Filter for alphanumeric characters, remove whitespace
+        text = re.sub(r'[^A-Z0-9]', '', text.upper())
+
+        # Look for common license plate patterns
+        # This is a basic filter and can be improved
+        potential_plates = re.findall(r'[A-Z]{2}[0-9]{1,2}[A-Z]{1,2}[0-9]{3,4}', text)
+        if potential_plates:
+            return potential_plates[0]
+
+        return text
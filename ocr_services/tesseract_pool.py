@@ -0,0 +1,115 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import pytesseract
+from PIL import Image
+from ocr_services.base import OcrService
+from ocr_services.tesseract import TesseractOcr
+
+# tesserocr binds the Tesseract C++ API directly: language data is loaded once per engine
+# and recognition releases the GIL, so a few threads give real parallelism.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+PLATE_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+PSM_SINGLE_LINE = 7 # Plates are (mostly) a single text line
+
+
+class PooledTesseractOcr(OcrService):
+    """Tesseract backend with long-lived engines, a plate whitelist/PSM and in-memory images."""
+    def __init__(self, workers=None, lang="eng", psm=PSM_SINGLE_LINE, whitelist=PLATE_WHITELIST, preprocessor=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.preprocessor = preprocessor # Optional PlatePreprocessor, run on the worker thread (OpenCV releases the GIL)
+        self.lang = lang
+        self.psm = psm
+        self.whitelist = whitelist
+        self._local = threading.local() # One engine per worker thread
+        self._engines = []
+        self._engines_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tesseract")
+        self._pending = 0 # Submitted and not finished: the backlog shown in the diagnostics panel
+        self._pending_lock = threading.Lock()
+        if tesserocr is None:
+            print("[WARN] tesserocr not installed; PooledTesseractOcr falls back to pytesseract (one process per image).")
+
+    def _engine(self):
+        """Returns this worker thread's warm engine, creating it on first use."""
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=self.psm)
+            api.SetVariable("tessedit_char_whitelist", self.whitelist)
+            self._local.api = api
+            with self._engines_lock:
+                self._engines.append(api)
+        return api
+
+    def _recognise(self, image):
+        """Runs on a worker thread. image is a PIL image; returns (plate, confidence)."""
+        try:
+            if tesserocr is not None:
+                api = self._engine()
+                api.SetImage(image)
+                text = api.GetUTF8Text()
+                confidence = api.MeanTextConf() / 100.0
+            else:
+                config = f"--psm {self.psm} -c tessedit_char_whitelist={self.whitelist}"
+                text = pytesseract.image_to_string(image, lang=self.lang, config=config)
+                confidence = 1.0 # pytesseract's string mode has no score
+            plate = TesseractOcr._extract_plate(text)
+            return plate, (confidence if plate else 0.0)
+        except Exception as e:
+            print(f"[ERROR] Pooled Tesseract OCR: {e}")
+            return f"OCR Failed: {e}", 0.0
+
+    def detect_text(self, image_path):
+        return self.detect_text_with_confidence(image_path)[0]
+
+    def detect_text_with_confidence(self, image_path):
+        try:
+            if self.preprocessor is not None and self.preprocessor.plate_roi is not None:
+                frame = cv2.imread(image_path)
+                if frame is None:
+                    raise IOError(f"Cannot read image {image_path}")
+                return self.detect_text_from_frame(frame)
+            image = Image.open(image_path)
+            image.load() # Read now, on the caller's thread, so the worker only does OCR
+        except Exception as e:
+            print(f"[ERROR] Opening image for OCR: {e}")
+            return f"OCR Failed: {e}", 0.0
+        return self._run(self._recognise, image)
+
+    def _recognise_frame(self, frame):
+        prepared = self.preprocessor.prepare(frame) if self.preprocessor is not None else None
+        if prepared is not None:
+            return self._recognise(Image.fromarray(prepared))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return self._recognise(Image.fromarray(gray))
+
+    def detect_text_from_frame(self, frame):
+        """OCRs a BGR numpy frame without touching the disk."""
+        return self._run(self._recognise_frame, frame)
+
+    def _run(self, func, arg):
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            return self._executor.submit(func, arg).result()
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def pending(self):
+        with self._pending_lock:
+            return self._pending
+
+    def close(self):
+        """Stops the workers and frees the engines."""
+        self._executor.shutdown(wait=True)
+        with self._engines_lock:
+            for api in self._engines:
+                try: api.End()
+                except Exception: pass
+            self._engines.clear()
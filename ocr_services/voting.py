@@ -0,0 +1,103 @@
+import time
+from collections import defaultdict, namedtuple
+import cv2
+from ocr_services.plate_format import compact_plate, format_plate
+
+VoteResult = namedtuple("VoteResult", ["plate", "agreement", "votes", "escalated"])
+
+MIN_VOTE_WEIGHT = 0.05 # Readings without a usable confidence still get a small say
+
+
+def vote_plates(readings):
+    """Per-character, confidence-weighted vote over (text, confidence) readings of the same plate.
+    Returns (consensus_plate, agreement 0..1, votes_used)."""
+    by_length = defaultdict(list)
+    total_weight = 0.0
+    for text, confidence in readings:
+        if not text or text.startswith("OCR Failed"):
+            continue
+        compact = compact_plate(text)
+        if not compact:
+            continue
+        weight = max(float(confidence or 0.0), MIN_VOTE_WEIGHT)
+        by_length[len(compact)].append((compact, weight))
+        total_weight += weight
+
+    if not by_length:
+        return "", 0.0, 0
+
+    # Readings of different lengths can't be aligned position-by-position; the heaviest length group wins
+    group = max(by_length.values(), key=lambda g: sum(w for _, w in g))
+    group_weight = sum(w for _, w in group)
+
+    consensus, position_agreement = [], []
+    for pos in range(len(group[0][0])):
+        tally = defaultdict(float)
+        for compact, weight in group:
+            tally[compact[pos]] += weight
+        char, char_weight = max(tally.items(), key=lambda kv: kv[1])
+        consensus.append(char)
+        position_agreement.append(char_weight / group_weight)
+
+    compact = "".join(consensus)
+    agreement = (group_weight / total_weight) * (sum(position_agreement) / len(position_agreement))
+    return format_plate(compact) or compact, round(agreement, 3), len(group)
+
+
+def crop_frame(frame, roi):
+    """Crops a frame to a fractional (x1, y1, x2, y2) region. None returns the frame unchanged."""
+    if roi is None:
+        return frame
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = roi
+    return frame[int(y1 * h):max(int(y2 * h), int(y1 * h) + 1), int(x1 * w):max(int(x2 * w), int(x1 * w) + 1)]
+
+
+def sharpness(frame):
+    """Variance of the Laplacian; higher means less motion blur."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+class MultiFrameOcr:
+    """OCRs several frames of the same vehicle with a local engine and votes; escalates once to a second engine on low agreement."""
+    def __init__(self, local_service, escalation_service=None, max_frames=5, min_votes=3,
+                 accept_agreement=0.8, time_budget_s=1.5, crop_roi=None, escalation_weight=2.0):
+        self.local_service = local_service
+        self.escalation_service = escalation_service
+        self.max_frames = max_frames
+        self.min_votes = min_votes                  # Don't stop early before this many local readings
+        self.accept_agreement = accept_agreement    # Agreement at or above this skips the escalation call
+        self.time_budget_s = time_budget_s          # Local voting stops once this much time has been spent
+        self.crop_roi = crop_roi                    # Fractional plate region; None OCRs the full frame
+        self.escalation_weight = escalation_weight  # Vote weight of the (usually paid) escalation reading
+
+    def recognise(self, frames):
+        """Returns a VoteResult for a list of BGR frames of one vehicle (newest last)."""
+        frames = [f for f in frames if f is not None][-self.max_frames:]
+        if not frames:
+            return VoteResult("", 0.0, 0, False)
+
+        # Sharpest frames first, so an early stop keeps the best readings
+        frames.sort(key=sharpness, reverse=True)
+        started = time.monotonic()
+        readings = []
+        plate, agreement, votes = "", 0.0, 0
+        for frm in frames:
+            readings.append(self.local_service.detect_text_from_frame(crop_frame(frm, self.crop_roi)))
+            plate, agreement, votes = vote_plates(readings)
+            if len(readings) >= self.min_votes and agreement >= self.accept_agreement:
+                break
+            if time.monotonic() - started >= self.time_budget_s:
+                print(f"[WARN] Multi-frame OCR hit its {self.time_budget_s:.1f}s budget after {len(readings)} frame(s).")
+                break
+
+        if agreement >= self.accept_agreement or self.escalation_service is None:
+            return VoteResult(plate, agreement, votes, False)
+
+        # Low agreement: one escalation call on the sharpest full frame, counted as a heavier vote
+        text, confidence = self.escalation_service.detect_text_from_frame(frames[0])
+        if text and not text.startswith("OCR Failed"):
+            readings.append((text, max(confidence, MIN_VOTE_WEIGHT) * self.escalation_weight))
+        plate, agreement, votes = vote_plates(readings)
+        return VoteResult(plate, agreement, votes, True)
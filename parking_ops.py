@@ -0,0 +1,161 @@
+"""Entry/exit bookkeeping shared by the GUI and the load tools (no Tk, no message boxes).
+
+Functions take the collections explicitly so they run against pymongo collections or any stand-in
+with the same methods (storage/memory.py)."""
+import math
+import re
+import uuid
+from collections import namedtuple
+from datetime import datetime, time
+import pymongo
+
+# Save outcomes
+ENTRY_SAVED = "entry_saved"
+ENTRY_SAVED_NO_SLOT = "entry_saved_no_slot" # Inserted, but the slot counter was already 0
+DUPLICATE_ENTRY = "duplicate_entry"
+PARKING_FULL = "parking_full"
+EXIT_SAVED = "exit_saved"
+NO_OPEN_ENTRY = "no_open_entry"
+INVALID_PLATE = "invalid_plate"
+INSERT_FAILED = "insert_failed"
+
+SaveResult = namedtuple("SaveResult", ["status", "parking_id", "record", "fee", "hours"])
+
+DEFAULT_FEE_PER_HOUR = 10.0
+
+# CSV export format (also what storage/bulk_import.py reads back)
+EXPORT_COLUMNS = ["Plate", "Vehicle Type", "Entry Time", "Exit Time", "Fee (₹)", "Property Name", "Parking ID"]
+EXPORT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def calculate_fee(entry_time, exit_time, fee_per_hour):
+    """Returns (fee, total_hours). The first hour is free; every started hour after that is charged."""
+    total_hours = (exit_time - entry_time).total_seconds() / 3600
+    if total_hours <= 1.0:
+        fee = 0.0
+    else:
+        chargeable_hours = math.ceil(total_hours) - 1
+        fee = chargeable_hours * fee_per_hour
+    return round(max(0.0, fee), 2), total_hours
+
+
+def fee_per_hour_for(prop, vehicle_type):
+    """Property fee for a vehicle type, falling back to DEFAULT_FEE_PER_HOUR if missing/invalid."""
+    key = f"fee_per_hour_{(vehicle_type or 'unknown').lower()}"
+    fee_per_hour = prop.get(key, DEFAULT_FEE_PER_HOUR)
+    if not isinstance(fee_per_hour, (int, float)) or fee_per_hour < 0:
+        print(f"[WARN] Invalid {key} ({fee_per_hour}) in DB for {prop.get('name')}. Using default {DEFAULT_FEE_PER_HOUR}.")
+        fee_per_hour = DEFAULT_FEE_PER_HOUR
+    return fee_per_hour
+
+
+def record_entry(parking_col, property_col, prop, plate, vehicle_type, now=None, open_index=None):
+    """Inserts an open parking record and takes a slot. Returns a SaveResult."""
+    now = now or datetime.now()
+    pid = prop['_id']
+    avail_space_key = f"available_parking_spaces_{vehicle_type.lower()}"
+    if not re.fullmatch(r'[A-Z0-9\-]+', plate):
+        return SaveResult(INVALID_PLATE, None, None, None, None)
+
+    # Answered locally when the open-vehicle index is following the change feed
+    if open_index is not None and open_index.ready:
+        existing_entry = open_index.get(plate)
+    else:
+        existing_entry = parking_col.find_one({"vehicle_no": plate, "property_id": pid, "exit_time": None})
+    if existing_entry:
+        return SaveResult(DUPLICATE_ENTRY, existing_entry.get('parking_id'), existing_entry, None, None)
+
+    # Re-fetch latest property details just before update for accurate counts
+    latest_prop = property_col.find_one({"_id": pid}, {avail_space_key: 1})
+    if not latest_prop or latest_prop.get(avail_space_key, 0) <= 0:
+        return SaveResult(PARKING_FULL, None, None, None, None)
+
+    new_record = {
+        "parking_id": str(uuid.uuid4()),
+        "property_id": pid,
+        "vehicle_no": plate,
+        "vehicle_type": vehicle_type,
+        "entry_time": now,
+        "exit_time": None,
+        "fee": 0,
+        "mode_of_payment": None
+    }
+    insert_result = parking_col.insert_one(new_record)
+    if not insert_result.inserted_id:
+        return SaveResult(INSERT_FAILED, None, None, None, None)
+
+    # Decrement available space count only if a slot is still free (another gate may have taken the last one)
+    update_result = property_col.update_one(
+        {"_id": pid, avail_space_key: {"$gt": 0}},
+        {"$inc": {avail_space_key: -1}}
+    )
+    if open_index is not None:
+        open_index.add(new_record) # new_record now carries the inserted _id
+    status = ENTRY_SAVED if update_result.modified_count > 0 else ENTRY_SAVED_NO_SLOT
+    return SaveResult(status, new_record["parking_id"], new_record, None, None)
+
+
+def record_exit(parking_col, property_col, prop, plate, now=None, open_index=None):
+    """Closes the newest open record for plate, charges the fee and frees a slot. Returns a SaveResult
+    (fee and hours are None if the entry time was unusable)."""
+    now = now or datetime.now()
+    pid = prop['_id']
+    updated_doc = parking_col.find_one_and_update(
+        {"vehicle_no": plate, "exit_time": None, "property_id": pid},
+        {"$set": {"exit_time": now}},
+        sort=[('entry_time', -1)],
+        return_document=pymongo.ReturnDocument.AFTER
+    )
+    if not updated_doc:
+        return SaveResult(NO_OPEN_ENTRY, None, None, None, None)
+    if open_index is not None:
+        open_index.remove(record_id=updated_doc.get('_id'))
+
+    fee, hours = None, None
+    entry_time = updated_doc.get('entry_time')
+    exiting_vehicle_type = updated_doc.get('vehicle_type', 'Unknown')
+    if entry_time and isinstance(entry_time, datetime):
+        fee, hours = calculate_fee(entry_time, now, fee_per_hour_for(prop, exiting_vehicle_type))
+        parking_col.update_one({"_id": updated_doc["_id"]}, {"$set": {"fee": fee}})
+        updated_doc["fee"] = fee
+
+    # Increment available space count for the correct vehicle type, never past the total
+    avail_space_key = f"available_parking_spaces_{exiting_vehicle_type.lower()}"
+    total = prop.get(f"parking_spaces_{exiting_vehicle_type.lower()}")
+    slot_filter = {"_id": pid}
+    if isinstance(total, (int, float)):
+        slot_filter[avail_space_key] = {"$lt": total}
+    property_col.update_one(slot_filter, {"$inc": {avail_space_key: 1}})
+    return SaveResult(EXIT_SAVED, updated_doc.get('parking_id'), updated_doc, fee, hours)
+
+
+# --- Read paths (logs and dashboard) ---
+def day_bounds(day):
+    return datetime.combine(day, time.min), datetime.combine(day, time.max)
+
+
+def load_log_records(parking_col, property_id, is_entry, day):
+    """Records shown in the Entry (still parked, entered that day) or Exit (exited that day) log, newest first."""
+    start_of_day, end_of_day = day_bounds(day)
+    if is_entry:
+        query = {"property_id": property_id, "entry_time": {"$gte": start_of_day, "$lte": end_of_day}, "exit_time": None}
+        sort_key = "entry_time"
+    else:
+        query = {"property_id": property_id, "exit_time": {"$gte": start_of_day, "$lte": end_of_day}}
+        sort_key = "exit_time"
+    return list(parking_col.find(query).sort(sort_key, pymongo.DESCENDING))
+
+
+def today_summary(parking_col, property_id, day):
+    """{'revenue', 'entries', 'exits'} for one day, as shown on the dashboard."""
+    start_of_day, end_of_day = day_bounds(day)
+    revenue_pipeline = [
+        {"$match": {"property_id": property_id, "exit_time": {"$gte": start_of_day, "$lte": end_of_day}}},
+        {"$group": {"_id": None, "total_revenue": {"$sum": "$fee"}}}
+    ]
+    revenue_result = list(parking_col.aggregate(revenue_pipeline))
+    return {
+        'revenue': revenue_result[0]['total_revenue'] if revenue_result else 0,
+        'entries': parking_col.count_documents({"property_id": property_id, "entry_time": {"$gte": start_of_day, "$lte": end_of_day}}),
+        'exits': parking_col.count_documents({"property_id": property_id, "exit_time": {"$gte": start_of_day, "$lte": end_of_day}}),
+    }
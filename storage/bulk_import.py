@@ -0,0 +1,182 @@
+import csv
+import time
+import uuid
+from datetime import datetime
+import pymongo
+from ocr_services.plate_format import is_valid_plate
+from parking_ops import EXPORT_COLUMNS, EXPORT_TIME_FORMAT, calculate_fee, fee_per_hour_for
+from storage.reconcile import SlotReconciler
+
+DUPLICATE_KEY = 11000
+VEHICLE_TYPES = {"car": "Car", "bike": "Bike"}
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported; the message becomes the reject reason."""
+
+
+def _parse_time(value, column):
+    try:
+        return datetime.strptime(value.strip(), EXPORT_TIME_FORMAT)
+    except ValueError:
+        raise RowError(f"Bad {column} '{value}' (expected {EXPORT_TIME_FORMAT})")
+
+
+def parse_row(row, prop):
+    """Turns one export-format row into a parking record for prop. Raises RowError."""
+    if len(row) < len(EXPORT_COLUMNS):
+        raise RowError(f"Expected {len(EXPORT_COLUMNS)} columns, got {len(row)}")
+    plate_raw, v_type_raw, entry_raw, exit_raw, fee_raw, prop_name, parking_id = (c.strip() for c in row[:len(EXPORT_COLUMNS)])
+
+    plate = plate_raw.upper()
+    if not is_valid_plate(plate):
+        raise RowError(f"Invalid plate '{plate_raw}'")
+    vehicle_type = VEHICLE_TYPES.get(v_type_raw.lower())
+    if vehicle_type is None:
+        raise RowError(f"Unknown vehicle type '{v_type_raw}'")
+    if prop_name and prop_name != prop.get('name'):
+        raise RowError(f"Row belongs to property '{prop_name}', importing into '{prop.get('name')}'")
+
+    entry_time = _parse_time(entry_raw, "Entry Time")
+    exit_time = None if exit_raw.upper() in ("", "PARKED") else _parse_time(exit_raw, "Exit Time")
+    if exit_time is not None and exit_time < entry_time:
+        raise RowError("Exit Time is before Entry Time")
+
+    if exit_time is None:
+        fee = 0
+    elif fee_raw:
+        try:
+            fee = round(float(fee_raw), 2)
+        except ValueError:
+            raise RowError(f"Bad fee '{fee_raw}'")
+        if fee < 0:
+            raise RowError(f"Negative fee '{fee_raw}'")
+    else:
+        fee, _ = calculate_fee(entry_time, exit_time, fee_per_hour_for(prop, vehicle_type)) # Paper records often lack the fee
+
+    return {
+        "parking_id": parking_id or str(uuid.uuid4()),
+        "property_id": prop['_id'],
+        "vehicle_no": plate,
+        "vehicle_type": vehicle_type,
+        "entry_time": entry_time,
+        "exit_time": exit_time,
+        "fee": fee,
+        "mode_of_payment": None,
+        "imported_at": datetime.now(),
+    }
+
+
+class BulkImporter:
+    """Streams an export-format CSV into the parking collection for one property.
+
+    Rows are validated with the app's plate rule, de-duplicated on parking_id (within the file and against
+    every tier in lookup_cols) and written in unordered insert_many batches. Rejected rows go to a CSV with
+    a Reason column."""
+    def __init__(self, parking_col, property_col, prop, lookup_cols=None, batch_size=1000, reconciler=None):
+        self.parking_col = parking_col
+        self.property_col = property_col
+        self.prop = prop
+        self.lookup_cols = lookup_cols or [parking_col] # Collections whose parking_ids count as "already imported"
+        self.batch_size = batch_size
+        self.reconciler = reconciler or SlotReconciler(parking_col, property_col)
+        self.stats = {'rows': 0, 'imported': 0, 'duplicates': 0, 'rejected': 0, 'seconds': 0.0, 'rows_per_s': 0.0}
+
+    def _existing_ids(self, parking_ids):
+        found = set()
+        for col in self.lookup_cols:
+            found.update(d['parking_id'] for d in col.find({"parking_id": {"$in": parking_ids}}, {"parking_id": 1, "_id": 0}))
+        return found
+
+    def _open_plates(self, plates):
+        """Plates of this property that already have an open session in the live collection."""
+        query = {"property_id": self.prop['_id'], "exit_time": None, "vehicle_no": {"$in": plates}}
+        return {d['vehicle_no'] for d in self.parking_col.find(query, {"vehicle_no": 1, "_id": 0})}
+
+    def _flush(self, batch, reject):
+        """Drops already-known records and inserts the rest. batch is a list of (row, record)."""
+        existing = self._existing_ids([r['parking_id'] for _, r in batch])
+        open_plates = self._open_plates([r['vehicle_no'] for _, r in batch if r['exit_time'] is None])
+        to_insert = []
+        for row, record in batch:
+            if record['parking_id'] in existing:
+                self.stats['duplicates'] += 1
+            elif record['exit_time'] is None and record['vehicle_no'] in open_plates:
+                reject(row, "Vehicle already has an open parking session")
+            else:
+                to_insert.append((row, record))
+        if not to_insert:
+            return
+        try:
+            result = self.parking_col.insert_many([record for _, record in to_insert], ordered=False)
+            self.stats['imported'] += len(result.inserted_ids)
+        except pymongo.errors.BulkWriteError as e:
+            # Unordered: everything except the failed rows was written
+            errors = e.details.get('writeErrors', [])
+            self.stats['imported'] += e.details.get('nInserted', 0)
+            self.stats['duplicates'] += sum(1 for err in errors if err.get('code') == DUPLICATE_KEY)
+            for err in errors:
+                if err.get('code') != DUPLICATE_KEY:
+                    reject(to_insert[err['index']][0], f"Database error: {err.get('errmsg')}")
+
+    def run(self, csv_path, rejects_path=None, on_progress=None):
+        """Imports csv_path; returns the stats dict. on_progress(stats) is called after every batch."""
+        started = time.perf_counter()
+        seen_ids, open_in_file = set(), set()
+        rejects_file = rejects_writer = None
+
+        def reject(row, reason):
+            nonlocal rejects_file, rejects_writer
+            self.stats['rejected'] += 1
+            if rejects_path is None:
+                return
+            if rejects_writer is None:
+                rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                rejects_writer = csv.writer(rejects_file)
+                rejects_writer.writerow(EXPORT_COLUMNS + ["Reason"])
+            rejects_writer.writerow(list(row[:len(EXPORT_COLUMNS)]) + [reason])
+
+        try:
+            with open(csv_path, newline='', encoding='utf-8-sig') as f:
+                reader = csv.reader(f)
+                batch = []
+                for row in reader:
+                    if not row or not any(c.strip() for c in row):
+                        continue
+                    if row[0].strip() == EXPORT_COLUMNS[0] and reader.line_num == 1:
+                        continue # Header
+                    self.stats['rows'] += 1
+                    try:
+                        record = parse_row(row, self.prop)
+                    except RowError as e:
+                        reject(row, str(e))
+                        continue
+                    if record['parking_id'] in seen_ids:
+                        self.stats['duplicates'] += 1
+                        continue
+                    if record['exit_time'] is None:
+                        if record['vehicle_no'] in open_in_file:
+                            reject(row, "Vehicle is PARKED more than once in this file")
+                            continue
+                        open_in_file.add(record['vehicle_no'])
+                    seen_ids.add(record['parking_id'])
+                    batch.append((row, record))
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch, reject)
+                        batch = []
+                        if on_progress: on_progress(dict(self.stats))
+                if batch:
+                    self._flush(batch, reject)
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        if self.stats['imported']:
+            # Imported open sessions occupy slots. Gates may be saving meanwhile, so keep the settle re-check
+            result = self.reconciler.reconcile(self.prop['_id'])
+            if result is not None:
+                self.stats['available'] = {t: st['available'] for t, st in result['types'].items()}
+        self.stats['seconds'] = time.perf_counter() - started
+        self.stats['rows_per_s'] = self.stats['rows'] / self.stats['seconds'] if self.stats['seconds'] > 0 else 0.0
+        if on_progress: on_progress(dict(self.stats))
+        return self.stats
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+from bson import json_util
+from storage.memory import MemoryCollection
+
+
+def _key(doc_id):
+    return json_util.dumps(doc_id) # ObjectId and plain ids alike, unambiguously
+
+
+class LocalStore:
+    """One SQLite file holding the documents of several collections (table documents(collection, id, doc)).
+
+    Documents are stored as extended JSON, so ObjectId and datetime values round-trip. Each write is its
+    own transaction unless it is part of a bulk write (see LocalCollection)."""
+    def __init__(self, path, synchronous="FULL"):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents ("
+                           "collection TEXT NOT NULL, id TEXT NOT NULL, doc TEXT NOT NULL, PRIMARY KEY (collection, id))")
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._collections = {}
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = LocalCollection(self, name)
+            return self._collections[name]
+
+    def load(self, name):
+        with self._lock:
+            rows = self._conn.execute("SELECT doc FROM documents WHERE collection = ? ORDER BY rowid", (name,)).fetchall()
+        return [json_util.loads(doc) for doc, in rows]
+
+    def put(self, name, doc):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO documents (collection, id, doc) VALUES (?, ?, ?)",
+                               (name, _key(doc['_id']), json_util.dumps(doc)))
+            if not self._batch_depth:
+                self._conn.commit()
+
+    def delete(self, name, doc_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (name, _key(doc_id)))
+            if not self._batch_depth:
+                self._conn.commit()
+
+    def begin_batch(self):
+        self._lock.acquire()
+        self._batch_depth += 1
+
+    def end_batch(self):
+        try:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._conn.commit()
+        finally:
+            self._lock.release()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class LocalCollection(MemoryCollection):
+    """MemoryCollection whose writes go through to a LocalStore; queries are answered from memory.
+
+    Meant for one process (a single-gate site): another process writing the same file is not seen until restart."""
+    def __init__(self, store, name):
+        super().__init__(name)
+        self._store = store
+        for doc in store.load(name):
+            self._docs[doc['_id']] = doc
+
+    def _saved(self, doc):
+        self._store.put(self.name, doc)
+
+    def _deleted(self, doc):
+        self._store.delete(self.name, doc['_id'])
+
+    def _bulk(self, write, *args, **kwargs):
+        """Runs a multi-document write as one SQLite transaction (collection lock first, then the store's)."""
+        with self._lock:
+            self._store.begin_batch()
+            try:
+                return write(*args, **kwargs)
+            finally:
+                self._store.end_batch()
+
+    def insert_many(self, documents, ordered=True):
+        return self._bulk(super().insert_many, documents, ordered=ordered)
+
+    def update_many(self, filter, update):
+        return self._bulk(super().update_many, filter, update)
+
+    def delete_many(self, filter):
+        return self._bulk(super().delete_many, filter)
@@ -0,0 +1,383 @@
+import threading
+from collections import namedtuple
+from bson import ObjectId
+import pymongo
+
+InsertOneResult = namedtuple("InsertOneResult", ["inserted_id"])
+InsertManyResult = namedtuple("InsertManyResult", ["inserted_ids"])
+UpdateResult = namedtuple("UpdateResult", ["matched_count", "modified_count"])
+DeleteResult = namedtuple("DeleteResult", ["deleted_count"])
+
+_MISSING = object()
+
+
+def _unsupported(what):
+    """Raised for query/pipeline features this stand-in lacks; a PyMongoError so callers' database error handling applies."""
+    return pymongo.errors.OperationFailure(f"MemoryCollection does not support {what}")
+
+
+def _copy(value):
+    """Copies dicts/lists; leaves scalars (str, numbers, datetime, ObjectId: all immutable) shared. Much cheaper than deepcopy."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _get_path(doc, path):
+    """Value at a dotted path, or _MISSING."""
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op, operand):
+    if op == '$eq':
+        return (value is _MISSING and operand is None) or value == operand
+    if op == '$ne':
+        return not _compare(value, '$eq', operand)
+    if op == '$in':
+        return any(_compare(value, '$eq', o) for o in operand)
+    if op == '$nin':
+        return not _compare(value, '$in', operand)
+    if op == '$exists':
+        return (value is not _MISSING) == bool(operand)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == '$gt': return value > operand
+        if op == '$gte': return value >= operand
+        if op == '$lt': return value < operand
+        if op == '$lte': return value <= operand
+    except TypeError:
+        return False # Mongo never matches across incomparable types
+    raise _unsupported(f"query operator {op}")
+
+
+def matches(doc, query):
+    """True if doc matches a (subset of) MongoDB query: equality, comparison operators, $in/$nin/$exists, $and/$or."""
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition): return False
+            continue
+        if key == '$or':
+            if not any(matches(doc, q) for q in condition): return False
+            continue
+        value = _get_path(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif not _compare(value, '$eq', condition):
+            return False
+    return True
+
+
+def _apply_update(doc, update):
+    """Applies $set/$unset/$inc/$push in place. Returns True if anything changed."""
+    changed = False
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == '$set':
+                if doc.get(key, _MISSING) != value:
+                    doc[key] = _copy(value); changed = True
+            elif op == '$unset':
+                if key in doc:
+                    del doc[key]; changed = True
+            elif op == '$inc':
+                doc[key] = doc.get(key, 0) + value; changed = changed or value != 0
+            elif op == '$push':
+                doc.setdefault(key, []).append(_copy(value)); changed = True
+            else:
+                raise _unsupported(f"update operator {op}")
+    return changed
+
+
+def _project(doc, projection):
+    if not projection:
+        return _copy(doc)
+    included = {k for k, v in projection.items() if v}
+    result = {k: _copy(v) for k, v in doc.items() if k in included}
+    if projection.get('_id', 1) and '_id' in doc:
+        result['_id'] = doc['_id']
+    return result
+
+
+def _sort_key(sort):
+    """Key function for a [(field, direction)] sort; None/missing sort first like in MongoDB."""
+    def key(doc):
+        parts = []
+        for field, direction in sort:
+            value = _get_path(doc, field)
+            present = value is not _MISSING and value is not None
+            parts.append((present, value if present else 0))
+        return parts
+    return key
+
+
+def _sorted(docs, sort):
+    docs = list(docs)
+    for field, direction in reversed(sort or []): # Stable multi-key sort, last key first
+        docs.sort(key=_sort_key([(field, direction)]), reverse=direction == pymongo.DESCENDING)
+    return docs
+
+
+class MemoryCursor:
+    """Just enough of pymongo's Cursor: sort(), limit(), iteration."""
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=pymongo.ASCENDING):
+        self._sort = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        docs = _sorted(self._docs, self._sort)
+        if self._limit:
+            docs = docs[:self._limit]
+        return iter([_project(d, self._projection) for d in docs])
+
+
+class MemoryCollection:
+    """Thread-safe in-process stand-in for the subset of pymongo.collection.Collection this app uses.
+
+    Meant for load tests and offline experiments, not as a database. create_index() on a field keeps a
+    hash index used for equality conditions on it; everything else is a linear scan."""
+    def __init__(self, name="memory"):
+        self.name = name
+        self._docs = {}     # _id -> document (insertion ordered)
+        self._indexes = {}  # field -> {value: set of _id}
+        self._lock = threading.RLock()
+
+    # --- Indexing ---
+    def create_index(self, keys, **kwargs):
+        """Indexes the first field of keys for equality lookups; returns a name like pymongo does."""
+        keys = keys if isinstance(keys, list) else [(keys, pymongo.ASCENDING)]
+        field = keys[0][0]
+        with self._lock:
+            if field not in self._indexes:
+                self._indexes[field] = {}
+                for doc in self._docs.values():
+                    self._index_add(field, doc)
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    @staticmethod
+    def _index_value(doc, field):
+        value = _get_path(doc, field)
+        return None if value is _MISSING else value
+
+    def _index_add(self, field, doc):
+        self._indexes[field].setdefault(self._index_value(doc, field), set()).add(doc['_id'])
+
+    def _index_discard(self, field, doc):
+        bucket = self._indexes[field].get(self._index_value(doc, field))
+        if bucket is not None:
+            bucket.discard(doc['_id'])
+
+    def _candidates(self, filter):
+        """Documents that may match filter: an index bucket if an indexed field has an equality condition."""
+        for field, condition in (filter or {}).items():
+            if field not in self._indexes:
+                continue
+            if isinstance(condition, dict):
+                if set(condition) != {'$eq'}:
+                    continue
+                condition = condition['$eq']
+            try:
+                ids = self._indexes[field].get(condition, ())
+            except TypeError:
+                continue # Unhashable value
+            return [self._docs[i] for i in ids]
+        return self._docs.values()
+
+    def _update_doc(self, doc, update):
+        """_apply_update that keeps the indexes current."""
+        for field in self._indexes:
+            self._index_discard(field, doc)
+        changed = _apply_update(doc, update)
+        for field in self._indexes:
+            self._index_add(field, doc)
+        if changed:
+            self._saved(doc)
+        return changed
+
+    # --- Write hooks (called under the lock; storage/local_store.py persists through them) ---
+    def _saved(self, doc):
+        pass
+
+    def _deleted(self, doc):
+        pass
+
+    # --- Reads ---
+    def _matching(self, filter):
+        return [d for d in self._candidates(filter) if matches(d, filter)]
+
+    def find(self, filter=None, projection=None):
+        with self._lock:
+            docs = [_copy(d) for d in self._matching(filter)]
+        return MemoryCursor(docs, projection)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        with self._lock:
+            docs = self._matching(filter)
+            if not docs:
+                return None
+            return _project(_sorted(docs, sort)[0], projection)
+
+    def count_documents(self, filter):
+        with self._lock:
+            return len(self._matching(filter))
+
+    def aggregate(self, pipeline, **kwargs):
+        """Supports $match, $group (with $sum/$min/$max/$first), $sort and $limit."""
+        pipeline = list(pipeline)
+        first_match = pipeline.pop(0)['$match'] if pipeline and '$match' in pipeline[0] else {}
+        with self._lock:
+            docs = [_copy(d) for d in self._matching(first_match)]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                docs = [d for d in docs if matches(d, spec)]
+            elif name == '$group':
+                docs = self._group(docs, spec)
+            elif name == '$sort':
+                docs = _sorted(docs, list(spec.items()))
+            elif name == '$limit':
+                docs = docs[:spec]
+            else:
+                raise _unsupported(f"pipeline stage {name}")
+        return iter(docs)
+
+    @classmethod
+    def _value(cls, doc, expr):
+        """Evaluates an aggregation expression: "$field", a literal, or one of the operators the app's pipelines use."""
+        if isinstance(expr, str) and expr.startswith('$'):
+            value = _get_path(doc, expr[1:])
+            return None if value is _MISSING else value
+        if not (isinstance(expr, dict) and len(expr) == 1 and next(iter(expr)).startswith('$')):
+            return expr
+        (op, arg), = expr.items()
+        args = [cls._value(doc, a) for a in arg] if isinstance(arg, list) else [cls._value(doc, arg)]
+        if op == '$ifNull':
+            return next((a for a in args if a is not None), None)
+        if op == '$cond':
+            return args[1] if args[0] else args[2]
+        if op == '$and':
+            return all(args)
+        if op == '$or':
+            return any(args)
+        if op in ('$eq', '$ne'):
+            return (args[0] == args[1]) == (op == '$eq')
+        if op in ('$gt', '$gte', '$lt', '$lte'):
+            return _compare(args[0], op, args[1])
+        if op == '$toLower':
+            return (args[0] or '').lower()
+        if op == '$hour':
+            return args[0].hour if args[0] is not None else None
+        if op == '$dateToString':
+            value = cls._value(doc, arg['date'])
+            return value.strftime(arg.get('format', '%Y-%m-%dT%H:%M:%S.%LZ').replace('%L', '000')) if value is not None else None
+        if op == '$dayOfWeek':
+            return args[0].isoweekday() % 7 + 1 if args[0] is not None else None # 1 = Sunday, like MongoDB
+        raise _unsupported(f"expression operator {op}")
+
+    def _group(self, docs, spec):
+        groups = {}
+        for doc in docs:
+            key_expr = spec['_id']
+            if isinstance(key_expr, dict):
+                key = tuple((k, self._value(doc, v)) for k, v in key_expr.items())
+            else:
+                key = self._value(doc, key_expr)
+            out = groups.get(key)
+            if out is None:
+                out = groups[key] = {'_id': dict(key) if isinstance(key_expr, dict) else key}
+            for field, acc in spec.items():
+                if field == '_id':
+                    continue
+                (op, expr), = acc.items()
+                value = self._value(doc, expr)
+                if op == '$sum':
+                    out[field] = out.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+                elif op in ('$min', '$max'):
+                    if value is not None:
+                        current = out.get(field)
+                        if current is None or (value < current if op == '$min' else value > current):
+                            out[field] = value
+                elif op == '$first':
+                    out.setdefault(field, value)
+                else:
+                    raise _unsupported(f"accumulator {op}")
+        return list(groups.values())
+
+    # --- Writes ---
+    def insert_one(self, document):
+        document.setdefault('_id', ObjectId()) # Like pymongo, the caller's dict gets the _id
+        with self._lock:
+            if document['_id'] in self._docs:
+                raise pymongo.errors.DuplicateKeyError(f"Duplicate _id {document['_id']}")
+            stored = self._docs[document['_id']] = _copy(document)
+            for field in self._indexes:
+                self._index_add(field, stored)
+            self._saved(stored)
+        return InsertOneResult(document['_id'])
+
+    def insert_many(self, documents, ordered=True):
+        ids = []
+        for document in documents:
+            try:
+                ids.append(self.insert_one(document).inserted_id)
+            except pymongo.errors.DuplicateKeyError:
+                if ordered:
+                    raise
+        return InsertManyResult(ids)
+
+    def _first_match(self, filter, sort=None):
+        docs = self._matching(filter)
+        return _sorted(docs, sort)[0] if docs else None
+
+    def update_one(self, filter, update, upsert=False):
+        with self._lock:
+            doc = self._first_match(filter)
+            if doc is None:
+                if upsert:
+                    new_doc = {k: v for k, v in filter.items() if not k.startswith('$') and not isinstance(v, dict)}
+                    _apply_update(new_doc, update)
+                    self.insert_one(new_doc)
+                return UpdateResult(0, 0)
+            return UpdateResult(1, 1 if self._update_doc(doc, update) else 0)
+
+    def update_many(self, filter, update):
+        with self._lock:
+            docs = self._matching(filter)
+            modified = sum(1 for d in docs if self._update_doc(d, update))
+        return UpdateResult(len(docs), modified)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, return_document=pymongo.ReturnDocument.BEFORE):
+        with self._lock:
+            doc = self._first_match(filter, sort)
+            if doc is None:
+                return None
+            before = _project(doc, projection)
+            self._update_doc(doc, update)
+            return _project(doc, projection) if return_document == pymongo.ReturnDocument.AFTER else before
+
+    def delete_many(self, filter):
+        with self._lock:
+            docs = self._matching(filter)
+            for doc in docs:
+                for field in self._indexes:
+                    self._index_discard(field, doc)
+                del self._docs[doc['_id']]
+                self._deleted(doc)
+        return DeleteResult(len(docs))
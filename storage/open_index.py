@@ -0,0 +1,193 @@
+import threading
+import pymongo
+from storage.plate_match import PlateMatcher
+
+
+class OpenVehicleIndex:
+    """In-process index of vehicles currently parked at one property (plate -> open record summary).
+
+    Loaded once from parking_col and kept consistent by local saves plus a MongoDB change stream,
+    so duplicate checks, exit previews and occupancy counts don't need a database round trip."""
+    PROJECTION = {"_id": 1, "parking_id": 1, "vehicle_no": 1, "vehicle_type": 1, "entry_time": 1}
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_plate = {}     # plate -> {'_id', 'parking_id', 'vehicle_no', 'vehicle_type', 'entry_time'}
+        self._plate_by_id = {}  # record _id -> plate (change events for exits/deletes only carry the _id)
+        self._counts = {}       # lowercase vehicle type -> open count
+        self._listeners = []    # Called as listener(event, record) with event 'add' or 'remove'
+        self.matcher = PlateMatcher() # Approximate lookup over the open plates (exit OCR misreads)
+        self.property_id = None
+        self.loaded = False
+        self.live = False       # True while the change feed is running
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Loading ---
+    def load(self, parking_col, property_id):
+        """(Re)builds the index from open records of property_id."""
+        records = list(parking_col.find({"property_id": property_id, "exit_time": None}, self.PROJECTION))
+        with self._lock:
+            self._by_plate.clear(); self._plate_by_id.clear(); self._counts.clear(); self.matcher.clear()
+            self.property_id = property_id
+            for record in records:
+                self._add_locked(record)
+            self.loaded = True
+        for listener in list(self._listeners):
+            listener('reload', None)
+        print(f"[INFO] Open-vehicle index loaded: {len(records)} vehicle(s) currently parked.")
+        return len(records)
+
+    @property
+    def ready(self):
+        """True if the index can answer 'is this plate inside?' authoritatively (loaded and following the change feed)."""
+        return self.loaded and self.live
+
+    # --- Mutation ---
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _add_locked(self, record):
+        plate = record.get('vehicle_no')
+        if not plate:
+            return None
+        previous = self._by_plate.get(plate)
+        if previous is not None and previous.get('_id') == record.get('_id'):
+            return None # Already indexed (local save and change event both report it)
+        if previous is not None:
+            self._remove_locked(plate)
+        summary = {k: record.get(k) for k in self.PROJECTION}
+        self._by_plate[plate] = summary
+        self.matcher.add(plate)
+        if summary.get('_id') is not None:
+            self._plate_by_id[summary['_id']] = plate
+        v_type = (summary.get('vehicle_type') or 'unknown').lower()
+        self._counts[v_type] = self._counts.get(v_type, 0) + 1
+        return summary
+
+    def _remove_locked(self, plate):
+        summary = self._by_plate.pop(plate, None)
+        if summary is None:
+            return None
+        self._plate_by_id.pop(summary.get('_id'), None)
+        self.matcher.remove(plate)
+        v_type = (summary.get('vehicle_type') or 'unknown').lower()
+        self._counts[v_type] = max(0, self._counts.get(v_type, 0) - 1)
+        return summary
+
+    def add(self, record):
+        """Indexes an open record (entry saved)."""
+        with self._lock:
+            summary = self._add_locked(record)
+        if summary is not None:
+            for listener in list(self._listeners):
+                listener('add', summary)
+
+    def remove(self, plate=None, record_id=None):
+        """Drops a vehicle by plate or record _id (exit saved)."""
+        with self._lock:
+            if plate is None:
+                plate = self._plate_by_id.get(record_id)
+            summary = self._remove_locked(plate) if plate is not None else None
+        if summary is not None:
+            for listener in list(self._listeners):
+                listener('remove', summary)
+
+    # --- Queries ---
+    def get(self, plate):
+        """Returns the open record summary for plate, or None."""
+        with self._lock:
+            summary = self._by_plate.get(plate)
+            return dict(summary) if summary else None
+
+    def suggest(self, plate, limit=3):
+        """Open plates closest to a (possibly misread) plate, best first, as [(plate, cost)]."""
+        return self.matcher.suggest(plate, limit=limit)
+
+    def plates(self):
+        with self._lock:
+            return list(self._by_plate)
+
+    def occupancy(self, vehicle_type=None):
+        """Open vehicles of one type (case-insensitive), or all types if vehicle_type is None."""
+        with self._lock:
+            if vehicle_type is None:
+                return sum(self._counts.values())
+            return self._counts.get(vehicle_type.lower(), 0)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_plate)
+
+    # --- Change feed ---
+    def start_change_feed(self, parking_col):
+        """Follows inserts/exits made by other gates. Needs a replica set (Atlas); otherwise the index stays local-only."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not hasattr(parking_col, 'watch'):
+            # Local backend: this process makes every write, and its saves update the index directly
+            self.live = True
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._follow, args=(parking_col,), name="open-index-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.live = False
+
+    def _apply_change(self, change):
+        op = change.get('operationType')
+        doc = change.get('fullDocument')
+        record_id = (change.get('documentKey') or {}).get('_id')
+        if op in ('insert', 'update', 'replace') and doc is not None:
+            if doc.get('property_id') != self.property_id:
+                return
+            if doc.get('exit_time') is None:
+                self.add(doc)
+            else:
+                self.remove(record_id=record_id)
+        elif op in ('update', 'replace', 'delete'):
+            self.remove(record_id=record_id) # Document gone (or lookup failed): drop whatever we had for it
+
+    def _follow(self, parking_col):
+        pipeline = [{"$match": {"$or": [{"fullDocument.property_id": self.property_id}, {"operationType": "delete"}]}}]
+        resume_token = None
+        # A new stream only reports changes made after it opened, so the snapshot from load() is retaken once
+        # the first stream is open (and after any break without a resume token) before the index goes live.
+        # Events that straddle the reload are replayed in order and converge (add/remove are idempotent).
+        reload_needed = True
+        delay = 1.0
+        while not self._stop_event.is_set():
+            try:
+                with parking_col.watch(pipeline, full_document='updateLookup', resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    if reload_needed:
+                        self.load(parking_col, self.property_id) # Catch up on anything missed before the stream opened
+                        reload_needed = False
+                    self.live = True
+                    delay = 1.0
+                    while not self._stop_event.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        self._apply_change(change)
+            except pymongo.errors.OperationFailure as e:
+                if e.code in (40573, 136) or 'replica set' in str(e).lower(): # Change streams unsupported here
+                    print(f"[WARN] Change streams unavailable ({e}); open-vehicle index will only track this gate's saves.")
+                    self.live = False
+                    return
+                print(f"[WARN] Open-vehicle change feed error: {e}")
+                resume_token = None # Token may be stale; the next stream reloads the index
+                reload_needed = True
+            except pymongo.errors.PyMongoError as e:
+                print(f"[WARN] Open-vehicle change feed interrupted: {e}")
+                reload_needed = reload_needed or resume_token is None
+            except Exception as e:
+                print(f"[ERROR] Open-vehicle change feed: {e}")
+                resume_token = None
+                reload_needed = True
+            self.live = False
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, 30.0)
+        self.live = False
@@ -0,0 +1,99 @@
+import threading
+from ocr_services.plate_format import compact_plate
+
+# Characters OCR engines commonly swap on plates; each group collapses to its first character
+CONFUSION_GROUPS = ("0ODQ", "8B", "1IL", "5S", "2Z", "6G", "7T")
+CONFUSION_COST = 0.5 # Substituting within a group costs half an ordinary edit
+
+_CANONICAL = {c: group[0] for group in CONFUSION_GROUPS for c in group}
+
+
+def canonical(compact):
+    """Maps confusable characters onto one representative, so 'MH0IAB8234' and 'MHO1A88234' compare equal."""
+    return "".join(_CANONICAL.get(c, c) for c in compact)
+
+
+def substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    return CONFUSION_COST if _CANONICAL.get(a, a) == _CANONICAL.get(b, b) else 1.0
+
+
+def plate_distance(a, b):
+    """OCR-aware edit distance between two compact plates (insert/delete 1, confusable swap 0.5, other swap 1)."""
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [float(i)]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1.0, current[j - 1] + 1.0, previous[j - 1] + substitution_cost(ca, cb)))
+        previous = current
+    return previous[-1]
+
+
+def _deletion_keys(s):
+    """s plus every string obtained by deleting one character from s."""
+    keys = {s}
+    for i in range(len(s)):
+        keys.add(s[:i] + s[i + 1:])
+    return keys
+
+
+class PlateMatcher:
+    """Approximate plate lookup over a changing set of plates.
+
+    Plates are indexed by their canonical form and its single-character deletions (a symmetric-delete
+    index), so a query touches only len(plate)+1 dictionary keys no matter how many plates are stored.
+    This finds every plate within one ordinary edit plus any number of confusable swaps; candidates are
+    then ranked by plate_distance."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}          # deletion key -> set of plates
+        self._plate_keys = {}    # plate -> its keys (for removal)
+
+    def add(self, plate):
+        compact = compact_plate(plate)
+        if not compact:
+            return
+        keys = _deletion_keys(canonical(compact))
+        with self._lock:
+            if plate in self._plate_keys:
+                return
+            self._plate_keys[plate] = keys
+            for key in keys:
+                self._keys.setdefault(key, set()).add(plate)
+
+    def remove(self, plate):
+        with self._lock:
+            keys = self._plate_keys.pop(plate, None)
+            for key in keys or ():
+                bucket = self._keys.get(key)
+                if bucket is not None:
+                    bucket.discard(plate)
+                    if not bucket:
+                        del self._keys[key]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._plate_keys.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._plate_keys)
+
+    def suggest(self, plate, limit=3, max_cost=1.5):
+        """Closest stored plates as [(plate, cost)], best first. Exact matches have cost 0."""
+        compact = compact_plate(plate)
+        if not compact:
+            return []
+        candidates = set()
+        with self._lock:
+            for key in _deletion_keys(canonical(compact)):
+                candidates.update(self._keys.get(key, ()))
+        scored = []
+        for candidate in candidates:
+            cost = plate_distance(compact, compact_plate(candidate))
+            if cost <= max_cost:
+                scored.append((candidate, cost))
+        scored.sort(key=lambda item: (item[1], item[0]))
+        return scored[:limit]
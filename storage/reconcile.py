@@ -0,0 +1,104 @@
+import time
+import pymongo
+
+VEHICLE_TYPES = {"car": "Car", "bike": "Bike"}
+MAX_ATTEMPTS = 3
+
+
+def ensure_reconcile_index(parking_col):
+    """Index holding every field the open-count pipeline touches, so it is answered from the index."""
+    parking_col.create_index([("property_id", pymongo.ASCENDING), ("exit_time", pymongo.ASCENDING), ("vehicle_type", pymongo.ASCENDING)])
+
+
+def open_counts(parking_col, property_id):
+    """{'car': n, 'bike': n} open records per vehicle type, from one grouped pipeline."""
+    pipeline = [
+        {"$match": {"property_id": property_id, "exit_time": None}},
+        {"$group": {"_id": "$vehicle_type", "open": {"$sum": 1}}},
+    ]
+    counts = {v_type: 0 for v_type in VEHICLE_TYPES}
+    for row in parking_col.aggregate(pipeline):
+        v_type = (row['_id'] or '').lower()
+        if v_type in counts:
+            counts[v_type] += row['open']
+    return counts
+
+
+class SlotReconciler:
+    """Recomputes available_parking_spaces_* from the open records and corrects drift.
+
+    The counters are kept by $inc after each insert/exit; a failure between the two leaves them wrong for
+    good. A correction is a compare-and-set on the counter values the check was based on, so a gate's
+    $inc that lands in between makes the update miss and the check is repeated instead of overwriting it.
+    Drift is only corrected if it is still there settle_seconds later (a save may be between its insert and
+    its $inc)."""
+    def __init__(self, parking_col, property_col, settle_seconds=0.2):
+        self.parking_col = parking_col
+        self.property_col = property_col
+        self.settle_seconds = settle_seconds
+        self._index_checked = False
+        self.last_result = None
+
+    def _ensure_index(self):
+        if self._index_checked:
+            return
+        try:
+            ensure_reconcile_index(self.parking_col)
+        except pymongo.errors.PyMongoError as e:
+            print(f"[WARN] Could not create slot reconciliation index: {e}")
+        self._index_checked = True
+
+    def check(self, property_oid):
+        """Returns {type: {'total', 'available', 'expected', 'open', 'drift'}} without changing anything."""
+        self._ensure_index()
+        fields = {f"{prefix}_{t}": 1 for t in VEHICLE_TYPES for prefix in ("parking_spaces", "available_parking_spaces")}
+        prop = self.property_col.find_one({"_id": property_oid}, fields)
+        if prop is None:
+            return None
+        counts = open_counts(self.parking_col, property_oid)
+        result = {}
+        for v_type in VEHICLE_TYPES:
+            total = prop.get(f"parking_spaces_{v_type}", 0)
+            available = prop.get(f"available_parking_spaces_{v_type}", 0)
+            expected = max(0, total - counts[v_type])
+            result[v_type] = {'total': total, 'available': available, 'expected': expected,
+                              'open': counts[v_type], 'drift': available - expected}
+        return result
+
+    def reconcile(self, property_oid, settle=True):
+        """Checks and, if needed, corrects the counters of one property.
+
+        Returns {'types': check() result, 'corrected': {type: (old, new)}, 'seconds'}, or None if the
+        property does not exist. settle=False is only safe while no gate is saving (offline tools, tests)."""
+        started = time.perf_counter()
+        corrected = {}
+        types = None
+        for attempt in range(MAX_ATTEMPTS):
+            types = self.check(property_oid)
+            if types is None:
+                return None
+            drifted = {t: st for t, st in types.items() if st['drift'] != 0}
+            if not drifted:
+                break
+            if settle and self.settle_seconds > 0:
+                time.sleep(self.settle_seconds)
+                confirm = self.check(property_oid)
+                if confirm is None:
+                    return None
+                if any(confirm[t]['drift'] != st['drift'] or confirm[t]['available'] != st['available'] for t, st in drifted.items()):
+                    continue # Counters or open records moved meanwhile; look again
+            cas_filter = {"_id": property_oid}
+            cas_filter.update({f"available_parking_spaces_{t}": st['available'] for t, st in drifted.items()})
+            update = {"$set": {f"available_parking_spaces_{t}": st['expected'] for t, st in drifted.items()}}
+            if self.property_col.update_one(cas_filter, update).modified_count > 0:
+                corrected = {t: (st['available'], st['expected']) for t, st in drifted.items()}
+                for t, st in drifted.items():
+                    st['available'], st['drift'] = st['expected'], 0
+                break
+        else:
+            print(f"[WARN] Slot counts for property {property_oid} kept changing; reconciliation skipped this round.")
+
+        self.last_result = {'types': types, 'corrected': corrected, 'seconds': time.perf_counter() - started}
+        for t, (old, new) in corrected.items():
+            print(f"[WARN] Slot count drift corrected for {t}: available {old} -> {new} ({types[t]['open']} open of {types[t]['total']}).")
+        return self.last_result
@@ -0,0 +1,182 @@
+"""Parking records, properties and users behind one object per storage backend.
+
+Backends: 'mongo' (the shared Atlas/MongoDB database), 'memory' (in-process, for benchmarks and demos)
+and 'local' (an embedded SQLite file for a small single-gate site). Every backend exposes its collections
+with pymongo's interface (storage/memory.py), so parking_ops, the analytics and the open-vehicle index
+run on any of them unchanged; the methods here are the operations the GUI performs."""
+import os
+from bson import json_util
+import pymongo
+import parking_ops
+from storage.memory import MemoryCollection
+from storage.local_store import LocalStore
+
+BACKENDS = ("mongo", "memory", "local")
+DEFAULT_NAMES = {'parking': 'parking', 'property': 'property', 'user': 'user', 'employee': 'employee'}
+
+
+class Repository:
+    """Base class: the operations on top of four collection objects."""
+    backend = None
+    shared = False # True if other gates write to the same data (change streams, tiering need a server)
+
+    def __init__(self, parking, properties, users, employees):
+        self.parking = parking
+        self.properties = properties
+        self.users = users
+        self.employees = employees
+
+    def collection(self, name):
+        raise NotImplementedError
+
+    def ping(self):
+        pass
+
+    def close(self):
+        pass
+
+    def seed(self, path):
+        """Fills empty collections from an extended-JSON file {"property": [...], "user": [...], ...} keyed by collection name."""
+        with open(path, encoding='utf-8') as f:
+            data = json_util.loads(f.read())
+        seeded = 0
+        for col in (self.parking, self.properties, self.users, self.employees):
+            docs = data.get(col.name) or []
+            if docs and col.count_documents({}) == 0:
+                col.insert_many(docs)
+                seeded += len(docs)
+        return seeded
+
+    # --- Records ---
+    def record_entry(self, prop, plate, vehicle_type, now=None, open_index=None):
+        return parking_ops.record_entry(self.parking, self.properties, prop, plate, vehicle_type, now, open_index)
+
+    def record_exit(self, prop, plate, now=None, open_index=None):
+        return parking_ops.record_exit(self.parking, self.properties, prop, plate, now, open_index)
+
+    def log_records(self, property_oid, is_entry, day):
+        return parking_ops.load_log_records(self.parking, property_oid, is_entry, day)
+
+    def today_summary(self, property_oid, day):
+        return parking_ops.today_summary(self.parking, property_oid, day)
+
+    def link_evidence(self, parking_id, evidence):
+        """Appends an archived image reference to a parking record."""
+        return self.parking.update_one({"parking_id": parking_id}, {"$push": {"evidence": evidence}})
+
+    # --- Properties ---
+    def get_property(self, property_oid):
+        return self.properties.find_one({"_id": property_oid})
+
+    def update_property(self, property_oid, fields):
+        return self.properties.update_one({"_id": property_oid}, {"$set": fields})
+
+    # --- Users ---
+    def login_assignment(self, username):
+        """The user document with its active employee record under 'employee' and assigned property under
+        'property' (either may be missing), or None if there is no such user."""
+        user = self.users.find_one({"user_id": username})
+        if user is None:
+            return None
+        employee = self.employees.find_one({"userid": username, "status": "active"})
+        if employee is not None:
+            user['employee'] = employee
+            prop = self.properties.find_one({"property_id": employee.get('p_id')})
+            if prop is not None:
+                user['property'] = prop
+        return user
+
+
+class MongoRepository(Repository):
+    backend = "mongo"
+    shared = True
+
+    def __init__(self, uri, database, names=None, timeout_ms=5000):
+        names = names or DEFAULT_NAMES
+        self.client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=timeout_ms)
+        self.db = self.client[database]
+        super().__init__(self.db[names['parking']], self.db[names['property']], self.db[names['user']], self.db[names['employee']])
+
+    def collection(self, name):
+        return self.db[name]
+
+    def ping(self):
+        self.client.admin.command('ping')
+
+    def close(self):
+        self.client.close()
+
+    def login_assignment(self, username):
+        """Same result as the base class in one round trip."""
+        pipeline = [
+            {"$match": {"user_id": username}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": self.employees.name,
+                "let": {"uid": "$user_id"},
+                "pipeline": [{"$match": {"$expr": {"$eq": ["$userid", "$$uid"]}, "status": "active"}}, {"$limit": 1}],
+                "as": "employee",
+            }},
+            {"$unwind": {"path": "$employee", "preserveNullAndEmptyArrays": True}},
+            {"$lookup": {"from": self.properties.name, "localField": "employee.p_id", "foreignField": "property_id", "as": "property"}},
+            {"$unwind": {"path": "$property", "preserveNullAndEmptyArrays": True}},
+        ]
+        results = list(self.users.aggregate(pipeline))
+        return results[0] if results else None
+
+
+class MemoryRepository(Repository):
+    backend = "memory"
+
+    def __init__(self, names=None):
+        names = names or DEFAULT_NAMES
+        self._collections = {}
+        super().__init__(*(self.collection(names[k]) for k in ('parking', 'property', 'user', 'employee')))
+
+    def collection(self, name):
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+
+class LocalRepository(Repository):
+    backend = "local"
+
+    def __init__(self, path, names=None):
+        names = names or DEFAULT_NAMES
+        self.store = LocalStore(path)
+        super().__init__(*(self.store.collection(names[k]) for k in ('parking', 'property', 'user', 'employee')))
+
+    def collection(self, name):
+        return self.store.collection(name)
+
+    def close(self):
+        self.store.close()
+
+
+def ensure_indexes(repo):
+    """Indexes the hot lookups use (hash indexes on the memory/local backends)."""
+    repo.parking.create_index([("vehicle_no", pymongo.ASCENDING), ("property_id", pymongo.ASCENDING), ("exit_time", pymongo.ASCENDING)])
+    repo.parking.create_index("parking_id")
+    repo.users.create_index("user_id")
+    repo.employees.create_index("userid")
+    repo.properties.create_index("property_id")
+
+
+def open_repository(backend, names=None, uri=None, database=None, path=None, seed_file=None):
+    """Creates the repository for a backend name (see BACKENDS). Mongo connects lazily; call ping() to check."""
+    if backend == "mongo":
+        repo = MongoRepository(uri, database, names)
+    elif backend == "memory":
+        repo = MemoryRepository(names)
+    elif backend == "local":
+        repo = LocalRepository(path, names)
+    else:
+        raise ValueError(f"Unknown storage backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend != "mongo":
+        ensure_indexes(repo)
+        if seed_file and os.path.exists(seed_file):
+            seeded = repo.seed(seed_file)
+            if seeded:
+                print(f"[INFO] Seeded {seeded} document(s) into the {backend} store from {seed_file}.")
+    return repo
@@ -0,0 +1,92 @@
+import heapq
+import time
+from datetime import datetime, timedelta
+import pymongo
+
+DUPLICATE_KEY = 11000
+
+
+def _compact(record):
+    """Archive copy without null fields (e.g. an unset mode_of_payment); readers use .get() anyway."""
+    return {k: v for k, v in record.items() if v is not None}
+
+
+def ensure_archive_indexes(archive_col):
+    archive_col.create_index([("property_id", pymongo.ASCENDING), ("entry_time", pymongo.ASCENDING)])
+    archive_col.create_index([("property_id", pymongo.ASCENDING), ("exit_time", pymongo.ASCENDING)])
+    archive_col.create_index("parking_id")
+
+
+def archive_closed_records(hot_col, archive_col, horizon_days, property_id=None, batch_size=1000, now=None, stop_event=None):
+    """Moves closed records whose exit is older than horizon_days from hot_col to archive_col, in batches.
+
+    Each batch is inserted (unordered; duplicates from an interrupted or concurrent run are ignored) and
+    only then deleted from hot_col, so a crash at any point leaves every record in at least one tier.
+    Returns {'moved', 'batches', 'seconds'}."""
+    started = time.perf_counter()
+    cutoff = (now or datetime.now()) - timedelta(days=horizon_days)
+    query = {"exit_time": {"$ne": None, "$lt": cutoff}}
+    if property_id is not None:
+        query["property_id"] = property_id
+    moved = batches = 0
+    while stop_event is None or not stop_event.is_set():
+        batch = list(hot_col.find(query).sort("exit_time", pymongo.ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        try:
+            archive_col.insert_many([_compact(r) for r in batch], ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            if any(err.get('code') != DUPLICATE_KEY for err in e.details.get('writeErrors', [])):
+                raise # Something other than "already archived": keep the hot copies
+        ids = [r['_id'] for r in batch]
+        moved += hot_col.delete_many({"_id": {"$in": ids}}).deleted_count
+        batches += 1
+        if len(batch) < batch_size:
+            break
+    return {'moved': moved, 'batches': batches, 'seconds': time.perf_counter() - started}
+
+
+class TieredCursor:
+    """Merges the hot and archive results of one query; sort() keeps pymongo's chaining style."""
+    def __init__(self, hot_cursor, archive_cursor):
+        self._cursors = [hot_cursor, archive_cursor]
+        self._sort = None
+
+    def sort(self, key, direction=pymongo.ASCENDING):
+        self._sort = (key, direction)
+        for cursor in self._cursors:
+            cursor.sort(key, direction)
+        return self
+
+    def __iter__(self):
+        if self._sort is None:
+            for cursor in self._cursors:
+                yield from cursor
+            return
+        field, direction = self._sort
+        # None/missing values first (ascending), like MongoDB; each tier is already sorted by the server
+        key = lambda doc: (doc.get(field) is not None, doc.get(field) if doc.get(field) is not None else 0)
+        yield from heapq.merge(*self._cursors, key=key, reverse=direction == pymongo.DESCENDING)
+
+
+class TieredParkingHistory:
+    """Read-only view over the live parking collection plus its archive, for export and analytics.
+
+    Hot paths (logs, duplicate checks, today's dashboard) keep using the live collection directly."""
+    def __init__(self, hot_col, archive_col):
+        self.hot_col = hot_col
+        self.archive_col = archive_col
+        self.name = hot_col.name
+
+    def find(self, filter=None, projection=None):
+        return TieredCursor(self.hot_col.find(filter, projection), self.archive_col.find(filter, projection))
+
+    def count_documents(self, filter):
+        return self.hot_col.count_documents(filter) + self.archive_col.count_documents(filter)
+
+    def aggregate(self, pipeline, **kwargs):
+        """Runs pipeline over both tiers with $unionWith (the leading $match is applied to each tier first)."""
+        pipeline = list(pipeline)
+        head = [pipeline.pop(0)] if pipeline and '$match' in pipeline[0] else []
+        union = {"$unionWith": {"coll": self.archive_col.name, "pipeline": head}}
+        return self.hot_col.aggregate(head + [union] + pipeline, **kwargs)